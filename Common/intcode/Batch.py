@@ -0,0 +1,327 @@
+"""
+Lockstep batch executor that runs many copies of one Intcode program with NumPy
+
+Every lane is a complete machine: a row of the 2-D int64 memory array plus its entry in the
+sp and relative base vectors.  Each step executes one instruction in every running lane.  The
+lanes are grouped by the instruction word at their sp, so lanes that follow the same control
+flow execute as one vectorized gather, operation and scatter, and lanes that diverge cost one
+extra group per distinct instruction.
+
+A lane that hits an illegal opcode, reads or stores a negative address or computes a value or
+address that does not fit in int64 is marked faulted and stops; the other lanes carry on.  The
+same goes for a lane that reads a word of the program image that does not fit in int64 before
+overwriting it.  Such words are held as 0 in the memory array and tracked per lane.
+
+The memory array only grows up to MAX_DENSE_WORDS words per lane, and the whole array up to
+MAX_DENSE_BYTES, as widening it widens every lane.  Words at higher addresses live in a sparse
+dictionary of the lane that wrote them, so a single lane storing near a huge address costs that
+lane one entry rather than the whole batch its memory.
+"""
+from typing import Dict, List, Sequence, Union
+
+import numpy as np
+
+from .Decoder import decodeInstruction
+from .ProgramCache import PROGRAM_CACHE
+
+INT64_MAX = np.iinfo(np.int64).max
+INT64_MIN = np.iinfo(np.int64).min
+MULTIPLY_SAFE_LIMIT = 3037000499  # floor(sqrt(INT64_MAX)), products of smaller magnitudes cannot overflow
+
+# lanes' dense memory is never widened past this many words, nor the whole array past this many
+# bytes, unless the program itself is longer
+MAX_DENSE_WORDS = 1 << 16
+MAX_DENSE_BYTES = 1 << 26
+WORD_BYTES = 8
+
+
+class BatchComputer:
+    """
+    Runs a batch of Intcode machines over the same program in lockstep
+    """
+    OP_1 = 1
+    OP_2 = 2
+    OP_3 = 3
+    OP_4 = 4
+    OP_5 = 5
+    OP_6 = 6
+    OP_7 = 7
+    OP_8 = 8
+    OP_9 = 9
+    OP_STOP = 99
+
+    MODE_POSITION = 0
+    MODE_IMMEDIATE = 1
+    MODE_RELATIVE = 2
+
+    def __init__(self, inputFile: str, numLanes: int):
+        self.inputFile = inputFile
+        self.numLanes = numLanes
+        self.program = None
+        self.denseLimit = None
+        self.sparse = None
+        self.oversizedAddresses = None
+        self.oversizedLive = None
+        self.sp = None
+        self.relativeBase = None
+        self.halted = None
+        self.faulted = None
+        self.inputs = None
+        self.inputCounter = None
+        self.outputs = None
+
+        self.reset()
+
+    def reset(self):
+        """
+        Reloads the program into every lane and clears the machine state
+        """
+        image = PROGRAM_CACHE.load(self.inputFile)
+        oversized = [address for address, word in enumerate(image) if not INT64_MIN <= word <= INT64_MAX]
+        words = np.array([0 if not INT64_MIN <= word <= INT64_MAX else word for word in image] if oversized else image,
+                         dtype=np.int64)
+        self.program = np.tile(words, (self.numLanes, 1))
+        # image words that do not fit fault a lane that reads them until the lane overwrites them
+        self.oversizedAddresses = np.array(oversized, dtype=np.int64)
+        self.oversizedLive = np.ones((self.numLanes, len(oversized)), dtype=bool)
+        self.denseLimit = max(min(MAX_DENSE_WORDS, MAX_DENSE_BYTES // (WORD_BYTES * self.numLanes)), len(image))
+        self.sparse: List[Dict[int, int]] = [dict() for _ in range(self.numLanes)]  # address -> word, per lane
+        self.sp = np.zeros(self.numLanes, dtype=np.int64)
+        self.relativeBase = np.zeros(self.numLanes, dtype=np.int64)
+        self.halted = np.zeros(self.numLanes, dtype=bool)
+        self.faulted = np.zeros(self.numLanes, dtype=bool)
+        self.inputs = None
+        self.inputCounter = np.zeros(self.numLanes, dtype=np.int64)
+        self.outputs: List[List[int]] = [list() for _ in range(self.numLanes)]
+
+    def initialize(self, values1: Union[Sequence[int], np.ndarray], values2: Union[Sequence[int], np.ndarray]):
+        """
+        Initializes every lane for execution, one value of each sequence per lane
+        """
+        self.program[:, 1] = values1
+        self.program[:, 2] = values2
+        self._overwritten(np.arange(self.numLanes), np.ones(self.numLanes, dtype=np.int64))
+        self._overwritten(np.arange(self.numLanes), np.full(self.numLanes, 2, dtype=np.int64))
+
+    def setInputs(self, inputs: Union[Sequence[Sequence[int]], np.ndarray]):
+        """
+        Sets the program inputs, one row per lane.  As with IntcodeComputer a lane that has
+        consumed all of its inputs keeps reading its last one.
+        """
+        self.inputs = np.array(inputs, dtype=np.int64).reshape(self.numLanes, -1)
+        self.inputCounter[:] = 0
+
+    def execute(self, maxSteps: Union[int, None] = None) -> int:
+        """
+        Executes every lane until it halts or faults
+        :param maxSteps: optional limit on the number of lockstep steps
+        :return: the number of lockstep steps taken
+        """
+        steps = 0
+        while maxSteps is None or steps < maxSteps:
+            running = np.flatnonzero(~self.halted)
+            if running.size == 0:
+                break
+
+            words, groups = np.unique(self._read(running, self.sp[running]), return_inverse=True)
+            for index, word in enumerate(words.tolist()):
+                self._executeWord(word, running[groups.reshape(-1) == index])
+
+            steps += 1
+
+        return steps
+
+    def _executeWord(self, word: int, lanes: np.ndarray):
+        """
+        Executes one instruction word in a group of lanes
+        """
+        opcode, firstParameterMode, secondParameterMode, thirdParameterMode = decodeInstruction(word)
+        sp = self.sp[lanes]
+        faults = np.zeros(lanes.size, dtype=bool)
+
+        if opcode == self.OP_STOP:
+            self.halted[lanes] = True
+        elif opcode in (self.OP_1, self.OP_2, self.OP_7, self.OP_8):
+            value1 = self._value(lanes, sp + 1, firstParameterMode, faults)
+            value2 = self._value(lanes, sp + 2, secondParameterMode, faults)
+            if opcode == self.OP_1:
+                result = self._add(value1, value2, faults)
+            elif opcode == self.OP_2:
+                result = self._multiply(value1, value2, faults)
+            elif opcode == self.OP_7:
+                result = (value1 < value2).astype(np.int64)
+            else:
+                result = (value1 == value2).astype(np.int64)
+
+            self._store(lanes, sp + 3, thirdParameterMode, result, faults)
+            self.sp[lanes] = sp + 4
+        elif opcode == self.OP_3:
+            if self.inputs is None:
+                raise RuntimeError('Batch lanes read input but no inputs were set')
+
+            counter = self.inputCounter[lanes]
+            value = self.inputs[lanes, np.minimum(counter, self.inputs.shape[1] - 1)]
+            self.inputCounter[lanes] = np.minimum(counter + 1, self.inputs.shape[1])
+
+            self._store(lanes, sp + 1, firstParameterMode, value, faults)
+            self.sp[lanes] = sp + 2
+        elif opcode == self.OP_4:
+            value = self._value(lanes, sp + 1, firstParameterMode, faults)
+            for lane, output, fault in zip(lanes.tolist(), value.tolist(), faults.tolist()):
+                if not fault:
+                    self.outputs[lane].append(output)
+            self.sp[lanes] = sp + 2
+        elif opcode in (self.OP_5, self.OP_6):
+            value1 = self._value(lanes, sp + 1, firstParameterMode, faults)
+            value2 = self._value(lanes, sp + 2, secondParameterMode, faults)
+            jump = value1 != 0 if opcode == self.OP_5 else value1 == 0
+            self.sp[lanes] = np.where(jump, value2, sp + 3)
+        elif opcode == self.OP_9:
+            value = self._value(lanes, sp + 1, firstParameterMode, faults)
+            relativeBase = self.relativeBase[lanes]
+            self.relativeBase[lanes] = np.where(faults, relativeBase, self._add(relativeBase, value, faults))
+            self.sp[lanes] = sp + 2
+        else:
+            faults[:] = True
+
+        # faulted lanes stay at the instruction that faulted
+        self.sp[lanes[faults]] = sp[faults]
+        self._fault(lanes[faults])
+
+    def _value(self, lanes: np.ndarray, parameterPtrs: np.ndarray, mode: int, faults: np.ndarray) -> np.ndarray:
+        """
+        Reads the value of a parameter in every lane
+        """
+        parameters = self._read(lanes, parameterPtrs, faults)
+        if mode == self.MODE_IMMEDIATE:
+            return parameters
+        elif mode == self.MODE_POSITION:
+            addresses = parameters
+        elif mode == self.MODE_RELATIVE:
+            addresses = self._add(self.relativeBase[lanes], parameters, faults)
+        else:
+            faults[:] = True
+            return parameters
+
+        faults |= addresses < 0
+        return self._read(lanes, addresses, faults)
+
+    def _store(self, lanes: np.ndarray, parameterPtrs: np.ndarray, mode: int, values: np.ndarray, faults: np.ndarray):
+        """
+        Stores one value per lane at the address given by a parameter.  Lanes that have faulted
+        earlier in the instruction do not store.
+        """
+        addresses = self._read(lanes, parameterPtrs, faults)
+        if mode == self.MODE_RELATIVE:
+            addresses = self._add(self.relativeBase[lanes], addresses, faults)
+
+        faults |= addresses < 0
+        valid = ~faults
+        if not valid.any():
+            return
+
+        lanes = lanes[valid]
+        addresses = addresses[valid]
+        values = values[valid]
+        self._overwritten(lanes, addresses)
+
+        dense = addresses < self.denseLimit
+        if not dense.all():
+            for lane, address, value in zip(lanes[~dense].tolist(), addresses[~dense].tolist(), values[~dense].tolist()):
+                self.sparse[lane][address] = value
+
+            lanes = lanes[dense]
+            addresses = addresses[dense]
+            values = values[dense]
+            if lanes.size == 0:
+                return
+
+        self._grow(int(addresses.max()) + 1)
+        self.program[lanes, addresses] = values
+
+    def _read(self, lanes: np.ndarray, addresses: np.ndarray, faults: Union[np.ndarray, None] = None) -> np.ndarray:
+        """
+        Gathers one word per lane.  Addresses outside memory read as 0 unless the lane stored
+        there sparsely.  Instructions fault the lanes whose operands are at negative addresses,
+        which read as 0 here.  Lanes that read an image word that does not fit in int64 are
+        flagged in faults; instruction words read as 0, which is an illegal opcode.
+        """
+        if faults is not None and self.oversizedAddresses.size:
+            faults |= self._oversized(lanes, addresses)
+
+        width = self.program.shape[1]
+        inRange = (addresses >= 0) & (addresses < width)
+        if inRange.all():
+            return self.program[lanes, addresses]
+
+        values = np.zeros(lanes.size, dtype=np.int64)
+        values[inRange] = self.program[lanes[inRange], addresses[inRange]]
+
+        sparse = np.flatnonzero(addresses >= self.denseLimit)
+        for index, lane, address in zip(sparse.tolist(), lanes[sparse].tolist(), addresses[sparse].tolist()):
+            values[index] = self.sparse[lane].get(address, 0)
+
+        return values
+
+    def _oversized(self, lanes: np.ndarray, addresses: np.ndarray) -> np.ndarray:
+        """
+        Whether each lane's address holds an image word that does not fit in int64
+        """
+        indices = np.searchsorted(self.oversizedAddresses, addresses)
+        indices = np.minimum(indices, self.oversizedAddresses.size - 1)
+        return (self.oversizedAddresses[indices] == addresses) & self.oversizedLive[lanes, indices]
+
+    def _overwritten(self, lanes: np.ndarray, addresses: np.ndarray):
+        """
+        Records stores over image words that do not fit in int64
+        """
+        if not self.oversizedAddresses.size:
+            return
+
+        hits = self._oversized(lanes, addresses)
+        if hits.any():
+            self.oversizedLive[lanes[hits], np.searchsorted(self.oversizedAddresses, addresses[hits])] = False
+
+    def _grow(self, width: int):
+        """
+        Widens every lane's memory to at least the given number of words, which is at most
+        denseLimit
+        """
+        if width <= self.program.shape[1]:
+            return
+
+        width = min(max(width, 2 * self.program.shape[1]), self.denseLimit)
+        grown = np.zeros((self.numLanes, width), dtype=np.int64)
+        grown[:, :self.program.shape[1]] = self.program
+        self.program = grown
+
+    def _fault(self, lanes: np.ndarray):
+        """
+        Stops lanes that cannot continue
+        """
+        self.faulted[lanes] = True
+        self.halted[lanes] = True
+
+    @staticmethod
+    def _add(value1: np.ndarray, value2: np.ndarray, faults: np.ndarray) -> np.ndarray:
+        """
+        Adds two vectors, faulting the lanes whose sum overflows int64
+        """
+        result = value1 + value2
+        faults |= ((value1 ^ result) & (value2 ^ result)) < 0
+        return result
+
+    @staticmethod
+    def _multiply(value1: np.ndarray, value2: np.ndarray, faults: np.ndarray) -> np.ndarray:
+        """
+        Multiplies two vectors, faulting the lanes whose product overflows int64
+        """
+        result = value1 * value2
+        unsafe = np.flatnonzero((value1 > MULTIPLY_SAFE_LIMIT) | (value1 < -MULTIPLY_SAFE_LIMIT) |
+                                (value2 > MULTIPLY_SAFE_LIMIT) | (value2 < -MULTIPLY_SAFE_LIMIT))
+        for index in unsafe.tolist():
+            product = int(value1[index]) * int(value2[index])
+            if not INT64_MIN <= product <= INT64_MAX:
+                faults[index] = True
+
+        return result
@@ -0,0 +1,446 @@
+"""
+Basic block compiler for the Intcode computer
+
+The program is split into basic blocks at the first jump, I/O instruction, halt or
+instruction that cannot be compiled, and each block is turned into a Python function that
+runs its straight line of instructions with every parameter baked in as a constant.
+
+A block is called as block(pages, writablePages, codeAddresses, relativeBase) and returns
+(sp, relativeBase, completed).  When completed is False the instruction at sp has not been
+executed and the caller must hand it to the reference opcode; this happens for I/O and halt,
+for page faults (unallocated, shared or straddled pages), for stores of values that do not fit
+a typed memory and for stores into compiled code.
+
+Intcode can modify itself, so every address covered by a compiled block is tracked:
+    * stores with a constant address are checked when the block is compiled, and a block
+      that stores into code stops before that instruction
+    * relative mode stores are checked against codeAddresses when they run
+    * writes made through PagedMemory (reference opcodes and the host) are watched by the
+      memory, which calls invalidate()
+    * stores made straight into the page tables by the dispatch loop's slices are found by
+      revalidate(), which compares the pages they wrote with a fork taken before the slice
+and the blocks covering a modified address are dropped and recompiled on their next entry.
+A parameter word that has been modified once is read from memory at run time from then on.
+
+Blocks whose words match the program image they were loaded from survive rebind(), so a
+machine that is reset to the same image does not recompile its unmodified code.  A forked
+machine starts from a fork() of its parent's compiler, and retarget() moves a compiler to a
+restored snapshot, dropping only the blocks whose words differ in it.  Blocks translated
+ahead of time by the Translator are installed with seed() and are invalidated the same way
+as the blocks compiled at run time.
+
+With summarizeLoops, a block that jumps back to its own entry is a counted loop when every word
+it writes has a closed form, see LoopSummarizer; such a block starts with a prologue that runs
+all of the loop's iterations at once and falls back to running one iteration when the
+prologue's guards do not hold.  The real programs' hot loops span several blocks, so this is
+off by default and only pays off for tight single block loops.
+"""
+import copy
+from typing import Callable, Dict, List, Sequence, Set, Tuple, Union
+
+from .Decoder import DECODE_TABLE
+from .LoopSummarizer import summarizeLoop
+from .Memory import PagedMemory, PAGE_SHIFT, PAGE_MASK
+
+MODE_POSITION = 0
+MODE_IMMEDIATE = 1
+MODE_RELATIVE = 2
+
+MAX_BLOCK_INSTRUCTIONS = 64
+
+_STORING_OPCODES = {1: '{value1} + {value2}',
+                    2: '{value1} * {value2}',
+                    7: '1 if {value1} < {value2} else 0',
+                    8: '1 if {value1} == {value2} else 0'}
+_JUMP_OPCODES = {5: '!=',
+                 6: '=='}
+_RELATIVE_BASE_OPCODE = 9
+
+# (address, opcode, modes, parameters)
+Instruction = Tuple[int, int, Tuple[int, ...], Tuple[Union[int, None], ...]]
+
+# block(pages, writablePages, codeAddresses, relativeBase) -> (sp, relativeBase, completed)
+Block = Callable[[dict, dict, dict, int], Tuple[int, int, bool]]
+
+# compiled functions keyed by their source, so identical blocks are only exec'd once per process
+_FUNCTION_CACHE: Dict[str, Block] = dict()
+
+
+def _compileSource(source: str) -> Block:
+    """
+    Compiles block source into a function, reusing an earlier compilation of the same source
+    """
+    function = _FUNCTION_CACHE.get(source)
+    if function is None:
+        namespace = dict()
+        exec(source, namespace)
+        function = namespace['block']
+        _FUNCTION_CACHE[source] = function
+
+    return function
+
+
+class BlockCompiler:
+    """
+    Compiles and caches the basic blocks of one machine's memory
+    """
+    def __init__(self,
+                 memory: PagedMemory,
+                 image: Union[Sequence[int], None] = None,
+                 keepSources: bool = False,
+                 summarizeLoops: bool = False):
+        self.memory = None
+        self.image = image
+        self.keepSources = keepSources
+        self.summarizeLoops = summarizeLoops
+        self.sources: Dict[int, Tuple[str, List[Instruction]]] = dict()  # entry point -> (source, instructions), if kept
+        self.blocks: Dict[int, Block] = dict()
+        self.blockAddresses: Dict[int, Tuple[int, ...]] = dict()
+        self.codeAddresses: Dict[int, Set[int]] = dict()  # address -> entry points of the blocks covering it
+        self.constantStores: Dict[int, Set[int]] = dict()  # address -> entry points of the blocks storing to it
+        self.blockedStores: Dict[int, Set[int]] = dict()  # code address -> entry points of the blocks cut short by a store to it
+        self.volatileAddresses: Set[int] = set()  # parameter words that have been patched at run time
+        self.pristineBlocks: Set[int] = set()  # entry points of the blocks compiled from unmodified image words
+
+        self.rebind(memory)
+
+    def rebind(self, memory: PagedMemory):
+        """
+        Moves the compiler to a freshly loaded memory, keeping only the blocks compiled from
+        unmodified image words
+        """
+        for entry in list(self.blocks):
+            if entry not in self.pristineBlocks:
+                self._drop(entry)
+
+        self._bind(memory)
+
+    def retarget(self, memory: PagedMemory):
+        """
+        Moves the compiler to a memory holding another state of the same machine, e.g. a
+        restored snapshot, keeping every block whose words are the same in both memories
+        """
+        for address in self._changedAddresses(self.memory, memory):
+            for entry in list(self.codeAddresses.get(address, ())):
+                self._drop(entry)
+
+        self._bind(memory)
+
+    def revalidate(self, previous: PagedMemory):
+        """
+        Invalidates the blocks covering words that were stored straight into the page tables
+        of the compiler's memory, bypassing PagedMemory, since previous was forked from it.  The
+        dispatch loop's handlers store this way.
+        """
+        for address in self._changedAddresses(previous, self.memory):
+            self.invalidate(address)
+
+    def _changedAddresses(self, previous: PagedMemory, memory: PagedMemory) -> List[int]:
+        """
+        The code addresses whose words differ between two memories.  Pages that are still
+        shared copy-on-write between the memories are skipped without reading them.
+        """
+        samePages = dict()
+        changed = list()
+        for address in self.codeAddresses:
+            pageNumber = address >> PAGE_SHIFT
+            same = samePages.get(pageNumber)
+            if same is None:
+                same = previous.pages.get(pageNumber) is memory.pages.get(pageNumber)
+                samePages[pageNumber] = same
+
+            if not same and previous[address] != memory[address]:
+                changed.append(address)
+
+        return changed
+
+    def fork(self, memory: PagedMemory) -> 'BlockCompiler':
+        """
+        Makes a compiler for a copy-on-write clone of this compiler's memory.  The clone starts
+        with every block compiled so far and tracks its own invalidations from then on.
+        """
+        clone = copy.copy(self)
+        clone.sources = dict(self.sources)
+        clone.blocks = dict(self.blocks)
+        clone.blockAddresses = dict(self.blockAddresses)
+        clone.codeAddresses = {address: set(entries) for address, entries in self.codeAddresses.items()}
+        clone.constantStores = {address: set(entries) for address, entries in self.constantStores.items()}
+        clone.blockedStores = {address: set(entries) for address, entries in self.blockedStores.items()}
+        clone.volatileAddresses = set(self.volatileAddresses)
+        clone.pristineBlocks = set(self.pristineBlocks)
+        clone._bind(memory)
+
+        return clone
+
+    def _bind(self, memory: PagedMemory):
+        """
+        Compiles against a memory and watches its code addresses
+        """
+        self.memory = memory
+        memory.watchedAddresses = self.codeAddresses
+        memory.onWatchedWrite = self.invalidate
+
+    def compileBlock(self, entry: int) -> Block:
+        """
+        Compiles the basic block entered at the given address
+        """
+        instructions = self._decodeBlock(entry)
+
+        addresses = [entry]
+        for instruction in instructions:
+            addresses.extend(_bakedAddresses(instruction))
+        addresses = tuple(sorted(set(addresses)))
+
+        self.blocks[entry] = None
+        self.blockAddresses[entry] = addresses
+        if self.image is not None and all(0 <= address < len(self.image) and self.image[address] == self.memory[address]
+                                          for address in addresses):
+            self.pristineBlocks.add(entry)
+
+        for address in addresses:
+            self.codeAddresses.setdefault(address, set()).add(entry)
+            for storingEntry in self.constantStores.pop(address, ()):
+                if storingEntry != entry:
+                    self._drop(storingEntry)
+
+        if entry not in self.blockAddresses:
+            # dropping a storing block freed an address this block had stopped short of, so
+            # untrack the addresses registered since then and decode the block again
+            self.blocks[entry] = None
+            self.blockAddresses[entry] = addresses
+            self._drop(entry)
+            return self.compileBlock(entry)
+
+        source = self._generateSource(entry, instructions)
+        if self.keepSources:
+            self.sources[entry] = (source, instructions)
+
+        block = _compileSource(source)
+        self.blocks[entry] = block
+
+        return block
+
+    def seed(self, translation: dict):
+        """
+        Installs the blocks of a program translated ahead of time.  Blocks whose words no longer
+        match memory, e.g. because the host patched the program before running it, are skipped
+        and compiled at run time instead.
+        :param translation: namespace of a module generated by the Translator
+        """
+        memory = self.memory
+        installed = set()
+        for entry, block in translation['BLOCKS'].items():
+            addresses = translation['BLOCK_ADDRESSES'][entry]
+            if entry in self.blockAddresses or any(memory[address] != value for address, value in addresses):
+                continue
+
+            self.blocks[entry] = block
+            self.blockAddresses[entry] = tuple(address for address, _ in addresses)
+            self.pristineBlocks.add(entry)
+            for address, _ in addresses:
+                self.codeAddresses.setdefault(address, set()).add(entry)
+            installed.add(entry)
+
+        for table, seeded in ((self.constantStores, translation['CONSTANT_STORES']),
+                              (self.blockedStores, translation['BLOCKED_STORES'])):
+            for address, entries in seeded.items():
+                entries = installed.intersection(entries)
+                if entries:
+                    table.setdefault(address, set()).update(entries)
+
+        self.volatileAddresses.update(translation['VOLATILE_ADDRESSES'])
+
+    def invalidate(self, address: int):
+        """
+        Drops every block covering an address that has just been written.  The address is
+        remembered as volatile, so blocks compiled from now on read it at run time instead of
+        baking it in; this keeps the common patch-an-operand idiom from recompiling forever.
+        """
+        self.volatileAddresses.add(address)
+        for entry in list(self.codeAddresses.get(address, ())):
+            self._drop(entry)
+
+    def _drop(self, entry: int):
+        """
+        Forgets a compiled block
+        """
+        if entry not in self.blockAddresses:
+            return
+
+        del self.blocks[entry]
+        self.pristineBlocks.discard(entry)
+        for address in self.blockAddresses.pop(entry):
+            entries = self.codeAddresses.get(address)
+            if entries is not None:
+                entries.discard(entry)
+                if not entries:
+                    del self.codeAddresses[address]
+
+                    # blocks that stopped short of storing here can now run further
+                    for blockedEntry in self.blockedStores.pop(address, ()):
+                        self._drop(blockedEntry)
+
+    def _decodeBlock(self, entry: int) -> List[Instruction]:
+        """
+        Decodes the compilable straight line of instructions starting at entry.  Volatile
+        parameters are left as None so that they are read at run time.
+        :return: list of (address, opcode, modes, parameters)
+        """
+        memory = self.memory
+        instructions = list()
+        bakedAddresses = set()
+        blockStores = set()
+        sp = entry
+        while len(instructions) < MAX_BLOCK_INSTRUCTIONS:
+            decoded = DECODE_TABLE.get(memory[sp])
+            if decoded is None:
+                break
+
+            opcode, firstParameterMode, secondParameterMode, thirdParameterMode = decoded
+            if opcode in _STORING_OPCODES:
+                numParameters = 3
+            elif opcode in _JUMP_OPCODES:
+                numParameters = 2
+            elif opcode == _RELATIVE_BASE_OPCODE:
+                numParameters = 1
+            else:
+                break
+
+            parameters = tuple(None if address in blockStores or self._isVolatile(address) else memory[address]
+                               for address in range(sp + 1, sp + 1 + numParameters))
+            modes = (firstParameterMode, secondParameterMode, thirdParameterMode)[:numParameters]
+            instruction = (sp, opcode, modes, parameters)
+            bakedAddresses.update(_bakedAddresses(instruction))
+
+            storeAddress = _constantStoreAddress(instruction)
+            if storeAddress is not None and (storeAddress in bakedAddresses or storeAddress in self.codeAddresses):
+                # stores straight into compiled code, so leave it to the reference opcode
+                self.blockedStores.setdefault(storeAddress, set()).add(entry)
+                break
+
+            instructions.append(instruction)
+            if storeAddress is not None:
+                blockStores.add(storeAddress)
+            sp += 1 + numParameters
+
+            if opcode in _JUMP_OPCODES:
+                break
+
+        # a store into a later instruction of the same block also ends the block
+        for index, instruction in enumerate(instructions):
+            storeAddress = _constantStoreAddress(instruction)
+            if storeAddress in bakedAddresses:
+                self.blockedStores.setdefault(storeAddress, set()).add(entry)
+                del instructions[index:]
+                break
+
+        return instructions
+
+    def _isVolatile(self, address: int) -> bool:
+        """
+        Whether a parameter word should be read at run time rather than baked in: it has been
+        patched before, it has already been written since the image was loaded, or a compiled
+        block stores to it
+        """
+        if address in self.volatileAddresses:
+            return True
+
+        if (address in self.constantStores or
+                self.image is not None and 0 <= address < len(self.image) and self.image[address] != self.memory[address]):
+            self.volatileAddresses.add(address)
+            return True
+
+        return False
+
+    def _generateSource(self, entry: int, instructions: List[Instruction]) -> str:
+        """
+        Generates the source of a block function
+        """
+        lines = ['def block(pages, writablePages, codeAddresses, relativeBase):',
+                 f'    sp = {entry}',
+                 '    try:']
+        summary = summarizeLoop(entry, instructions) if self.summarizeLoops else None
+        if summary is not None:
+            lines.extend(summary)
+
+        nextSp = entry
+        for sp, opcode, modes, parameters in instructions:
+            lines.append(f'        sp = {sp}')
+            nextSp = sp + 1 + len(parameters)
+
+            raw = list()
+            for index, parameter in enumerate(parameters):
+                if parameter is None:
+                    address = sp + 1 + index
+                    lines.append(f'        parameter{index} = pages[{address >> PAGE_SHIFT}][{address & PAGE_MASK}]')
+                    raw.append(f'parameter{index}')
+                else:
+                    raw.append(str(parameter))
+
+            if opcode in _STORING_OPCODES:
+                value = _STORING_OPCODES[opcode].format(value1=_valueSource(raw[0], modes[0]),
+                                                        value2=_valueSource(raw[1], modes[1]))
+                storeAddress = _constantStoreAddress((sp, opcode, modes, parameters))
+                if storeAddress is None:
+                    if modes[2] == MODE_RELATIVE:
+                        lines.append(f'        address = relativeBase + {raw[2]}')
+                    else:
+                        lines.append(f'        address = {raw[2]}')
+                    lines.append('        if address in codeAddresses:')
+                    lines.append('            return sp, relativeBase, False')
+                    lines.append(f'        writablePages[address >> {PAGE_SHIFT}][address & {PAGE_MASK}] = {value}')
+                else:
+                    self.constantStores.setdefault(storeAddress, set()).add(entry)
+                    lines.append(f'        writablePages[{storeAddress >> PAGE_SHIFT}][{storeAddress & PAGE_MASK}] = {value}')
+            elif opcode in _JUMP_OPCODES:
+                lines.append(f'        if {_valueSource(raw[0], modes[0])} {_JUMP_OPCODES[opcode]} 0:')
+                lines.append(f'            return {_valueSource(raw[1], modes[1])}, relativeBase, True')
+                lines.append(f'        return {nextSp}, relativeBase, True')
+            else:
+                lines.append(f'        relativeBase += {_valueSource(raw[0], modes[0])}')
+
+        lastOpcode = instructions[-1][1] if instructions else None
+        if lastOpcode not in _JUMP_OPCODES:
+            # stopped at an instruction that the reference opcode has to run
+            lines.append(f'        return {nextSp}, relativeBase, {len(instructions) == MAX_BLOCK_INSTRUCTIONS}')
+
+        lines.append('    except (LookupError, OverflowError):')
+        lines.append('        return sp, relativeBase, False')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _bakedAddresses(instruction: Instruction) -> List[int]:
+    """
+    The addresses whose words are baked into the compiled instruction
+    """
+    sp, _, _, parameters = instruction
+    return [sp] + [sp + 1 + index for index, parameter in enumerate(parameters) if parameter is not None]
+
+
+def _constantStoreAddress(instruction: Instruction) -> Union[int, None]:
+    """
+    The address a storing instruction writes to, if it is known at compile time
+    """
+    _, opcode, modes, parameters = instruction
+    if opcode not in _STORING_OPCODES or modes[2] == MODE_RELATIVE:
+        return None
+
+    return parameters[2]
+
+
+def _valueSource(parameter: str, mode: int) -> str:
+    """
+    Expression that reads a parameter in the given mode, where parameter is either a literal
+    or the name of a local holding a volatile parameter
+    """
+    if mode == MODE_POSITION:
+        if parameter.lstrip('-').isdigit():
+            address = int(parameter)
+            return f'pages[{address >> PAGE_SHIFT}][{address & PAGE_MASK}]'
+
+        return f'pages[{parameter} >> {PAGE_SHIFT}][{parameter} & {PAGE_MASK}]'
+    elif mode == MODE_IMMEDIATE:
+        return parameter
+    else:
+        return f'pages[(relativeBase + {parameter}) >> {PAGE_SHIFT}][(relativeBase + {parameter}) & {PAGE_MASK}]'
@@ -0,0 +1,110 @@
+"""
+Bounded input channel for the Intcode computer
+"""
+from collections import deque
+from typing import Iterable, Union
+
+
+class InputChannel:
+    """
+    FIFO of pending input values.  Values are dropped as they are consumed, so memory stays
+    flat however long an interactive session runs, and the queue refuses values beyond
+    maxLength rather than growing without bound.
+
+    What an empty channel does depends on its policy:
+        * POLICY_REPEAT_LAST repeats the last value consumed, as the computer always has
+        * POLICY_DEFAULT supplies defaultValue
+        * POLICY_BLOCK starves, so the computer stops and reports NEEDS_INPUT
+    A channel that has nothing to repeat starves too.
+    """
+    POLICY_BLOCK = 'block'
+    POLICY_DEFAULT = 'default'
+    POLICY_REPEAT_LAST = 'repeatLast'
+    POLICIES = (POLICY_BLOCK, POLICY_DEFAULT, POLICY_REPEAT_LAST)
+
+    DEFAULT_MAX_LENGTH = 1 << 16
+
+    def __init__(self,
+                 values: Iterable[int] = (),
+                 policy: str = POLICY_REPEAT_LAST,
+                 defaultValue: int = 0,
+                 maxLength: int = DEFAULT_MAX_LENGTH):
+        if policy not in self.POLICIES:
+            raise ValueError(f'Unknown input policy {policy}')
+
+        self.queue = deque()
+        self.policy = policy
+        self.defaultValue = defaultValue
+        self.maxLength = maxLength
+        self.lastValue = None
+        self.consumed = 0
+
+        self.extend(values)
+
+    def __len__(self) -> int:
+        return len(self.queue)
+
+    def put(self, value: int):
+        """
+        Queues a value
+        """
+        if len(self.queue) >= self.maxLength:
+            raise RuntimeError(f'Input channel is full ({self.maxLength} pending values)')
+
+        self.queue.append(value)
+
+    def extend(self, values: Iterable[int]):
+        """
+        Queues several values
+        """
+        for value in values:
+            self.put(value)
+
+    def clear(self):
+        """
+        Drops every pending value and forgets the last value consumed
+        """
+        self.queue.clear()
+        self.lastValue = None
+
+    @property
+    def isEmpty(self) -> bool:
+        """
+        Whether no value is pending
+        """
+        return not self.queue
+
+    @property
+    def isStarved(self) -> bool:
+        """
+        Whether get() has nothing to return under the channel's policy
+        """
+        return not self.queue and (self.policy == self.POLICY_BLOCK or
+                                   self.policy == self.POLICY_REPEAT_LAST and self.lastValue is None)
+
+    def get(self) -> Union[int, None]:
+        """
+        Takes the next value, applying the policy if the channel is empty
+        :return: the value, or None if the channel is starved
+        """
+        if self.queue:
+            self.lastValue = self.queue.popleft()
+            self.consumed += 1
+            return self.lastValue
+        elif self.policy == self.POLICY_DEFAULT:
+            return self.defaultValue
+        elif self.policy == self.POLICY_REPEAT_LAST:
+            return self.lastValue
+
+        return None
+
+    def copy(self) -> 'InputChannel':
+        """
+        Makes an independent copy, pending values included
+        """
+        channel = InputChannel(policy=self.policy, defaultValue=self.defaultValue, maxLength=self.maxLength)
+        channel.queue = deque(self.queue)
+        channel.lastValue = self.lastValue
+        channel.consumed = self.consumed
+
+        return channel
@@ -0,0 +1,189 @@
+"""
+Checkpoint files for the Intcode computer
+
+A checkpoint is laid out for memory mapping rather than parsing, every section little-endian
+and 8 byte aligned:
+    * a fixed header (HEADER_DTYPE) with the program hash, registers, instruction count and section lengths
+    * the allocated page numbers, then each page as PAGE_SIZE int64 words
+    * the pending inputs and pending outputs as int64 words
+    * a JSON trailer with the input channel settings and any value that does not fit in
+      int64, which is stored as 0 in its section and patched in from the trailer
+so restoring a machine maps the file and converts each page with a single tolist().
+
+Files are written to a temporary path and renamed into place, so a crash while saving leaves
+the previous checkpoint intact.
+"""
+import json
+import os
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+from .Memory import PAGE_SIZE
+
+CHECKPOINT_MAGIC = b'ICCKPT02'
+
+HEADER_DTYPE = np.dtype([('magic', 'S8'),
+                         ('imageHash', 'S64'),
+                         ('sp', '<i8'),
+                         ('relativeBase', '<i8'),
+                         ('halted', '<i8'),
+                         ('instructionCount', '<i8'),
+                         ('numPages', '<i8'),
+                         ('numInputs', '<i8'),
+                         ('numOutputs', '<i8'),
+                         ('trailerLength', '<i8')])
+
+WORD_DTYPE = np.dtype('<i8')
+
+INT64_MIN = np.iinfo(np.int64).min
+INT64_MAX = np.iinfo(np.int64).max
+
+SECTION_PAGES = 'pages'
+SECTION_INPUTS = 'inputs'
+SECTION_OUTPUTS = 'outputs'
+
+
+class CheckpointState(NamedTuple):
+    """
+    Machine state held by a checkpoint
+    """
+    imageHash: str
+    sp: int
+    relativeBase: int
+    halted: bool
+    instructionCount: int
+    pages: Dict[int, List[int]]
+    inputs: List[int]
+    outputs: List[int]
+    channel: dict
+
+
+def writeCheckpoint(path: str, state: CheckpointState):
+    """
+    Writes a checkpoint file, replacing any previous file atomically
+    """
+    pageNumbers = sorted(state.pages)
+    overflow = list()
+    sections = [np.array(pageNumbers, dtype=WORD_DTYPE),
+                _pack(SECTION_PAGES, [value for pageNumber in pageNumbers for value in state.pages[pageNumber]], overflow),
+                _pack(SECTION_INPUTS, state.inputs, overflow),
+                _pack(SECTION_OUTPUTS, state.outputs, overflow)]
+
+    trailer = json.dumps({'channel': state.channel, 'overflow': overflow}).encode()
+
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header['magic'] = CHECKPOINT_MAGIC
+    header['imageHash'] = state.imageHash.encode()
+    header['sp'] = state.sp
+    header['relativeBase'] = state.relativeBase
+    header['halted'] = state.halted
+    header['instructionCount'] = state.instructionCount
+    header['numPages'] = len(pageNumbers)
+    header['numInputs'] = len(state.inputs)
+    header['numOutputs'] = len(state.outputs)
+    header['trailerLength'] = len(trailer)
+
+    temporaryPath = f'{path}.{os.getpid()}.tmp'
+    with open(temporaryPath, 'wb') as file:
+        file.write(header.tobytes())
+        for section in sections:
+            file.write(section.tobytes())
+        file.write(trailer)
+    os.replace(temporaryPath, path)
+
+
+def readCheckpoint(path: str) -> CheckpointState:
+    """
+    Maps a checkpoint file and reads the machine state from it
+    """
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+    if data.size < HEADER_DTYPE.itemsize:
+        raise RuntimeError(f'{path} is not an Intcode checkpoint')
+
+    header = np.frombuffer(data, dtype=HEADER_DTYPE, count=1)[0]
+    if header['magic'] != CHECKPOINT_MAGIC:
+        raise RuntimeError(f'{path} is not an Intcode checkpoint')
+
+    offset = HEADER_DTYPE.itemsize
+    numPages = int(header['numPages'])
+    pageNumbers = np.frombuffer(data, dtype=WORD_DTYPE, count=numPages, offset=offset).tolist()
+    offset += numPages * WORD_DTYPE.itemsize
+
+    words = np.frombuffer(data, dtype=WORD_DTYPE, count=numPages * PAGE_SIZE, offset=offset)
+    pages = {pageNumber: words[index * PAGE_SIZE:(index + 1) * PAGE_SIZE].tolist()
+             for index, pageNumber in enumerate(pageNumbers)}
+    offset += words.nbytes
+
+    inputs = np.frombuffer(data, dtype=WORD_DTYPE, count=int(header['numInputs']), offset=offset).tolist()
+    offset += len(inputs) * WORD_DTYPE.itemsize
+
+    outputs = np.frombuffer(data, dtype=WORD_DTYPE, count=int(header['numOutputs']), offset=offset).tolist()
+    offset += len(outputs) * WORD_DTYPE.itemsize
+
+    trailer = json.loads(bytes(data[offset:offset + int(header['trailerLength'])]))
+    for section, index, value in trailer['overflow']:
+        if section == SECTION_PAGES:
+            pages[pageNumbers[index // PAGE_SIZE]][index % PAGE_SIZE] = value
+        elif section == SECTION_INPUTS:
+            inputs[index] = value
+        else:
+            outputs[index] = value
+
+    return CheckpointState(imageHash=header['imageHash'].decode(),
+                           sp=int(header['sp']),
+                           relativeBase=int(header['relativeBase']),
+                           halted=bool(header['halted']),
+                           instructionCount=int(header['instructionCount']),
+                           pages=pages,
+                           inputs=inputs,
+                           outputs=outputs,
+                           channel=trailer['channel'])
+
+
+class AutoCheckpoint:
+    """
+    Countdown of the instructions until a machine's next automatic checkpoint, set with
+    IntcodeComputer.setAutoCheckpoint().  It holds no reference to the machine, so the machine
+    passes itself in when a checkpoint is due.
+    """
+    def __init__(self, path: str, every: int):
+        self.path = path
+        self.every = every
+        self.counter = 0  # instructions executed since the last checkpoint
+
+    @property
+    def remaining(self) -> int:
+        """
+        The number of instructions until the next checkpoint
+        """
+        return self.every - self.counter
+
+    def advance(self, computer, instructions: int, pendingOutputs: Sequence[int] = ()):
+        """
+        Counts executed instructions, saving a checkpoint of the machine when one is due
+        :param computer: the machine that executed them
+        :param instructions: the number of instructions executed
+        :param pendingOutputs: outputs executed but not yet handed to the caller
+        """
+        self.counter += instructions
+        if self.counter >= self.every:
+            self.counter = 0
+            computer.saveCheckpoint(self.path, pendingOutputs=pendingOutputs)
+
+
+def _pack(section: str, values: Sequence[int], overflow: List[Tuple[str, int, int]]) -> np.ndarray:
+    """
+    Packs values into int64 words, recording the ones that do not fit in overflow
+    """
+    try:
+        return np.array(values, dtype=WORD_DTYPE)
+    except OverflowError:
+        words = np.zeros(len(values), dtype=WORD_DTYPE)
+        for index, value in enumerate(values):
+            if INT64_MIN <= value <= INT64_MAX:
+                words[index] = value
+            else:
+                overflow.append((section, index, value))
+
+        return words
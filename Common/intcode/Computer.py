@@ -0,0 +1,988 @@
+"""
+Intcode computer shared by all of the Intcode days
+"""
+import copy
+import time
+from collections import Counter
+from typing import TYPE_CHECKING, Generator, List, NamedTuple, Sequence, Union, Tuple
+
+from .BlockCompiler import BlockCompiler
+from .Channel import InputChannel
+from .Decoder import PARAMETER_COUNTS, decodeInstruction
+from .Dispatch import HANDLER_TABLE, RELATIVE_BASE_TABLE, fusionTable
+from .Memory import PagedMemory, PAGE_SHIFT, PAGE_MASK, MEMORY_INITIAL_VALUE
+from .ProgramCache import PROGRAM_CACHE
+from .Tracing import TraceHook, printTrace
+from .Translator import imageHash, loadTranslation
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class Snapshot(NamedTuple):
+    """
+    Saved machine state that can be restored any number of times
+    """
+    memory: PagedMemory
+    sp: int
+    relativeBase: int
+    inputChannel: InputChannel
+    instructionCount: int
+
+
+class Signal:
+    """
+    Event other than an output reported by the execution loops
+    """
+    def __init__(self, name: str):
+        self.name = name
+
+    def __repr__(self) -> str:
+        return f'IntcodeComputer.{self.name}'
+
+
+class IntcodeComputer:
+    """
+    Simple Intcode computer
+    """
+    OP_LENGTH_2 = 2
+    OP_LENGTH_3 = 3
+    OP_LENGTH_4 = 4
+    OP_CODE_LENGTH = 2
+
+    OP_1 = 1
+    OP_2 = 2
+    OP_3 = 3
+    OP_4 = 4
+    OP_5 = 5
+    OP_6 = 6
+    OP_7 = 7
+    OP_8 = 8
+    OP_9 = 9
+    OP_STOP = 99
+
+    MODE_POSITION = 0
+    MODE_IMMEDIATE = 1
+    MODE_RELATIVE = 2
+
+    MEMORY_INITIAL_VALUE = MEMORY_INITIAL_VALUE
+
+    PROGRAM_RESULT_PTR = 0
+
+    ENGINE_DISPATCH = 'dispatch'
+    ENGINE_BLOCKS = 'blocks'
+    ENGINE_TRANSLATED = 'translated'
+    DEFAULT_ENGINE = ENGINE_BLOCKS
+
+    MEMORY_LIST = 'list'
+    MEMORY_INT64 = 'int64'
+    DEFAULT_MEMORY = MEMORY_LIST
+
+    NEEDS_INPUT = Signal('NEEDS_INPUT')
+    OUT_OF_BUDGET = Signal('OUT_OF_BUDGET')
+
+    def __init__(self,
+                 inputFile: str,
+                 verboseOuput: bool = False,
+                 engine: Union[str, None] = None,
+                 memory: Union[str, None] = None,
+                 summarizeLoops: bool = False,
+                 maxInputs: int = InputChannel.DEFAULT_MAX_LENGTH):
+        self.inputFile = inputFile
+        self.program = None
+        self.sp = 0
+        self.opcode = None
+        self.firstParameterMode = 0
+        self.secondParameterMode = 0
+        self.thirdParameterMode = 0
+        # setInputs() and appendInput() raise beyond maxInputs pending values
+        self.inputChannel = InputChannel(maxLength=maxInputs)
+        self.relativeBase = 0
+        self.image = None
+        self.blockCompiler = None
+        self.fusedHandlers = None
+        self.fusedImage = None
+        self.fusion = True
+        self.fusionCounts = None
+        self.compileSeconds = 0.0
+        self.blockOnInput = False
+        self.outputBuffer = None
+        self.halted = False
+        self.instructionCount = 0
+        self.traceHook = None
+        self.traceEvery = 1
+        self.traceCounter = 0
+        self.autoCheckpoint = None
+
+        # the blocks and translated engines can run single block counted loops in closed form
+        self.summarizeLoops = summarizeLoops
+
+        self.verboseOutput = verboseOuput
+        self.engine = engine if engine is not None else self.DEFAULT_ENGINE
+        if self.engine not in (self.ENGINE_DISPATCH, self.ENGINE_BLOCKS, self.ENGINE_TRANSLATED):
+            raise ValueError(f'Unknown engine {self.engine}')
+
+        # int64 memory keeps words unboxed until a value outgrows it, see PagedMemory
+        self.memory = memory if memory is not None else self.DEFAULT_MEMORY
+        if self.memory not in (self.MEMORY_LIST, self.MEMORY_INT64):
+            raise ValueError(f'Unknown memory {self.memory}')
+
+        if self.verboseOutput:
+            self.setTraceHook(printTrace)
+
+        self.reset()
+
+    def initialize(self, value1: int, value2: int):
+        """
+        Initializes the program for execution
+        """
+        if self.verboseOutput:
+            print(f'Initializing with {value1} and {value2}')
+
+        self.program[1] = value1
+        self.program[2] = value2
+
+    def setInputs(self, inputs: List[int]):
+        """
+        Sets the program inputs, replacing any inputs that have not been consumed yet.  Raises
+        RuntimeError beyond the machine's maxInputs pending values.
+        """
+        self.inputChannel.clear()
+        self.inputChannel.extend(inputs)
+
+    def appendInput(self, value: int):
+        """
+        Appends an input value to the input channel.  Raises RuntimeError if the channel
+        already holds the machine's maxInputs pending values.
+        """
+        self.inputChannel.put(value)
+
+    def setInputPolicy(self, policy: str, defaultValue: int = 0):
+        """
+        Sets what execute() does when the program reads input and every input has been consumed:
+        repeat the last input (the default), supply a default value, or stop with NEEDS_INPUT.
+        A machine that has never been given an input prompts for one unless it blocks.
+        :param policy: one of the InputChannel.POLICY_* constants
+        :param defaultValue: the value supplied by InputChannel.POLICY_DEFAULT
+        """
+        if policy not in InputChannel.POLICIES:
+            raise ValueError(f'Unknown input policy {policy}')
+
+        self.inputChannel.policy = policy
+        self.inputChannel.defaultValue = defaultValue
+
+    def setFusion(self, enabled: bool, counts: Union[Counter, None] = None):
+        """
+        Turns the dispatch loop's fused pair handlers on or off
+        :param enabled: whether pairs of instructions are fused
+        :param counts: optional counter of the pairs run fused, keyed by (first opcode, second opcode)
+        """
+        self.fusion = enabled
+        self.fusionCounts = counts
+        self.fusedImage = None
+
+    def setTraceHook(self, hook: Union[TraceHook, None], every: int = 1):
+        """
+        Registers a hook called as hook(pc, opcode, modes, operands, result) after each traced
+        instruction.  While a hook is registered execute() runs the traced engine instead of
+        the machine's own engine.
+        :param hook: the hook, or None to remove the current hook
+        :param every: sample every Nth executed instruction instead of every instruction
+        """
+        if every < 1:
+            raise ValueError(f'Trace sampling interval must be at least 1, got {every}')
+
+        self.traceHook = hook
+        self.traceEvery = every
+        self.traceCounter = 0
+
+    def execute(self) -> Union[int, Signal, None]:
+        """
+        Executes the program until the next output or until it halts
+        :return: the output value, None if the program halted, or NEEDS_INPUT if blockOnInput is
+                 set and the program is waiting for an input it does not have
+        """
+        if self.traceHook is not None:
+            return self.executeTraced()
+        elif self.autoCheckpoint is not None:
+            return self.executeCheckpointed()
+        elif self.engine == self.ENGINE_DISPATCH:
+            return self.executeFast()
+
+        return self.executeCompiled()
+
+    def executeTraced(self) -> Union[int, Signal, None]:
+        """
+        Executes the program one instruction at a time with the reference implementation,
+        calling the trace hook for every traceEvery-th instruction.  Operands are only resolved
+        for the sampled instructions.  Automatic checkpoints are counted down as well.
+        :return: the output value, None if the program halted, or NEEDS_INPUT
+        """
+        autoCheckpoint = self.autoCheckpoint
+        while True:
+            self.getOpcodeAndMode()
+            opcode = self.opcode
+            if opcode == self.OP_3 and self.isStarved():
+                return self.NEEDS_INPUT
+
+            self.traceCounter += 1
+            sampled = self.traceCounter >= self.traceEvery
+            if sampled:
+                self.traceCounter = 0
+                pc = self.sp
+                modes = self.getTraceModes()
+                operands = self.getTraceOperands()
+
+            result = None
+            if opcode == self.OP_STOP:
+                self.halted = True
+            elif opcode == self.OP_4:
+                result = self.opcode4()
+            else:
+                self.executeInstruction()
+                if sampled:
+                    result = self.getTraceResult(operands)
+
+            if sampled:
+                self.traceHook(pc, opcode, modes, operands, result)
+
+            if autoCheckpoint is not None:
+                # an output has already been executed but not yet handed to the caller
+                autoCheckpoint.advance(self, 1, pendingOutputs=(result,) if opcode == self.OP_4 else ())
+
+            if opcode == self.OP_STOP:
+                return None
+            elif opcode == self.OP_4:
+                if self.outputBuffer is None:
+                    return result
+                self.outputBuffer.append(result)
+
+    def buildFusedHandlers(self):
+        """
+        Builds the fused handlers of the dispatch loop for the current image, adding the time
+        taken to compileSeconds
+        """
+        start = time.perf_counter()
+        self.fusedHandlers = fusionTable(self.image, self.fusionCounts) if self.fusion else dict()
+        self.fusedImage = self.image
+        self.compileSeconds += time.perf_counter() - start
+
+    def executeFast(self) -> Union[int, Signal, None]:
+        """
+        Executes the program with the table driven dispatch loop.  Addresses where the image
+        has a fusable pair of instructions run both in one fused handler.  The page tables,
+        stack pointer and relative base are kept in locals and only written back when the loop
+        hands an instruction to the reference implementation or returns.
+        :return: the output value, None if the program halted, or NEEDS_INPUT
+        """
+        if self.fusedImage is not self.image:
+            self.buildFusedHandlers()
+
+        getFusedHandler = self.fusedHandlers.get
+        pages = self.program.pages
+        writablePages = self.program.writablePages
+        sp = self.sp
+        relativeBase = self.relativeBase
+        getHandler = HANDLER_TABLE.get
+        getRelativeBaseHandler = RELATIVE_BASE_TABLE.get
+
+        while True:
+            try:
+                code = pages[sp >> PAGE_SHIFT]
+                offset = sp & PAGE_MASK
+
+                fusedHandler = getFusedHandler(sp)
+                if fusedHandler is not None:
+                    state = fusedHandler(pages, writablePages, code, offset, sp, relativeBase)
+                    if state is not None:
+                        sp, relativeBase, _ = state
+                        continue
+
+                instruction = code[offset]
+
+                handler = getHandler(instruction)
+                if handler is not None:
+                    sp = handler(pages, writablePages, code, offset, sp, relativeBase)
+                    continue
+
+                relativeBaseHandler = getRelativeBaseHandler(instruction)
+                if relativeBaseHandler is not None:
+                    relativeBase += relativeBaseHandler(pages, writablePages, code, offset, sp, relativeBase)
+                    sp += self.OP_LENGTH_2
+                    continue
+            except (LookupError, OverflowError):
+                # the instruction straddles a page boundary, touches an unallocated or shared page
+                # or stores a value that does not fit a typed page
+                pass
+
+            self.sp = sp
+            self.relativeBase = relativeBase
+            self.getOpcodeAndMode()
+
+            if self.opcode == self.OP_STOP:
+                self.halted = True
+                return None
+            elif self.opcode == self.OP_4:
+                output = self.opcode4()
+                if self.outputBuffer is None:
+                    return output
+                self.outputBuffer.append(output)
+            elif self.opcode == self.OP_3 and self.isStarved():
+                return self.NEEDS_INPUT
+            else:
+                self.executeInstruction()
+
+            pages = self.program.pages
+            writablePages = self.program.writablePages
+            sp = self.sp
+            relativeBase = self.relativeBase
+
+    def executeCheckpointed(self) -> Union[int, Signal, None]:
+        """
+        Executes the program with executeSlice(), one slice per automatic checkpoint, so a
+        checkpointed machine runs on the dispatch loop rather than the traced engine
+        :return: the output value, None if the program halted, or NEEDS_INPUT
+        """
+        autoCheckpoint = self.autoCheckpoint
+        while True:
+            instructionCount = self.instructionCount
+            result = self.executeSlice(autoCheckpoint.remaining)
+            # an output has already been executed but not yet handed to the caller
+            pendingOutputs = () if result is None or isinstance(result, Signal) else (result,)
+            autoCheckpoint.advance(self, self.instructionCount - instructionCount, pendingOutputs=pendingOutputs)
+            if result is not self.OUT_OF_BUDGET:
+                return result
+
+    def executeSlice(self, budget: int) -> Union[int, Signal, None]:
+        """
+        Executes at most budget instructions with the dispatch loop, whatever the machine's
+        engine, and adds the instructions executed to instructionCount.  This is the loop
+        executeFast() runs plus a countdown, kept separate so that executeFast() pays nothing
+        for it.
+        :return: the output value, None if the program halted, NEEDS_INPUT, or OUT_OF_BUDGET if
+                 the budget ran out first
+        """
+        blockCompiler = self.blockCompiler
+        if blockCompiler is None or blockCompiler.memory is not self.program or not blockCompiler.codeAddresses:
+            return self._executeSlice(budget)
+
+        # the handlers store straight into the page tables, where the block compiler does not
+        # see them, so the pages written by the slice are compared with a fork taken before it
+        previous = self.program.fork()
+        try:
+            return self._executeSlice(budget)
+        finally:
+            blockCompiler.revalidate(previous)
+
+    def _executeSlice(self, budget: int) -> Union[int, Signal, None]:
+        """
+        The dispatch loop with a countdown run by executeSlice()
+        """
+        if self.fusedImage is not self.image:
+            self.buildFusedHandlers()
+
+        getFusedHandler = self.fusedHandlers.get
+        pages = self.program.pages
+        writablePages = self.program.writablePages
+        sp = self.sp
+        relativeBase = self.relativeBase
+        getHandler = HANDLER_TABLE.get
+        getRelativeBaseHandler = RELATIVE_BASE_TABLE.get
+        remaining = budget
+
+        while True:
+            if remaining <= 0:
+                self.sp = sp
+                self.relativeBase = relativeBase
+                self.instructionCount += budget - remaining
+                return self.OUT_OF_BUDGET
+
+            try:
+                code = pages[sp >> PAGE_SHIFT]
+                offset = sp & PAGE_MASK
+
+                fusedHandler = getFusedHandler(sp) if remaining > 1 else None
+                if fusedHandler is not None:
+                    state = fusedHandler(pages, writablePages, code, offset, sp, relativeBase)
+                    if state is not None:
+                        sp, relativeBase, executed = state
+                        remaining -= executed
+                        continue
+
+                instruction = code[offset]
+
+                handler = getHandler(instruction)
+                if handler is not None:
+                    sp = handler(pages, writablePages, code, offset, sp, relativeBase)
+                    remaining -= 1
+                    continue
+
+                relativeBaseHandler = getRelativeBaseHandler(instruction)
+                if relativeBaseHandler is not None:
+                    relativeBase += relativeBaseHandler(pages, writablePages, code, offset, sp, relativeBase)
+                    sp += self.OP_LENGTH_2
+                    remaining -= 1
+                    continue
+            except (LookupError, OverflowError):
+                # the instruction straddles a page boundary, touches an unallocated or shared page
+                # or stores a value that does not fit a typed page
+                pass
+
+            self.sp = sp
+            self.relativeBase = relativeBase
+            self.getOpcodeAndMode()
+
+            if self.opcode == self.OP_3 and self.isStarved():
+                self.instructionCount += budget - remaining
+                return self.NEEDS_INPUT
+
+            remaining -= 1
+            if self.opcode == self.OP_STOP:
+                self.halted = True
+                self.instructionCount += budget - remaining
+                return None
+            elif self.opcode == self.OP_4:
+                output = self.opcode4()
+                if self.outputBuffer is None:
+                    self.instructionCount += budget - remaining
+                    return output
+                self.outputBuffer.append(output)
+            else:
+                self.executeInstruction()
+
+            pages = self.program.pages
+            writablePages = self.program.writablePages
+            sp = self.sp
+            relativeBase = self.relativeBase
+
+    def executeCompiled(self) -> Union[int, Signal, None]:
+        """
+        Executes the program one compiled basic block at a time, handing I/O, halt, page faults
+        and stores into code to the reference implementation.  With the translated engine the
+        compiler starts out seeded with the program's ahead of time translation.
+        :return: the output value, None if the program halted, or NEEDS_INPUT
+        """
+        if self.blockCompiler is None or self.blockCompiler.memory is not self.program:
+            start = time.perf_counter()
+            self.blockCompiler = BlockCompiler(self.program, self.image, summarizeLoops=self.summarizeLoops)
+            if self.engine == self.ENGINE_TRANSLATED:
+                self.blockCompiler.seed(loadTranslation(self.image, summarizeLoops=self.summarizeLoops))
+            self.compileSeconds += time.perf_counter() - start
+
+        blockCompiler = self.blockCompiler
+        getBlock = blockCompiler.blocks.get
+        codeAddresses = blockCompiler.codeAddresses
+        pages = self.program.pages
+        writablePages = self.program.writablePages
+        sp = self.sp
+        relativeBase = self.relativeBase
+
+        while True:
+            block = getBlock(sp)
+            if block is None:
+                start = time.perf_counter()
+                block = blockCompiler.compileBlock(sp)
+                self.compileSeconds += time.perf_counter() - start
+
+            sp, relativeBase, completed = block(pages, writablePages, codeAddresses, relativeBase)
+            if completed:
+                continue
+
+            self.sp = sp
+            self.relativeBase = relativeBase
+            self.getOpcodeAndMode()
+
+            if self.opcode == self.OP_STOP:
+                self.halted = True
+                return None
+            elif self.opcode == self.OP_4:
+                output = self.opcode4()
+                if self.outputBuffer is None:
+                    return output
+                self.outputBuffer.append(output)
+            elif self.opcode == self.OP_3 and self.isStarved():
+                return self.NEEDS_INPUT
+            else:
+                self.executeInstruction()
+
+            sp = self.sp
+            relativeBase = self.relativeBase
+
+    def run(self) -> Generator[Union[int, Signal], Union[int, None], None]:
+        """
+        Runs the program as a generator that yields each output and returns when the program
+        halts.  When the program needs an input that has not been supplied it yields
+        NEEDS_INPUT instead of prompting or repeating the last input.  A value passed to send()
+        is appended to the inputs, whichever event it answers.
+        """
+        self.blockOnInput = True
+        try:
+            while True:
+                event = self.execute()
+                if event is None:
+                    return
+
+                value = yield event
+                if value is not None:
+                    self.appendInput(value)
+        finally:
+            self.blockOnInput = False
+
+    def executeUntilBlocked(self, groupSize: int = 1) -> 'np.ndarray':
+        """
+        Executes the program until it halts or needs an input it has not been given, collecting
+        every output on the way.  halted tells the two apart afterwards.
+        :param groupSize: number of consecutive outputs per row, e.g. 3 for (x, y, tile id)
+        :return: the outputs as an int64 array, or an object array if a value does not fit in
+                 int64, with groupSize columns when groupSize is greater than 1
+        """
+        # NumPy is only needed by the machines that collect their outputs this way
+        import numpy as np
+
+        outputs = list()
+        blockOnInput = self.blockOnInput
+        self.outputBuffer = outputs
+        self.blockOnInput = True
+        try:
+            self.execute()
+        finally:
+            self.outputBuffer = None
+            self.blockOnInput = blockOnInput
+
+        try:
+            outputs = np.array(outputs, dtype=np.int64)
+        except OverflowError:
+            outputs = np.array(outputs, dtype=object)
+
+        if groupSize > 1:
+            return outputs.reshape(-1, groupSize)
+
+        return outputs
+
+    def isStarved(self) -> bool:
+        """
+        Whether an input instruction would have to wait for input: every input has been
+        consumed and either blockOnInput is set or the input channel blocks
+        """
+        inputChannel = self.inputChannel
+        return (self.blockOnInput and inputChannel.isEmpty or
+                inputChannel.policy == InputChannel.POLICY_BLOCK and inputChannel.isStarved)
+
+    def executeInstruction(self):
+        """
+        Executes the current instruction with the reference implementation of its opcode
+        """
+        if self.opcode == self.OP_1:
+            self.opcode1()
+        elif self.opcode == self.OP_2:
+            self.opcode2()
+        elif self.opcode == self.OP_3:
+            # a starved channel falls back to prompting for the value
+            self.opcode3(value=self.inputChannel.get())
+        elif self.opcode == self.OP_5:
+            self.opcode5()
+        elif self.opcode == self.OP_6:
+            self.opcode6()
+        elif self.opcode == self.OP_7:
+            self.opcode7()
+        elif self.opcode == self.OP_8:
+            self.opcode8()
+        elif self.opcode == self.OP_9:
+            self.opcode9()
+        else:
+            raise RuntimeError(f'Encountered illigal opcode {self.opcode}')
+
+    def storeValue(self, value: int, ptr: int, relativePtr: bool):
+        """
+        Stores the value at the address pointer
+        """
+        if relativePtr:
+            storePtr = self.relativeBase + ptr
+        else:
+            storePtr = ptr
+
+        if storePtr < 0:
+            raise RuntimeError(f'Store to negative address {storePtr}')
+
+        self.program[storePtr] = value
+
+    def readValue(self, address: int) -> int:
+        """
+        Reads the word at an operand's address
+        """
+        if address < 0:
+            raise RuntimeError(f'Read from negative address {address}')
+
+        return self.program[address]
+
+    def resume(self) -> Union[int, Signal, None]:
+        """
+        Resumes the execution
+        """
+        return self.execute()
+
+    def getOpcodeAndMode(self):
+        """
+        Gets the instructions opcode and modes
+        """
+        (self.opcode,
+         self.firstParameterMode,
+         self.secondParameterMode,
+         self.thirdParameterMode) = decodeInstruction(self.program[self.sp])
+
+    def opcode1(self):
+        """
+        Performs the add opcode
+        """
+        value1, value2 = self.getOpValues()
+        storagePtr = self.program[self.sp + 3]
+
+        self.storeValue(value=value1 + value2,
+                        ptr=storagePtr,
+                        relativePtr=True if self.thirdParameterMode == self.MODE_RELATIVE else False)
+        self.sp += self.OP_LENGTH_4
+
+    def opcode2(self):
+        """
+        Performs the multiply opcode
+        """
+        value1, value2 = self.getOpValues()
+        storagePtr = self.program[self.sp + 3]
+
+        self.storeValue(value=value1 * value2,
+                        ptr=storagePtr,
+                        relativePtr=True if self.thirdParameterMode == self.MODE_RELATIVE else False)
+        self.sp += self.OP_LENGTH_4
+
+    def opcode3(self, value: Union[int, None] = None):
+        """
+        Opcode 3 takes a single integer as input and saves it to the address given by its only parameter
+        """
+        storagePtr = self.program[self.sp + 1]
+
+        if value is None:
+            value = int(input('\tEnter Process Input: '))
+
+        self.storeValue(value=value,
+                        ptr=storagePtr,
+                        relativePtr=True if self.firstParameterMode == self.MODE_RELATIVE else False)
+        self.sp += self.OP_LENGTH_2
+
+    def opcode4(self) -> int:
+        """
+        Opcode 4 outputs the value of its only parameter
+        """
+        storagePtr = self.program[self.sp + 1]
+
+        if self.firstParameterMode == self.MODE_POSITION:
+            ptr = storagePtr
+        elif self.firstParameterMode == self.MODE_IMMEDIATE:
+            ptr = self.sp + 1
+        elif self.firstParameterMode == self.MODE_RELATIVE:
+            ptr = self.relativeBase + storagePtr
+        else:
+            raise RuntimeError(f'Unknown output mode {self.firstParameterMode}')
+
+        output = self.readValue(ptr)
+        self.sp += self.OP_LENGTH_2
+        return output
+
+    def opcode5(self):
+        """
+        Opcode 5 jump-if-true
+        """
+        value1, value2 = self.getOpValues()
+        if value1 != 0:
+            self.sp = value2
+        else:
+            self.sp += self.OP_LENGTH_3
+
+    def opcode6(self):
+        """
+        Opcode 6 jump-if-false
+        """
+        value1, value2 = self.getOpValues()
+        if value1 == 0:
+            self.sp = value2
+        else:
+            self.sp += self.OP_LENGTH_3
+
+    def opcode7(self):
+        """
+        Opcode 7 less than
+        """
+        value1, value2 = self.getOpValues()
+        storagePtr = self.program[self.sp + 3]
+        if value1 < value2:
+            self.storeValue(value=1,
+                            ptr=storagePtr,
+                            relativePtr=True if self.thirdParameterMode == self.MODE_RELATIVE else False)
+        else:
+            self.storeValue(value=0,
+                            ptr=storagePtr,
+                            relativePtr=True if self.thirdParameterMode == self.MODE_RELATIVE else False)
+
+        self.sp += self.OP_LENGTH_4
+
+    def opcode8(self):
+        """
+        Opcode 8 equals
+        """
+        value1, value2 = self.getOpValues()
+        storagePtr = self.program[self.sp + 3]
+        if value1 == value2:
+            self.storeValue(value=1,
+                            ptr=storagePtr,
+                            relativePtr=True if self.thirdParameterMode == self.MODE_RELATIVE else False)
+        else:
+            self.storeValue(value=0,
+                            ptr=storagePtr,
+                            relativePtr=True if self.thirdParameterMode == self.MODE_RELATIVE else False)
+
+        self.sp += self.OP_LENGTH_4
+
+    def opcode9(self):
+        """
+        Opcode 9 relative base adjust
+        """
+        value = self.getOpValueSingle()
+        self.relativeBase += value
+        self.sp += self.OP_LENGTH_2
+
+    def getOpValues(self) -> Tuple[int, int]:
+        """
+        Gets the op values for two value ops
+        """
+        if self.firstParameterMode == self.MODE_POSITION:
+            valuePtr = self.program[self.sp + 1]
+            value1 = self.readValue(valuePtr)
+        elif self.firstParameterMode == self.MODE_IMMEDIATE:
+            value1 = self.program[self.sp + 1]
+        elif self.firstParameterMode == self.MODE_RELATIVE:
+            valuePtr = self.program[self.sp + 1]
+            value1 = self.readValue(self.relativeBase + valuePtr)
+        else:
+            raise RuntimeError(f'Unrecognized first parameter mode {self.firstParameterMode}')
+
+        if self.secondParameterMode == self.MODE_POSITION:
+            valuePtr = self.program[self.sp + 2]
+            value2 = self.readValue(valuePtr)
+        elif self.secondParameterMode == self.MODE_IMMEDIATE:
+            value2 = self.program[self.sp + 2]
+        elif self.secondParameterMode == self.MODE_RELATIVE:
+            valuePtr = self.program[self.sp + 2]
+            value2 = self.readValue(self.relativeBase + valuePtr)
+        else:
+            raise RuntimeError(f'Unrecognized second parameter mode {self.secondParameterMode}')
+
+        return value1, value2
+
+    def getOpValueSingle(self) -> int:
+        """
+        Gets the op value for single value ops
+        """
+        if self.firstParameterMode == self.MODE_POSITION:
+            valuePtr = self.program[self.sp + 1]
+            value1 = self.readValue(valuePtr)
+        elif self.firstParameterMode == self.MODE_IMMEDIATE:
+            value1 = self.program[self.sp + 1]
+        elif self.firstParameterMode == self.MODE_RELATIVE:
+            valuePtr = self.program[self.sp + 1]
+            value1 = self.readValue(self.relativeBase + valuePtr)
+        else:
+            raise RuntimeError(f'Unrecognized first parameter mode {self.firstParameterMode}')
+
+        return value1
+
+    def getTraceModes(self) -> Tuple[int, ...]:
+        """
+        Gets the modes of the current instruction's parameters
+        """
+        modes = (self.firstParameterMode, self.secondParameterMode, self.thirdParameterMode)
+        return modes[:PARAMETER_COUNTS.get(self.opcode, 0)]
+
+    def getTraceOperands(self) -> Tuple[int, ...]:
+        """
+        Resolves the current instruction's operands before it executes: the value of each read
+        parameter followed by the store address for instructions that store
+        """
+        if self.opcode in (self.OP_1, self.OP_2, self.OP_7, self.OP_8):
+            return self.getOpValues() + (self.getStoreAddress(self.sp + 3, self.thirdParameterMode),)
+        elif self.opcode in (self.OP_5, self.OP_6):
+            return self.getOpValues()
+        elif self.opcode == self.OP_3:
+            return self.getStoreAddress(self.sp + 1, self.firstParameterMode),
+        elif self.opcode in (self.OP_4, self.OP_9):
+            return self.getOpValueSingle(),
+
+        return ()
+
+    def getTraceResult(self, operands: Tuple[int, ...]) -> int:
+        """
+        Gets the result of the instruction that just executed: the value stored, the next
+        instruction pointer for jumps or the new relative base
+        """
+        if self.opcode in (self.OP_5, self.OP_6):
+            return self.sp
+        elif self.opcode == self.OP_9:
+            return self.relativeBase
+
+        return self.program[operands[-1]]
+
+    def getStoreAddress(self, parameterPtr: int, mode: int) -> int:
+        """
+        Gets the address a store parameter points to
+        """
+        address = self.program[parameterPtr]
+        if mode == self.MODE_RELATIVE:
+            address += self.relativeBase
+
+        return address
+
+    def reset(self):
+        """
+        Reloads the program from the process wide image cache and clears the machine state.
+        The program's pages are shared with every other machine running it until written.
+        """
+        image = PROGRAM_CACHE.load(self.inputFile)
+        self.program = PROGRAM_CACHE.memory(image, typed=self.memory == self.MEMORY_INT64)
+        if self.blockCompiler is not None and self.blockCompiler.image is image:
+            self.blockCompiler.rebind(self.program)
+        self.image = image
+
+        self.sp = 0
+        self.opcode = None
+        self.firstParameterMode = 0
+        self.secondParameterMode = 0
+        self.thirdParameterMode = 0
+        self.inputChannel.clear()
+        self.relativeBase = 0
+        self.halted = False
+        self.instructionCount = 0
+
+    def fork(self) -> 'IntcodeComputer':
+        """
+        Clones the machine mid-run.  Memory is shared copy-on-write, so the fork costs one
+        reference per page and each machine copies a page on its first write to it.
+        """
+        clone = copy.copy(self)
+        clone.program = self.program.fork()
+        clone.inputChannel = self.inputChannel.copy()
+        # the fork would overwrite the parent's checkpoint file with its own state
+        clone.autoCheckpoint = None
+        if self.blockCompiler is not None and self.blockCompiler.memory is self.program:
+            clone.blockCompiler = self.blockCompiler.fork(clone.program)
+
+        return clone
+
+    def snapshot(self) -> Snapshot:
+        """
+        Saves the machine state.  Memory is shared copy-on-write with the running machine.
+        """
+        return Snapshot(memory=self.program.fork(),
+                        sp=self.sp,
+                        relativeBase=self.relativeBase,
+                        inputChannel=self.inputChannel.copy(),
+                        instructionCount=self.instructionCount)
+
+    def restore(self, snapshot: Snapshot):
+        """
+        Restores a state saved with snapshot().  The snapshot itself is left untouched.  The
+        countdown to the next automatic checkpoint starts again from the restored state.
+        """
+        self.program = snapshot.memory.fork()
+        self._retargetCompiler()
+        self.sp = snapshot.sp
+        self.relativeBase = snapshot.relativeBase
+        self.inputChannel = snapshot.inputChannel.copy()
+        self.instructionCount = snapshot.instructionCount
+        self.halted = False
+        self._restartAutoCheckpoint()
+
+    def _retargetCompiler(self):
+        """
+        Moves the block compiler to a memory that has just replaced the machine's own, keeping
+        the blocks that are still valid in it
+        """
+        if self.blockCompiler is not None and self.blockCompiler.memory is not self.program:
+            self.blockCompiler.retarget(self.program)
+
+    def _restartAutoCheckpoint(self):
+        """
+        Restarts the countdown to the next automatic checkpoint after the machine was rewound
+        """
+        if self.autoCheckpoint is not None:
+            self.autoCheckpoint.counter = 0
+
+    def saveCheckpoint(self, path: str, pendingOutputs: Sequence[int] = ()):
+        """
+        Saves the machine state to a checkpoint file: memory, registers, the input channel and
+        any outputs collected by executeUntilBlocked() that have not been returned yet
+        :param path: the checkpoint file, replaced atomically
+        :param pendingOutputs: further outputs the caller has not received
+        """
+        from .Checkpoint import CheckpointState, writeCheckpoint
+
+        inputChannel = self.inputChannel
+        channel = {'policy': inputChannel.policy,
+                   'defaultValue': inputChannel.defaultValue,
+                   'maxLength': inputChannel.maxLength,
+                   'lastValue': inputChannel.lastValue,
+                   'consumed': inputChannel.consumed}
+
+        writeCheckpoint(path, CheckpointState(imageHash=imageHash(self.image),
+                                              sp=self.sp,
+                                              relativeBase=self.relativeBase,
+                                              halted=self.halted,
+                                              instructionCount=self.instructionCount,
+                                              pages=self.program.pages,
+                                              inputs=list(inputChannel.queue),
+                                              outputs=list(self.outputBuffer or ()) + list(pendingOutputs),
+                                              channel=channel))
+
+    def loadCheckpoint(self, path: str) -> List[int]:
+        """
+        Restores a state saved with saveCheckpoint().  The checkpoint must have been saved by a
+        machine running the same program.  The countdown to the next automatic checkpoint starts
+        again from the restored state.
+        :return: the outputs that were pending when the checkpoint was saved
+        """
+        from .Checkpoint import readCheckpoint
+
+        state = readCheckpoint(path)
+        if state.imageHash != imageHash(self.image):
+            raise RuntimeError(f'Checkpoint {path} was saved from a different program than {self.inputFile}')
+
+        self.program = PagedMemory(typed=self.memory == self.MEMORY_INT64)
+        self.program.loadPages(state.pages)
+        self._retargetCompiler()
+        self.sp = state.sp
+        self.relativeBase = state.relativeBase
+        self.halted = state.halted
+        self.instructionCount = state.instructionCount
+        self._restartAutoCheckpoint()
+
+        channel = state.channel
+        self.inputChannel = InputChannel(state.inputs,
+                                         policy=channel['policy'],
+                                         defaultValue=channel['defaultValue'],
+                                         maxLength=channel['maxLength'])
+        self.inputChannel.lastValue = channel['lastValue']
+        self.inputChannel.consumed = channel['consumed']
+
+        return state.outputs
+
+    def setAutoCheckpoint(self, path: Union[str, None], every: int):
+        """
+        Saves a checkpoint every N executed instructions.  The machine runs on the dispatch loop
+        with an instruction countdown until checkpointing is turned off again, or on the traced
+        engine while a trace hook is registered too.  Forks do not inherit it.
+        :param path: the checkpoint file, or None to stop checkpointing
+        :param every: number of instructions between checkpoints
+        """
+        if every < 1:
+            raise ValueError(f'Checkpoint interval must be at least 1, got {every}')
+
+        from .Checkpoint import AutoCheckpoint
+
+        self.autoCheckpoint = AutoCheckpoint(path, every) if path is not None else None
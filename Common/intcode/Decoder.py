@@ -0,0 +1,78 @@
+"""
+Instruction decoding for the Intcode computer
+"""
+from typing import Dict, Tuple
+
+OPCODE_DIVISOR = 100
+MODE_DIVISOR = 10
+
+VALID_OPCODES = (1, 2, 3, 4, 5, 6, 7, 8, 9, 99)
+VALID_MODES = (0, 1, 2)
+
+PARAMETER_COUNTS: Dict[int, int] = {1: 3, 2: 3, 3: 1, 4: 1, 5: 2, 6: 2, 7: 3, 8: 3, 9: 1, 99: 0}
+
+OPCODE_NAMES: Dict[int, str] = {1: 'add',
+                                2: 'mul',
+                                3: 'in',
+                                4: 'out',
+                                5: 'jnz',
+                                6: 'jz',
+                                7: 'lt',
+                                8: 'eq',
+                                9: 'arb',
+                                99: 'halt'}
+
+Instruction = Tuple[int, int, int, int]
+
+
+def _decode(instruction: int) -> Instruction:
+    """
+    Splits an instruction word into its opcode and parameter modes with integer math
+    :param instruction: the raw instruction word
+    :return: (opcode, firstParameterMode, secondParameterMode, thirdParameterMode)
+    """
+    if instruction < 0:
+        # floor division would decode -1 as a halt, so a negative word is its own illegal opcode
+        return instruction, 0, 0, 0
+
+    modes, opcode = divmod(instruction, OPCODE_DIVISOR)
+    modes, firstParameterMode = divmod(modes, MODE_DIVISOR)
+    modes, secondParameterMode = divmod(modes, MODE_DIVISOR)
+    thirdParameterMode = modes % MODE_DIVISOR
+
+    return opcode, firstParameterMode, secondParameterMode, thirdParameterMode
+
+
+def _buildDecodeTable() -> Dict[int, Instruction]:
+    """
+    Precomputes the decoded form of every legal instruction word
+    """
+    table = dict()
+    for opcode in VALID_OPCODES:
+        for firstParameterMode in VALID_MODES:
+            for secondParameterMode in VALID_MODES:
+                for thirdParameterMode in VALID_MODES:
+                    instruction = (opcode +
+                                   OPCODE_DIVISOR * firstParameterMode +
+                                   OPCODE_DIVISOR * MODE_DIVISOR * secondParameterMode +
+                                   OPCODE_DIVISOR * MODE_DIVISOR * MODE_DIVISOR * thirdParameterMode)
+                    table[instruction] = (opcode, firstParameterMode, secondParameterMode, thirdParameterMode)
+
+    return table
+
+
+DECODE_TABLE = _buildDecodeTable()
+
+
+def decodeInstruction(instruction: int) -> Instruction:
+    """
+    Decodes an instruction word into its opcode and parameter modes
+    :param instruction: the raw instruction word
+    :return: (opcode, firstParameterMode, secondParameterMode, thirdParameterMode)
+    """
+    decoded = DECODE_TABLE.get(instruction)
+    if decoded is None:
+        # illegal words are still decoded so the caller can report the bad opcode or mode
+        decoded = _decode(instruction)
+
+    return decoded
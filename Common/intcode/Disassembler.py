@@ -0,0 +1,329 @@
+"""
+Static disassembler and control flow graph analyzer for Intcode program images
+
+analyze() decodes the image with decodeInstruction, exactly as getOpcodeAndMode does, by
+recursive descent from address 0: it follows fall through and every jump whose target is an
+immediate parameter, pruning branches whose condition is an immediate constant.  The
+reachable instructions are split into basic blocks at jump targets and after jumps, and the
+blocks are linked into a control flow graph.
+
+Jumps whose target is read from memory are marked as computed.  Their targets are unknown, so
+code reached only through them is not part of the graph.
+
+Every store is checked against the code region, i.e. the words of the reachable
+instructions.  A store with a constant address is flagged when that address is code, and a
+relative mode store is flagged as possibly hitting code because the relative base is not
+known statically.  A graph with no flagged store and no computed jump is a proof that the
+program never modifies its own code.
+
+The analysis is diagnostic only: it backs the `disassemble` command, and the fuzzer shares
+STORE_PARAMETERS.  The engines do not consult it.  The block compiler, the translator and the
+fusion table still watch every code address and revalidate after slices, since none of the
+puzzle programs is proven free of self-modification (their relative mode stores alone rule it
+out) and the memory can be patched from outside the program, e.g. by initialize().
+"""
+from typing import Dict, List, NamedTuple, Sequence, Set, Tuple, Union
+
+from .Decoder import OPCODE_NAMES, PARAMETER_COUNTS, VALID_MODES, decodeInstruction
+
+MODE_POSITION = 0
+MODE_IMMEDIATE = 1
+MODE_RELATIVE = 2
+
+OP_JUMP_IF_TRUE = 5
+OP_JUMP_IF_FALSE = 6
+OP_STOP = 99
+
+# index of the store address within the parameters of the instructions that store
+STORE_PARAMETERS: Dict[int, int] = {1: 2, 2: 2, 3: 0, 7: 2, 8: 2}
+
+DATA_WORDS_PER_LINE = 8
+LABEL_WIDTH = 16
+
+
+class DecodedInstruction(NamedTuple):
+    """
+    An instruction of a program image.  Illegal instructions have no modes or parameters.
+    """
+    address: int
+    word: int
+    opcode: int
+    modes: Tuple[int, ...]
+    parameters: Tuple[int, ...]
+
+    @property
+    def length(self) -> int:
+        """
+        Number of words the instruction occupies
+        """
+        return 1 + len(self.parameters)
+
+    @property
+    def isLegal(self) -> bool:
+        """
+        Whether the reference implementation can execute the instruction
+        """
+        return self.opcode in PARAMETER_COUNTS and all(mode in VALID_MODES for mode in self.modes)
+
+    @property
+    def isJump(self) -> bool:
+        """
+        Whether the instruction is a conditional jump
+        """
+        return self.opcode in (OP_JUMP_IF_TRUE, OP_JUMP_IF_FALSE)
+
+    @property
+    def isTerminator(self) -> bool:
+        """
+        Whether the instruction ends its basic block
+        """
+        return self.isJump or self.opcode == OP_STOP or not self.isLegal
+
+    def successors(self) -> Tuple[List[int], bool]:
+        """
+        The statically known addresses control can reach after the instruction
+        :return: (successors, whether the instruction is a jump to a computed target)
+        """
+        nextAddress = self.address + self.length
+        if not self.isLegal or self.opcode == OP_STOP:
+            return [], False
+        elif not self.isJump:
+            return [nextAddress], False
+
+        condition, target = self.parameters
+        conditionKnown = self.modes[0] == MODE_IMMEDIATE
+        taken = (condition != 0) == (self.opcode == OP_JUMP_IF_TRUE)
+
+        successors = list()
+        computed = False
+        if not conditionKnown or not taken:
+            successors.append(nextAddress)
+        if not conditionKnown or taken:
+            if self.modes[1] == MODE_IMMEDIATE:
+                successors.append(target)
+            else:
+                computed = True
+
+        return successors, computed
+
+
+class BasicBlock(NamedTuple):
+    """
+    A straight line of instructions entered only at its first instruction
+    """
+    entry: int
+    instructions: Tuple[DecodedInstruction, ...]
+    successors: Tuple[int, ...]
+    computedJump: bool
+
+    @property
+    def end(self) -> int:
+        """
+        The address following the block's last word
+        """
+        last = self.instructions[-1]
+        return last.address + last.length
+
+
+class StoreSite(NamedTuple):
+    """
+    A store that writes, or may write, into the code region
+    """
+    address: int  # of the storing instruction
+    target: Union[int, None]  # constant store address, None for a relative mode store
+    definite: bool  # False when the target depends on the relative base
+
+
+class ControlFlowGraph:
+    """
+    The result of analyze(): reachable instructions, basic blocks, computed jumps and the
+    stores that may modify code
+    """
+    def __init__(self, image: Sequence[int], instructions: Dict[int, DecodedInstruction], blocks: Dict[int, BasicBlock]):
+        self.image = image
+        self.instructions = instructions
+        self.blocks = blocks
+
+        self.codeAddresses: Set[int] = {address
+                                        for instruction in instructions.values()
+                                        for address in range(instruction.address, instruction.address + instruction.length)}
+        self.codeStores: Tuple[StoreSite, ...] = tuple(store for store in map(self._storeSite, sorted(instructions))
+                                                       if store is not None)
+        self.computedJumps: Tuple[int, ...] = tuple(block.instructions[-1].address
+                                                    for block in blocks.values() if block.computedJump)
+
+        self.predecessors: Dict[int, List[int]] = {entry: list() for entry in blocks}
+        for block in blocks.values():
+            for successor in block.successors:
+                if successor in self.predecessors:
+                    self.predecessors[successor].append(block.entry)
+
+    @property
+    def selfModificationFree(self) -> bool:
+        """
+        Whether the analysis proves that the program never writes to its own code: no store
+        can reach the code region and there is no computed jump into code the analysis did
+        not see
+        """
+        return not self.codeStores and not self.computedJumps
+
+    def listing(self) -> str:
+        """
+        Formats the disassembly as text, block by block, with the words no reachable
+        instruction covers listed as data
+        """
+        flagged = {store.address: store for store in self.codeStores}
+        lines = [f'; {len(self.instructions)} instructions in {len(self.blocks)} blocks, '
+                 f'{len(self.computedJumps)} computed jumps, {len(self.codeStores)} stores that may modify code',
+                 f'; self-modification free: {"yes" if self.selfModificationFree else "not proven"}']
+
+        address = 0
+        for entry in sorted(self.blocks):
+            block = self.blocks[entry]
+            if entry < address:
+                # overlaps the previous block, i.e. jumps into the middle of an instruction
+                lines.append(f'; block {entry} overlaps the previous block')
+            elif entry > address:
+                lines.extend(self._dataLines(address, entry))
+
+            successors = ', '.join(str(successor) for successor in block.successors)
+            lines.append('')
+            lines.append(f'{"block " + str(entry) + ":":<{LABEL_WIDTH}}; -> {successors or "none"}'
+                         f'{", computed" if block.computedJump else ""}'
+                         f'{", from " + ", ".join(map(str, self.predecessors[entry])) if self.predecessors[entry] else ""}')
+
+            for instruction in block.instructions:
+                comment = ''
+                store = flagged.get(instruction.address)
+                if store is not None:
+                    comment = '  ; stores into code' if store.definite else '  ; store may hit code'
+                elif instruction.isJump and instruction.modes[1] != MODE_IMMEDIATE:
+                    comment = '  ; computed jump'
+                lines.append(f'{instruction.address:>8}: {formatInstruction(instruction)}{comment}')
+
+            address = max(address, block.end)
+
+        lines.extend(self._dataLines(address, len(self.image)))
+
+        return '\n'.join(lines) + '\n'
+
+    def _storeSite(self, address: int) -> Union[StoreSite, None]:
+        """
+        Classifies the store made by an instruction, if it may write into the code region
+        """
+        instruction = self.instructions[address]
+        index = STORE_PARAMETERS.get(instruction.opcode)
+        if index is None or not instruction.isLegal:
+            return None
+        elif instruction.modes[index] == MODE_RELATIVE:
+            return StoreSite(address=address, target=None, definite=False)
+        elif instruction.parameters[index] in self.codeAddresses:
+            return StoreSite(address=address, target=instruction.parameters[index], definite=True)
+
+        return None
+
+    def _dataLines(self, start: int, end: int) -> List[str]:
+        """
+        Lists image words that no reachable instruction covers
+        """
+        lines = list()
+        for address in range(start, end, DATA_WORDS_PER_LINE):
+            words = self.image[address:min(address + DATA_WORDS_PER_LINE, end)]
+            lines.append(f'{address:>8}: .data {", ".join(str(word) for word in words)}')
+
+        return lines
+
+
+def analyze(image: Sequence[int]) -> ControlFlowGraph:
+    """
+    Disassembles a program image and builds its control flow graph
+    """
+    instructions: Dict[int, DecodedInstruction] = dict()
+    leaders = {0}
+    pending = [0]
+    while pending:
+        address = pending.pop()
+        if address in instructions or address < 0:
+            continue
+
+        instruction = decodeAt(image, address)
+        instructions[address] = instruction
+
+        successors, _ = instruction.successors()
+        if instruction.isJump:
+            leaders.update(successors)
+        pending.extend(successors)
+
+    blocks: Dict[int, BasicBlock] = dict()
+    for entry in sorted(leaders.intersection(instructions)):
+        blockInstructions = list()
+        address = entry
+        while True:
+            instruction = instructions[address]
+            blockInstructions.append(instruction)
+            successors, computed = instruction.successors()
+            if instruction.isTerminator:
+                break
+
+            address = successors[0]
+            if address in leaders or address not in instructions:
+                break
+
+        blocks[entry] = BasicBlock(entry=entry,
+                                   instructions=tuple(blockInstructions),
+                                   successors=tuple(successors),
+                                   computedJump=computed)
+
+    return ControlFlowGraph(image, instructions, blocks)
+
+
+def decodeAt(image: Sequence[int], address: int) -> DecodedInstruction:
+    """
+    Decodes the instruction at an address.  Words past the end of the image read as 0, as
+    they do in memory.
+    """
+    word = _word(image, address)
+    opcode, firstParameterMode, secondParameterMode, thirdParameterMode = decodeInstruction(word)
+
+    count = PARAMETER_COUNTS.get(opcode)
+    if count is None:
+        return DecodedInstruction(address=address, word=word, opcode=opcode, modes=(), parameters=())
+
+    modes = (firstParameterMode, secondParameterMode, thirdParameterMode)[:count]
+    parameters = tuple(_word(image, address + 1 + index) for index in range(count))
+
+    return DecodedInstruction(address=address, word=word, opcode=opcode, modes=modes, parameters=parameters)
+
+
+def formatInstruction(instruction: DecodedInstruction) -> str:
+    """
+    Formats an instruction as assembly: position parameters as [address], relative
+    parameters as [rb+offset] and immediate parameters as plain values
+    """
+    if not instruction.isLegal:
+        return f'.illegal {instruction.word}'
+
+    name = OPCODE_NAMES[instruction.opcode]
+    operands = list()
+    for mode, parameter in zip(instruction.modes, instruction.parameters):
+        if mode == MODE_POSITION:
+            operands.append(f'[{parameter}]')
+        elif mode == MODE_RELATIVE:
+            operands.append(f'[rb{parameter:+d}]')
+        else:
+            operands.append(str(parameter))
+
+    index = STORE_PARAMETERS.get(instruction.opcode)
+    if index is not None:
+        # the store address is printed as the destination
+        destination = operands.pop(index)
+        return f'{name:<4} {", ".join(operands)}{" -> " if operands else "-> "}{destination}'
+
+    return f'{name:<4} {", ".join(operands)}'.rstrip()
+
+
+def _word(image: Sequence[int], address: int) -> int:
+    """
+    Reads an image word, 0 outside the image
+    """
+    return image[address] if 0 <= address < len(image) else 0
@@ -0,0 +1,252 @@
+"""
+Dispatch tables for the Intcode computer's fast execution loop
+
+Every legal instruction word gets its own handler with the parameter modes already
+resolved, so the execution loop does a single table lookup per instruction instead of
+decoding the word and walking an if/elif chain.  The handlers are generated from small
+source templates so that each one is a straight line of page table indexing.
+
+A handler is called as handler(pages, writablePages, code, offset, sp, relativeBase) where
+code is the page holding the instruction and offset is the instruction's index in it.  All
+reads and page lookups happen before the single store, so an instruction that straddles a
+page boundary (IndexError) or touches a page that is unallocated or shared copy-on-write
+(KeyError) fails without side effects and the loop hands it to the reference opcode instead.
+The same goes for a store that overflows a typed memory page (OverflowError).
+
+Fused handlers execute a pair of consecutive instructions in one dispatch, e.g. a compare and
+the jump that tests its result, or a relative base adjustment and the store that follows it.
+fusionTable() finds every address of a program image where such a pair starts, and the loop
+looks the address up before the instruction word.  Given a Counter it wraps each handler to
+count the pairs the loop actually runs fused, which the Profiler uses to measure fusion.  A fused handler is called like any other
+handler and returns (next sp, relative base, instructions executed), or None when the first
+instruction word is no longer the one it was built for, in which case the loop dispatches the
+word on its own.  The second word is checked after the first instruction has stored, so a pair
+whose second instruction is patched by the first, or by anything else, only runs the first,
+and a second instruction that faults returns after the first so the reference opcode takes it.
+"""
+from collections import Counter
+from typing import Callable, Dict, List, Sequence, Tuple, Union
+
+from .Decoder import OPCODE_DIVISOR, MODE_DIVISOR, PARAMETER_COUNTS, VALID_MODES, decodeInstruction
+from .Memory import PAGE_SHIFT, PAGE_MASK
+
+MODE_POSITION = 0
+MODE_IMMEDIATE = 1
+MODE_RELATIVE = 2
+
+# handler(pages, writablePages, code, offset, sp, relativeBase) -> next sp
+Handler = Callable[[dict, dict, List[int], int, int, int], int]
+
+# handler(pages, writablePages, code, offset, sp, relativeBase) -> relative base adjustment
+RelativeBaseHandler = Callable[[dict, dict, List[int], int, int, int], int]
+
+# handler(pages, writablePages, code, offset, sp, relativeBase) -> (next sp, relative base, instructions executed) or None
+FusedHandler = Callable[[dict, dict, List[int], int, int, int], Union[Tuple[int, int, int], None]]
+
+_STORING_TEMPLATES = {1: '{value1} + {value2}',
+                      2: '{value1} * {value2}',
+                      7: '1 if {value1} < {value2} else 0',
+                      8: '1 if {value1} == {value2} else 0'}
+_JUMP_CONDITIONS = {5: '!=',
+                    6: '=='}
+
+_RELATIVE_BASE_OPCODE = 9
+
+FUSED_FIRST_OPCODES = (1, 2, 7, 8, _RELATIVE_BASE_OPCODE)
+FUSED_SECOND_OPCODES = (1, 2, 5, 6, 7, 8, _RELATIVE_BASE_OPCODE)
+
+# fused handlers keyed by their pair of instruction words, shared by every program
+_FUSED_HANDLERS: Dict[Tuple[int, int], FusedHandler] = dict()
+
+
+def _wordFor(opcode: int, firstParameterMode: int, secondParameterMode: int = 0, thirdParameterMode: int = 0) -> int:
+    """
+    Builds the instruction word for an opcode and its parameter modes
+    """
+    return (opcode +
+            OPCODE_DIVISOR * firstParameterMode +
+            OPCODE_DIVISOR * MODE_DIVISOR * secondParameterMode +
+            OPCODE_DIVISOR * MODE_DIVISOR * MODE_DIVISOR * thirdParameterMode)
+
+
+def _parameterSource(offset: int) -> str:
+    """
+    Statement that loads the raw parameter at sp + offset into parameter<offset>
+    """
+    return f'parameter{offset} = code[offset + {offset}]'
+
+
+def _valueSource(offset: int, mode: int) -> str:
+    """
+    Expression that reads the value of parameter<offset> in the given mode
+    """
+    if mode == MODE_POSITION:
+        address = f'parameter{offset}'
+    elif mode == MODE_IMMEDIATE:
+        return f'parameter{offset}'
+    else:
+        address = f'(relativeBase + parameter{offset})'
+
+    return f'pages[{address} >> {PAGE_SHIFT}][{address} & {PAGE_MASK}]'
+
+
+def _storeSource(offset: int, mode: int) -> str:
+    """
+    Statement that computes the address written by parameter<offset> into store
+    """
+    if mode == MODE_RELATIVE:
+        return f'store = relativeBase + parameter{offset}'
+    else:
+        # immediate mode stores behave like position mode, as they always have
+        return f'store = parameter{offset}'
+
+
+def _instructionSource(opcode: int, modes: Tuple[int, int, int], base: int = 0) -> Tuple[List[str], str]:
+    """
+    Source of an instruction whose word is at offset + base
+    :return: (statements that execute the instruction up to and including its store,
+              expression for the next sp)
+    """
+    if opcode in _STORING_TEMPLATES:
+        statements = [_parameterSource(base + 1),
+                      _parameterSource(base + 2),
+                      _parameterSource(base + 3),
+                      _storeSource(base + 3, modes[2]),
+                      f'writablePages[store >> {PAGE_SHIFT}][store & {PAGE_MASK}] = ' +
+                      _STORING_TEMPLATES[opcode].format(value1=_valueSource(base + 1, modes[0]),
+                                                        value2=_valueSource(base + 2, modes[1]))]
+        return statements, f'sp + {base + 4}'
+    elif opcode in _JUMP_CONDITIONS:
+        statements = [_parameterSource(base + 1), _parameterSource(base + 2)]
+        nextSp = (f'{_valueSource(base + 2, modes[1])} if {_valueSource(base + 1, modes[0])} '
+                  f'{_JUMP_CONDITIONS[opcode]} 0 else sp + {base + 3}')
+        return statements, nextSp
+
+    statements = [_parameterSource(base + 1), f'relativeBase += {_valueSource(base + 1, modes[0])}']
+    return statements, f'sp + {base + 2}'
+
+
+def _compileHandler(statements: List[str]) -> Callable:
+    """
+    Compiles handler statements into a function
+    """
+    body = '\n    '.join(statements)
+    namespace = dict()
+    exec(f'def handler(pages, writablePages, code, offset, sp, relativeBase):\n    {body}\n', namespace)
+    return namespace['handler']
+
+
+def _buildHandlerTable() -> Dict[int, Handler]:
+    """
+    Builds a handler for every legal word of the opcodes that only touch memory and sp
+    """
+    table = dict()
+    for opcode in list(_STORING_TEMPLATES) + list(_JUMP_CONDITIONS):
+        for firstParameterMode in VALID_MODES:
+            for secondParameterMode in VALID_MODES:
+                for thirdParameterMode in VALID_MODES:
+                    statements, nextSp = _instructionSource(opcode, (firstParameterMode, secondParameterMode, thirdParameterMode))
+                    word = _wordFor(opcode, firstParameterMode, secondParameterMode, thirdParameterMode)
+                    table[word] = _compileHandler(statements + [f'return {nextSp}'])
+
+    return table
+
+
+def _buildRelativeBaseTable() -> Dict[int, RelativeBaseHandler]:
+    """
+    Builds a handler for every legal word of the relative base adjust opcode
+    """
+    table = dict()
+    for firstParameterMode in VALID_MODES:
+        word = _wordFor(_RELATIVE_BASE_OPCODE, firstParameterMode)
+        table[word] = _compileHandler([_parameterSource(1),
+                                       f'return {_valueSource(1, firstParameterMode)}'])
+
+    return table
+
+
+HANDLER_TABLE = _buildHandlerTable()
+RELATIVE_BASE_TABLE = _buildRelativeBaseTable()
+
+
+def fusedHandler(firstWord: int, secondWord: int) -> FusedHandler:
+    """
+    Gets the fused handler for a pair of legal instruction words, compiling it on first use
+    """
+    handler = _FUSED_HANDLERS.get((firstWord, secondWord))
+    if handler is None:
+        firstOpcode, *firstModes = decodeInstruction(firstWord)
+        secondOpcode, *secondModes = decodeInstruction(secondWord)
+        firstLength = 1 + PARAMETER_COUNTS[firstOpcode]
+
+        firstStatements, _ = _instructionSource(firstOpcode, tuple(firstModes))
+        secondStatements, nextSp = _instructionSource(secondOpcode, tuple(secondModes), base=firstLength)
+
+        statements = [f'if code[offset] != {firstWord}:',
+                      '    return None']
+        statements.extend(firstStatements)
+        statements.append('try:')
+        statements.append(f'    if code[offset + {firstLength}] != {secondWord}:')
+        statements.append(f'        return sp + {firstLength}, relativeBase, 1')
+        statements.extend(f'    {statement}' for statement in secondStatements)
+        # a jump's reads are in its next sp expression, which must fault inside the try too
+        statements.append(f'    nextSp = {nextSp}')
+        statements.append('except (LookupError, OverflowError):')
+        statements.append(f'    return sp + {firstLength}, relativeBase, 1')
+        statements.append('return nextSp, relativeBase, 2')
+
+        handler = _compileHandler(statements)
+        _FUSED_HANDLERS[(firstWord, secondWord)] = handler
+
+    return handler
+
+
+def fusionTable(image: Sequence[int], counts: Union[Counter, None] = None) -> Dict[int, FusedHandler]:
+    """
+    Finds every address of a program image where a fusable pair of instructions starts.  Every
+    address is considered, not only the ones reachable statically, as the handlers check their
+    words whenever they run.
+    :param image: the program image
+    :param counts: optional counter of the pairs run fused, keyed by (first opcode, second opcode)
+    :return: address -> fused handler
+    """
+    table = dict()
+    for address, firstWord in enumerate(image):
+        first = _fusable(firstWord, FUSED_FIRST_OPCODES)
+        if first is None:
+            continue
+
+        secondAddress = address + 1 + PARAMETER_COUNTS[first]
+        if secondAddress >= len(image):
+            continue
+
+        second = _fusable(image[secondAddress], FUSED_SECOND_OPCODES)
+        if second is not None:
+            handler = fusedHandler(firstWord, image[secondAddress])
+            table[address] = handler if counts is None else _countingHandler(handler, (first, second), counts)
+
+    return table
+
+
+def _countingHandler(handler: FusedHandler, pair: Tuple[int, int], counts: Counter) -> FusedHandler:
+    """
+    Wraps a fused handler to count the times it runs both of its instructions
+    """
+    def counting(pages, writablePages, code, offset, sp, relativeBase):
+        state = handler(pages, writablePages, code, offset, sp, relativeBase)
+        if state is not None and state[2] == 2:
+            counts[pair] += 1
+        return state
+
+    return counting
+
+
+def _fusable(word: int, opcodes: Tuple[int, ...]) -> Union[int, None]:
+    """
+    The opcode of a legal instruction word if it is one of the given opcodes
+    """
+    opcode, firstParameterMode, secondParameterMode, thirdParameterMode = decodeInstruction(word)
+    if opcode not in opcodes or not all(mode in VALID_MODES for mode in (firstParameterMode, secondParameterMode, thirdParameterMode)):
+        return None
+
+    return opcode
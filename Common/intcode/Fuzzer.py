@@ -0,0 +1,1001 @@
+"""
+Differential fuzzing of the Intcode engines against an independent reference interpreter
+
+fuzz() generates random programs, runs each on the reference, a small list-backed interpreter
+that shares no code with the engines, and then on every engine under test, comparing the
+machines' states:
+    * the execute() engines, the traced engine among them, are compared each time they
+      return, after every output and at the halt, the wait for input or the error that ends
+      the run
+    * the sliced engine runs executeSlice() in slices of every instructions and is also
+      compared at the end of every slice against the reference's state after the same number
+      of instructions
+    * BatchComputer runs the program in BATCH_LANES lanes, the first with the program's inputs
+      and the others with inputs of their own, and each lane is compared at the end of its run
+      with a reference that follows batch semantics: it repeats its last input rather than
+      waiting for another and faults on values that do not fit in int64.  A batch step costs
+      about a hundred times a reference instruction, so lanes the reference does not finish
+      within batchMaxSteps instructions are not compared
+A state is the event that ended the run (output value, halt, wait for input or error), the
+stack pointer, the relative base, the halted flag and every nonzero word of memory.
+
+Programs are legal when generated: straight runs of random instructions, forward jumps and
+counted loops, reading past the end of the image and, now and then, values that do not fit
+in int64.  Self-modifying programs also patch opcodes and operands of their own code, before
+and after the patched instruction first runs.  Programs the reference does not finish within
+maxSteps instructions are skipped.  An engine that raises anything but the RuntimeError of a
+faulting program is recorded as a mismatch of that program, and the run carries on.
+
+Every engine run is timed, so the report gives each engine's throughput in the reference's
+instruction count next to its mismatches.  The reference's time excludes the time spent
+capturing its states.  The time an engine spends compiling the program, building fused
+handlers, blocks or the translation, is reported on its own and left out of its throughput,
+as it dominates on programs this short.  Translations are cached in the run's temporary
+directory rather than the user's cache.
+"""
+import contextlib
+import json
+import os
+import random
+import signal
+import tempfile
+import threading
+import time
+from typing import Dict, Iterator, List, NamedTuple, Sequence, Tuple, Union
+
+from .Batch import BatchComputer, INT64_MAX, INT64_MIN
+from .Channel import InputChannel
+from .Computer import IntcodeComputer, Signal
+from .Decoder import PARAMETER_COUNTS
+from .Disassembler import STORE_PARAMETERS
+from .Memory import MEMORY_INITIAL_VALUE, PAGE_SHIFT, PagedMemory
+from .ProgramCache import PROGRAM_CACHE
+from .Translator import loadTranslation
+
+DEFAULT_PROGRAMS = 200
+DEFAULT_EVERY = 100
+DEFAULT_MAX_STEPS = 20000
+DEFAULT_BATCH_MAX_STEPS = 2000
+DEFAULT_SELF_MODIFYING_SHARE = 0.5
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_SHOWN_MISMATCHES = 3
+
+BATCH_LANES = 4
+
+ENGINE_TRACED = 'traced'
+ENGINE_SLICE = 'slice'
+ENGINE_BATCH = 'batch'
+ENGINE_LOOPS = 'blocks-loops'
+ENGINE_LOOPS_INT64 = 'blocks-loops-int64'
+
+# engine under test -> (IntcodeComputer engine, memory).  The traced engine runs while a trace
+# hook is set, the sliced engine runs executeSlice(), which is the dispatch loop, whatever
+# the machine's engine, and the loop engines summarize counted loops.  The batch engine is
+# BatchComputer and takes neither.
+ENGINES: Dict[str, Tuple[Union[str, None], Union[str, None]]] = {
+    'dispatch': (IntcodeComputer.ENGINE_DISPATCH, IntcodeComputer.MEMORY_LIST),
+    'blocks': (IntcodeComputer.ENGINE_BLOCKS, IntcodeComputer.MEMORY_LIST),
+    'translated': (IntcodeComputer.ENGINE_TRANSLATED, IntcodeComputer.MEMORY_LIST),
+    'dispatch-int64': (IntcodeComputer.ENGINE_DISPATCH, IntcodeComputer.MEMORY_INT64),
+    'blocks-int64': (IntcodeComputer.ENGINE_BLOCKS, IntcodeComputer.MEMORY_INT64),
+    ENGINE_LOOPS: (IntcodeComputer.ENGINE_BLOCKS, IntcodeComputer.MEMORY_LIST),
+    ENGINE_LOOPS_INT64: (IntcodeComputer.ENGINE_BLOCKS, IntcodeComputer.MEMORY_INT64),
+    ENGINE_TRACED: (IntcodeComputer.ENGINE_DISPATCH, IntcodeComputer.MEMORY_LIST),
+    ENGINE_SLICE: (IntcodeComputer.ENGINE_DISPATCH, IntcodeComputer.MEMORY_LIST),
+    ENGINE_BATCH: (None, None)}
+
+EVENT_HALT = 'halt'
+EVENT_NEEDS_INPUT = 'needsInput'
+EVENT_FAULT = 'fault'
+
+# the reference keeps memory in a list up to this many words and any words past it in a
+# dictionary, so a store near a huge address does not allocate the whole list
+REFERENCE_LIST_WORDS = 1 << 16
+
+# program generation
+MIN_LENGTH = 10
+MAX_LENGTH = 60
+COUNTER_WORDS = 4
+DATA_WORDS = 16
+PAST_END_WORDS = 32
+INPUTS_PER_PROGRAM = 8
+MAX_LOOP_DEPTH = 2
+MAX_LOOP_COUNT = 12
+LOOP_PROBABILITY = 0.08
+PATCH_PROBABILITY = 0.15
+PATCH_SPLIT = 50
+WIDE_VALUE_PROBABILITY = 0.03
+WIDE_VALUES = (1 << 31, 1 << 40, -(1 << 62), (1 << 63) - 1)
+
+OPCODE_WEIGHTS: Dict[int, int] = {1: 6, 2: 4, 3: 2, 4: 3, 5: 2, 6: 2, 7: 3, 8: 3, 9: 1}
+OPCODE_GROUPS: Tuple[Tuple[int, ...], ...] = ((1, 2, 7, 8), (5, 6))
+
+MODE_POSITION = 0
+MODE_IMMEDIATE = 1
+MODE_RELATIVE = 2
+
+# symbolic operands, resolved once the program is laid out
+Operand = Tuple
+
+
+class MachineState(NamedTuple):
+    """
+    The state of a machine compared between engines
+    """
+    event: Union[int, str, None]  # None at the end of a slice
+    sp: int
+    relativeBase: int
+    halted: bool
+    memory: Dict[int, int]
+
+    def difference(self, other: 'MachineState') -> Union[str, None]:
+        """
+        Describes the first difference to another state, None if they are equal
+        """
+        for field in ('event', 'sp', 'relativeBase', 'halted'):
+            if getattr(self, field) != getattr(other, field):
+                return f'{field} {getattr(self, field)!r} != {getattr(other, field)!r}'
+
+        if self.memory != other.memory:
+            address = min(address for address in set(self.memory).union(other.memory)
+                          if self.memory.get(address, 0) != other.memory.get(address, 0))
+            return f'memory[{address}] {self.memory.get(address, 0)} != {other.memory.get(address, 0)}'
+
+        return None
+
+
+class Mismatch(NamedTuple):
+    """
+    An engine that disagreed with the reference
+    """
+    engine: str
+    program: int  # index of the program in the run, which the seed regenerates
+    image: Tuple[int, ...]
+    inputs: Tuple[int, ...]
+    where: str
+    detail: str
+
+
+class EngineStats:
+    """
+    Time, instructions and mismatches of an engine under test
+    """
+    def __init__(self):
+        self.instructions = 0
+        self.seconds = 0.0
+        self.compileSeconds = 0.0
+        self.mismatches = 0
+        self.timeouts = 0
+
+    @property
+    def throughput(self) -> float:
+        """
+        Instructions per second, leaving out compilation
+        """
+        return self.instructions / self.seconds if self.seconds > 0 else 0.0
+
+
+class FuzzReport:
+    """
+    Outcome of a fuzzing run
+    """
+    def __init__(self, seed: int, engines: Sequence[str]):
+        self.seed = seed
+        self.programs = 0
+        self.selfModifying = 0
+        self.skipped = 0
+        self.instructions = 0
+        self.referenceSeconds = 0.0
+        self.engines: Dict[str, EngineStats] = {engine: EngineStats() for engine in engines}
+        self.mismatches: List[Mismatch] = list()
+
+    def report(self) -> dict:
+        """
+        Summarizes the run as a JSON serializable dictionary
+        """
+        return {'seed': self.seed,
+                'programs': self.programs,
+                'selfModifying': self.selfModifying,
+                'skipped': self.skipped,
+                'instructions': self.instructions,
+                'reference': {'seconds': self.referenceSeconds,
+                              'throughput': self.instructions / self.referenceSeconds if self.referenceSeconds > 0 else 0.0},
+                'engines': {engine: {'seconds': stats.seconds,
+                                     'compileSeconds': stats.compileSeconds,
+                                     'throughput': stats.throughput,
+                                     'mismatches': stats.mismatches,
+                                     'timeouts': stats.timeouts}
+                            for engine, stats in self.engines.items()},
+                'mismatches': [mismatch._asdict() for mismatch in self.mismatches]}
+
+    def dumpJson(self, path: str):
+        """
+        Writes the report to a JSON file
+        """
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent=2)
+
+    def printReport(self, shown: int = DEFAULT_SHOWN_MISMATCHES):
+        """
+        Prints the report
+        :param shown: number of mismatches printed in full
+        """
+        report = self.report()
+        print(f'Seed {self.seed}: {self.programs} programs, {self.selfModifying} self-modifying, '
+              f'{self.skipped} skipped, {self.instructions} reference instructions')
+        print(f'\t{"reference":<15} {report["reference"]["throughput"]:>14,.0f} instructions/s')
+        for engine, stats in report['engines'].items():
+            print(f'\t{engine:<15} {stats["throughput"]:>14,.0f} instructions/s '
+                  f'{1000 * stats["compileSeconds"]:>9,.1f} ms compiling '
+                  f'{stats["mismatches"]:>6} mismatches {stats["timeouts"]:>4} timeouts')
+
+        for mismatch in self.mismatches[:shown]:
+            print(f'{mismatch.engine} on program {mismatch.program} of seed {self.seed} at {mismatch.where}: {mismatch.detail}')
+            print(f'\tinputs {",".join(map(str, mismatch.inputs))}')
+            print(f'\tprogram {",".join(map(str, mismatch.image))}')
+
+
+class ReferenceMachine:
+    """
+    Independent Intcode interpreter the engines are compared with.  It shares no code with
+    them and keeps the original computer's memory, a list that reads as 0 past its end and
+    grows with zeros when a store lands past its end.  A negative address, an illegal opcode
+    or an illegal mode raises RuntimeError before the instruction changes anything.
+
+    Once its inputs run out it stops with EVENT_NEEDS_INPUT, as IntcodeComputer does under
+    POLICY_BLOCK, or with repeatLastInput keeps reading the last one as a BatchComputer lane
+    does.  With int64 a value or address that does not fit in int64 raises RuntimeError, as it
+    faults a batch lane, and so does reading such a word of the image.
+    """
+    def __init__(self, image: Sequence[int], inputs: Sequence[int], repeatLastInput: bool = False, int64: bool = False):
+        self.memory = list(image)
+        self.distantMemory: Dict[int, int] = dict()  # words past REFERENCE_LIST_WORDS
+        self.sp = 0
+        self.relativeBase = 0
+        self.halted = False
+        self.inputs = list(inputs)
+        self.inputCounter = 0
+        self.repeatLastInput = repeatLastInput
+        self.int64 = int64
+        self.instructions = 0
+
+    def execute(self, until: Union[int, None] = None) -> Union[int, str, None]:
+        """
+        Runs until the next output, the halt or a wait for input
+        :param until: also stops once this many instructions have been executed
+        :return: the output value, EVENT_HALT, EVENT_NEEDS_INPUT, or None if it stopped at until
+        """
+        while until is None or self.instructions < until:
+            word = self.read(self.sp)
+            opcode = word % 100
+            if word < 0 or opcode not in (1, 2, 3, 4, 5, 6, 7, 8, 9, 99):
+                raise RuntimeError(f'Illegal instruction {word} at {self.sp}')
+
+            if opcode == 99:
+                self.halted = True
+                return EVENT_HALT
+            elif opcode in (1, 2, 7, 8):
+                value1 = self.operand(word, 1)
+                value2 = self.operand(word, 2)
+                if opcode == 1:
+                    result = value1 + value2
+                elif opcode == 2:
+                    result = value1 * value2
+                elif opcode == 7:
+                    result = int(value1 < value2)
+                else:
+                    result = int(value1 == value2)
+                self.store(word, 3, result)
+                self.sp += 4
+            elif opcode == 3:
+                if self.inputCounter < len(self.inputs):
+                    value = self.inputs[self.inputCounter]
+                elif self.repeatLastInput and self.inputs:
+                    value = self.inputs[-1]
+                else:
+                    return EVENT_NEEDS_INPUT
+                self.store(word, 1, value)
+                self.inputCounter += 1
+                self.sp += 2
+            elif opcode == 4:
+                value = self.operand(word, 1)
+                self.sp += 2
+                self.instructions += 1
+                return value
+            elif opcode in (5, 6):
+                value1 = self.operand(word, 1)
+                value2 = self.operand(word, 2)
+                self.sp = value2 if (value1 != 0) == (opcode == 5) else self.sp + 3
+            else:
+                self.relativeBase = self.checked(self.relativeBase + self.operand(word, 1))
+                self.sp += 2
+
+            self.instructions += 1
+
+        return None
+
+    def operand(self, word: int, parameter: int) -> int:
+        """
+        Reads the value of a parameter of the instruction at sp
+        """
+        mode = self.mode(word, parameter)
+        value = self.read(self.sp + parameter)
+        if mode == MODE_POSITION:
+            return self.read(value)
+        elif mode == MODE_IMMEDIATE:
+            return value
+
+        return self.read(self.checked(self.relativeBase + value))
+
+    def store(self, word: int, parameter: int, value: int):
+        """
+        Stores a value at the address given by a parameter of the instruction at sp.  As in the
+        original computer a store in immediate mode stores where the parameter points.
+        """
+        mode = self.mode(word, parameter)
+        address = self.read(self.sp + parameter)
+        if mode == MODE_RELATIVE:
+            address = self.checked(self.relativeBase + address)
+        value = self.checked(value)
+        if address < 0:
+            raise RuntimeError(f'Store to negative address {address}')
+
+        if address >= REFERENCE_LIST_WORDS:
+            self.distantMemory[address] = value
+        else:
+            if address >= len(self.memory):
+                self.memory.extend([0] * (address + 1 - len(self.memory)))
+            self.memory[address] = value
+
+    @staticmethod
+    def mode(word: int, parameter: int) -> int:
+        """
+        The mode of a parameter of an instruction word
+        """
+        mode = word // 10 ** (parameter + 1) % 10
+        if mode not in (MODE_POSITION, MODE_IMMEDIATE, MODE_RELATIVE):
+            raise RuntimeError(f'Illegal mode {mode} in instruction {word}')
+
+        return mode
+
+    def read(self, address: int) -> int:
+        """
+        Reads the word at an address
+        """
+        if address < 0:
+            raise RuntimeError(f'Read from negative address {address}')
+        elif address < len(self.memory):
+            # only image words can be out of int64 range, computed values are checked on store
+            return self.checked(self.memory[address])
+
+        return self.distantMemory.get(address, 0)
+
+    def checked(self, value: int) -> int:
+        """
+        Checks that a computed value fits in int64 when the machine follows batch semantics
+        """
+        if self.int64 and not INT64_MIN <= value <= INT64_MAX:
+            raise RuntimeError(f'Value {value} does not fit in int64')
+
+        return value
+
+    def state(self, event: Union[int, str, None]) -> MachineState:
+        """
+        Captures the compared state of the machine
+        """
+        memory = {address: value for address, value in enumerate(self.memory) if value != 0}
+        memory.update((address, value) for address, value in self.distantMemory.items() if value != 0)
+        return MachineState(event=event, sp=self.sp, relativeBase=self.relativeBase, halted=self.halted, memory=memory)
+
+
+def fuzz(seed: int = 0,
+         programs: int = DEFAULT_PROGRAMS,
+         engines: Union[Sequence[str], None] = None,
+         every: int = DEFAULT_EVERY,
+         maxSteps: int = DEFAULT_MAX_STEPS,
+         batchMaxSteps: int = DEFAULT_BATCH_MAX_STEPS,
+         selfModifyingShare: float = DEFAULT_SELF_MODIFYING_SHARE,
+         timeout: Union[float, None] = DEFAULT_TIMEOUT) -> FuzzReport:
+    """
+    Runs random programs on the reference implementation and on each engine under test and
+    compares them
+    :param seed: seed of the program generator, the same seed generates the same programs
+    :param programs: number of programs to generate
+    :param engines: names of the engines under test from ENGINES, defaults to all of them
+    :param every: number of instructions between the sliced engine's comparisons
+    :param maxSteps: programs the reference does not finish in this many instructions are skipped
+    :param batchMaxSteps: batch lanes the reference does not finish in this many instructions are
+                          not compared
+    :param selfModifyingShare: share of the programs that patch their own code
+    :param timeout: seconds an engine may take for a program before it is reported as hung,
+                    only enforced in the main thread of platforms with interval timers
+    :return: the report
+    """
+    engines = list(ENGINES) if engines is None else list(engines)
+    for engine in engines:
+        if engine not in ENGINES:
+            raise ValueError(f'Unknown engine {engine}')
+    if every < 1:
+        raise ValueError(f'Comparison interval must be at least 1, got {every}')
+
+    rng = random.Random(seed)
+    report = FuzzReport(seed, engines)
+    with tempfile.TemporaryDirectory(prefix='intcode-fuzz-') as directory:
+        for index in range(programs):
+            selfModifying = rng.random() < selfModifyingShare
+            image = generateProgram(rng, rng.randint(MIN_LENGTH, MAX_LENGTH), selfModifying)
+            laneInputs = [[rng.randint(-10, 100) for _ in range(INPUTS_PER_PROGRAM)] for _ in range(BATCH_LANES)]
+            inputs = laneInputs[0]
+
+            path = os.path.join(directory, f'program{index}.txt')
+            with open(path, 'w') as file:
+                file.write(','.join(map(str, image)))
+
+            try:
+                _fuzzProgram(report, index, path, image, inputs, laneInputs, engines, every, maxSteps, batchMaxSteps, timeout)
+            finally:
+                PROGRAM_CACHE.forget(path)
+
+            report.programs += 1
+            report.selfModifying += selfModifying
+
+    return report
+
+
+def generateProgram(rng: random.Random, length: int, selfModifying: bool = False) -> List[int]:
+    """
+    Generates a legal program of about length instructions, followed by its loop counters and
+    data words
+    :param rng: the random generator
+    :param length: number of instructions outside of loops
+    :param selfModifying: whether the program patches its own code
+    :return: the program image
+    """
+    # the relative base starts at the data words, so relative operands address data
+    instructions = [_Instruction(9, (MODE_IMMEDIATE,), [('data', 0)], patchable=False)]
+    _generateSegment(rng, instructions, length, 0, list(range(COUNTER_WORDS)), selfModifying)
+    instructions.append(_Instruction(99, (), [], patchable=False))
+
+    for instruction in instructions:
+        if instruction.patchTarget is not None:
+            _choosePatch(rng, instructions, instruction)
+
+    starts = list()
+    codeLength = 0
+    for instruction in instructions:
+        starts.append(codeLength)
+        codeLength += 1 + len(instruction.operands)
+
+    counterBase = codeLength
+    dataBase = counterBase + COUNTER_WORDS
+    imageLength = dataBase + DATA_WORDS
+
+    def resolve(operand: Operand) -> int:
+        kind = operand[0]
+        if kind == 'imm':
+            return operand[1]
+        elif kind == 'data':
+            return dataBase + operand[1]
+        elif kind == 'counter':
+            return counterBase + operand[1]
+        elif kind == 'code':
+            return starts[operand[1]] + operand[2]
+
+        return imageLength + operand[1]
+
+    image = list()
+    for instruction in instructions:
+        image.append(instruction.word)
+        if instruction.patchValue is not None:
+            value = resolve(instruction.patchValue)
+            split = rng.randint(-PATCH_SPLIT, PATCH_SPLIT)
+            image.extend((split, value - split, resolve(instruction.operands[2])))
+        else:
+            image.extend(resolve(operand) for operand in instruction.operands)
+
+    image.extend([MEMORY_INITIAL_VALUE] * COUNTER_WORDS)
+    image.extend(rng.randint(-20, 20) for _ in range(DATA_WORDS))
+
+    return image
+
+
+def memoryWords(memory: PagedMemory) -> Dict[int, int]:
+    """
+    The nonzero words of a memory by address
+    """
+    return {(pageNumber << PAGE_SHIFT) + offset: value
+            for pageNumber, page in memory.pages.items()
+            for offset, value in enumerate(page) if value != MEMORY_INITIAL_VALUE}
+
+
+def captureState(computer: IntcodeComputer, event: Union[int, str, None]) -> MachineState:
+    """
+    Captures the compared state of a machine
+    """
+    return MachineState(event=event,
+                        sp=computer.sp,
+                        relativeBase=computer.relativeBase,
+                        halted=computer.halted,
+                        memory=memoryWords(computer.program))
+
+
+class _Instruction:
+    """
+    An instruction being generated, with symbolic operands
+    """
+    def __init__(self, opcode: int, modes: Tuple[int, ...], operands: List[Operand], patchable: bool = True):
+        self.opcode = opcode
+        self.modes = modes
+        self.operands = operands
+        self.patchable = patchable
+        self.patchTarget = None  # set on a patch until its target is chosen
+        self.patchValue = None
+        self.targets = None  # the indices a jump may jump to
+
+    @property
+    def word(self) -> int:
+        return self.opcode + sum(mode * 10 ** (index + 2) for index, mode in enumerate(self.modes))
+
+
+class _StepLimit(Exception):
+    """
+    The reference ran past maxSteps
+    """
+
+
+class _Timeout(Exception):
+    """
+    An engine ran past its time limit
+    """
+
+
+class _ReferenceRun(NamedTuple):
+    """
+    A run of the reference
+    """
+    syncStates: List[MachineState]  # at every return
+    states: Dict[int, MachineState]  # every N instructions
+    outputs: List[int]
+    instructions: int
+    seconds: float
+
+
+def _generateSegment(rng: random.Random,
+                     instructions: List[_Instruction],
+                     length: int,
+                     depth: int,
+                     counters: List[int],
+                     selfModifying: bool):
+    """
+    Appends a straight run of instructions and counted loops.  Jumps go forward to an
+    instruction of the run itself or to the end of the run, so they can leave a loop but
+    cannot enter one past its counter initialization.
+    """
+    start = len(instructions)
+    boundaries = list()
+    jumps = list()
+    while len(instructions) - start < length:
+        boundaries.append(len(instructions))
+        if depth < MAX_LOOP_DEPTH and counters and rng.random() < LOOP_PROBABILITY:
+            counter = counters.pop()
+            instructions.append(_Instruction(1, (MODE_IMMEDIATE, MODE_IMMEDIATE, MODE_POSITION),
+                                             [('imm', 0), ('imm', rng.randint(1, MAX_LOOP_COUNT)), ('counter', counter)],
+                                             patchable=False))
+            body = len(instructions)
+            _generateSegment(rng, instructions, rng.randint(1, length // 2 + 1), depth + 1, counters, selfModifying)
+            instructions.append(_Instruction(1, (MODE_POSITION, MODE_IMMEDIATE, MODE_POSITION),
+                                             [('counter', counter), ('imm', -1), ('counter', counter)],
+                                             patchable=False))
+            instructions.append(_Instruction(5, (MODE_POSITION, MODE_IMMEDIATE),
+                                             [('counter', counter), ('code', body, 0)],
+                                             patchable=False))
+            counters.append(counter)
+        elif selfModifying and rng.random() < PATCH_PROBABILITY:
+            patch = _Instruction(1, (MODE_IMMEDIATE, MODE_IMMEDIATE, MODE_POSITION), [None, None, None], patchable=False)
+            patch.patchTarget = True
+            instructions.append(patch)
+        else:
+            instruction = _randomInstruction(rng)
+            if instruction.opcode in (5, 6):
+                jumps.append(len(instructions))
+            instructions.append(instruction)
+
+    boundaries.append(len(instructions))
+    for index in jumps:
+        jump = instructions[index]
+        jump.targets = [boundary for boundary in boundaries if boundary > index]
+        jump.operands[1] = ('code', rng.choice(jump.targets), 0)
+
+
+def _randomInstruction(rng: random.Random) -> _Instruction:
+    """
+    Generates a random legal instruction.  Jump targets are left for the caller.
+    """
+    opcode = rng.choices(list(OPCODE_WEIGHTS), weights=list(OPCODE_WEIGHTS.values()))[0]
+    count = PARAMETER_COUNTS[opcode]
+    storeIndex = STORE_PARAMETERS.get(opcode)
+
+    modes = list()
+    operands = list()
+    for index in range(count):
+        if index == storeIndex:
+            mode = rng.choice((MODE_POSITION, MODE_POSITION, MODE_RELATIVE))
+            operand = _storeOperand(rng, mode)
+        elif opcode in (5, 6) and index == 1:
+            mode, operand = MODE_IMMEDIATE, None
+        else:
+            mode = rng.choice((MODE_POSITION, MODE_IMMEDIATE, MODE_RELATIVE))
+            operand = _readOperand(rng, mode)
+
+        modes.append(mode)
+        operands.append(operand)
+
+    return _Instruction(opcode, tuple(modes), operands)
+
+
+def _readOperand(rng: random.Random, mode: int) -> Operand:
+    """
+    A random operand read with the given mode: data, code or past the end of the image
+    """
+    if mode == MODE_IMMEDIATE:
+        if rng.random() < WIDE_VALUE_PROBABILITY:
+            return 'imm', rng.choice(WIDE_VALUES)
+        return 'imm', rng.randint(-10, 10)
+    elif mode == MODE_RELATIVE:
+        return 'imm', rng.randint(-2, DATA_WORDS + 2)
+
+    where = rng.random()
+    if where < 0.7:
+        return 'data', rng.randrange(DATA_WORDS)
+    elif where < 0.85:
+        return 'past', rng.randrange(PAST_END_WORDS)
+
+    return 'imm', rng.randint(0, 30)
+
+
+def _storeOperand(rng: random.Random, mode: int) -> Operand:
+    """
+    A random store address with the given mode: data or past the end of the image
+    """
+    if mode == MODE_RELATIVE:
+        return 'imm', rng.randint(0, DATA_WORDS - 1)
+    elif rng.random() < 0.9:
+        return 'data', rng.randrange(DATA_WORDS)
+
+    return 'past', rng.randrange(PAST_END_WORDS)
+
+
+def _choosePatch(rng: random.Random, instructions: List[_Instruction], patch: _Instruction):
+    """
+    Points a patch at an instruction, rewriting either one of its operands or, for opcodes of
+    OPCODE_GROUPS, its opcode word to another opcode of the same length.  Rewritten jumps still jump forward.
+    """
+    patch.patchTarget = None
+    targets = [index for index, instruction in enumerate(instructions) if instruction.patchable]
+    if not targets:
+        patch.patchValue = ('imm', rng.randint(-10, 10))
+        patch.operands[2] = ('data', rng.randrange(DATA_WORDS))
+        return
+
+    index = rng.choice(targets)
+    target = instructions[index]
+    group = next((group for group in OPCODE_GROUPS if target.opcode in group), None)
+    if group is not None and rng.random() < 0.5:
+        opcode = rng.choice(group)
+        storeIndex = STORE_PARAMETERS.get(opcode)
+        modes = tuple(rng.choice((MODE_POSITION, MODE_RELATIVE)) if parameter == storeIndex else
+                      MODE_IMMEDIATE if opcode in (5, 6) and parameter == 1 else
+                      rng.choice((MODE_POSITION, MODE_IMMEDIATE, MODE_RELATIVE))
+                      for parameter in range(PARAMETER_COUNTS[opcode]))
+        patch.patchValue = ('imm', _Instruction(opcode, modes, []).word)
+        patch.operands[2] = ('code', index, 0)
+        return
+
+    parameter = rng.randrange(len(target.operands))
+    if target.targets is not None and parameter == 1:
+        patch.patchValue = ('code', rng.choice(target.targets), 0)
+    elif parameter == STORE_PARAMETERS.get(target.opcode):
+        patch.patchValue = _storeOperand(rng, target.modes[parameter])
+    else:
+        patch.patchValue = _readOperand(rng, target.modes[parameter])
+    patch.operands[2] = ('code', index, 1 + parameter)
+
+
+def _fuzzProgram(report: FuzzReport,
+                 index: int,
+                 path: str,
+                 image: List[int],
+                 inputs: List[int],
+                 laneInputs: List[List[int]],
+                 engines: Sequence[str],
+                 every: int,
+                 maxSteps: int,
+                 batchMaxSteps: int,
+                 timeout: Union[float, None]):
+    """
+    Runs one program on the reference and on every engine under test
+    """
+    try:
+        run = _runReference(ReferenceMachine(image, inputs), every, maxSteps)
+    except _StepLimit:
+        report.skipped += 1
+        return
+
+    report.instructions += run.instructions
+    report.referenceSeconds += run.seconds
+
+    for engine in engines:
+        stats = report.engines[engine]
+        instructions = run.instructions
+        compileSeconds = 0.0
+        mismatchInputs = inputs
+        try:
+            with _deadline(timeout):
+                if engine == ENGINE_BATCH:
+                    where, detail, elapsed, instructions, mismatchInputs = _compareBatch(path, image, laneInputs, batchMaxSteps)
+                else:
+                    machineEngine, memory = ENGINES[engine]
+                    if machineEngine == IntcodeComputer.ENGINE_TRANSLATED:
+                        # translates into a cache in the run's directory, and the machine then
+                        # finds the translation in memory rather than in the user's cache
+                        start = time.perf_counter()
+                        loadTranslation(image, cacheDir=os.path.dirname(path))
+                        compileSeconds += time.perf_counter() - start
+
+                    computer = _newComputer(path, machineEngine, memory, inputs,
+                                            summarizeLoops=engine in (ENGINE_LOOPS, ENGINE_LOOPS_INT64))
+                    if engine == ENGINE_TRACED:
+                        computer.setTraceHook(_ignoreTrace, every=every)
+
+                    if engine == ENGINE_SLICE:
+                        where, detail, elapsed = _compareSliced(computer, run.states, run.syncStates[-1], run.outputs, every, run.instructions)
+                    else:
+                        where, detail, elapsed = _compareExecuted(computer, run.syncStates)
+                    compileSeconds += computer.compileSeconds
+                    elapsed -= computer.compileSeconds
+        except _Timeout:
+            stats.timeouts += 1
+            where, detail, elapsed = 'timeout', f'no result after {timeout} s', timeout
+        except Exception as error:
+            # a crash of the harness or of an engine outside the runs it compares
+            where, detail, elapsed = 'crash', f'{type(error).__name__}: {error}', 0.0
+
+        stats.instructions += instructions
+        stats.seconds += elapsed
+        stats.compileSeconds += compileSeconds
+        if detail is not None:
+            stats.mismatches += 1
+            report.mismatches.append(Mismatch(engine=engine, program=index, image=tuple(image), inputs=tuple(mismatchInputs), where=where, detail=detail))
+
+
+def _runReference(machine: ReferenceMachine, every: Union[int, None], maxSteps: int) -> _ReferenceRun:
+    """
+    Runs the reference to the end of its run, capturing its state each time it returns and
+    each time it has executed a multiple of every instructions
+    :raises _StepLimit: if it runs past maxSteps instructions
+    """
+    syncStates = list()
+    states = dict()
+    outputs = list()
+    seconds = 0.0
+    while True:
+        until = maxSteps + 1 if every is None else min((machine.instructions // every + 1) * every, maxSteps + 1)
+        start = time.perf_counter()
+        try:
+            event = machine.execute(until)
+        except RuntimeError as error:
+            event = f'error {type(error).__name__}'
+        seconds += time.perf_counter() - start
+
+        if event is None and machine.instructions > maxSteps:
+            raise _StepLimit()
+        if every is not None and not isinstance(event, str) and machine.instructions % every == 0:
+            states[machine.instructions] = machine.state(None)
+        if event is None:
+            continue
+
+        syncStates.append(machine.state(event))
+        if not isinstance(event, int):
+            return _ReferenceRun(syncStates=syncStates, states=states, outputs=outputs, instructions=machine.instructions, seconds=seconds)
+        outputs.append(event)
+
+
+def _compareBatch(path: str,
+                  image: List[int],
+                  laneInputs: List[List[int]],
+                  maxSteps: int) -> Tuple[str, Union[str, None], float, int, List[int]]:
+    """
+    Runs the program in BatchComputer lanes, one per input vector, and compares each lane's
+    outputs and final state with a reference run under batch semantics.  Lanes the reference
+    does not finish within maxSteps instructions are not compared.
+    :return: (where the first difference is, the difference or None, seconds spent executing,
+              instructions of the compared lanes, inputs of the lane that differed)
+    """
+    runs = list()
+    for inputs in laneInputs:
+        try:
+            runs.append(_runReference(ReferenceMachine(image, inputs, repeatLastInput=True, int64=True), None, maxSteps))
+        except _StepLimit:
+            runs.append(None)
+
+    compared = [run for run in runs if run is not None]
+    if not compared:
+        return '', None, 0.0, 0, laneInputs[0]
+    instructions = sum(run.instructions for run in compared)
+
+    batch = BatchComputer(path, len(laneInputs))
+    batch.setInputs(laneInputs)
+    start = time.perf_counter()
+    # every lane executes one instruction a step, the one that ends its run included
+    batch.execute(maxSteps=max(run.instructions for run in compared) + 1)
+    elapsed = time.perf_counter() - start
+
+    for lane, run in enumerate(runs):
+        if run is None:
+            continue
+
+        where = f'lane {lane}'
+        if batch.outputs[lane] != run.outputs:
+            return where, f'outputs {run.outputs} != {batch.outputs[lane]}', elapsed, instructions, laneInputs[lane]
+
+        final = run.syncStates[-1]
+        expected = final._replace(event=EVENT_FAULT if isinstance(final.event, str) and final.event.startswith('error') else final.event)
+        detail = expected.difference(_laneState(batch, lane, image))
+        if detail is not None:
+            return where, detail, elapsed, instructions, laneInputs[lane]
+
+    return '', None, elapsed, instructions, laneInputs[0]
+
+
+def _laneState(batch: BatchComputer, lane: int, image: Sequence[int]) -> MachineState:
+    """
+    Captures the compared state of a batch lane at the end of its run.  Image words that do not
+    fit in int64 are held as 0 by the batch until a lane overwrites them, so the ones the lane
+    has not overwritten are taken from the image.
+    """
+    if batch.faulted[lane]:
+        event = EVENT_FAULT
+    elif batch.halted[lane]:
+        event = EVENT_HALT
+    else:
+        event = None
+
+    memory = {address: value for address, value in enumerate(batch.program[lane].tolist()) if value != 0}
+    memory.update((address, value) for address, value in batch.sparse[lane].items() if value != 0)
+    for address, live in zip(batch.oversizedAddresses.tolist(), batch.oversizedLive[lane].tolist()):
+        if live:
+            memory[address] = image[address]
+    return MachineState(event=event,
+                        sp=int(batch.sp[lane]),
+                        relativeBase=int(batch.relativeBase[lane]),
+                        halted=bool(batch.halted[lane] and not batch.faulted[lane]),
+                        memory=memory)
+
+
+def _compareExecuted(computer: IntcodeComputer, syncStates: List[MachineState]) -> Tuple[str, Union[str, None], float]:
+    """
+    Runs an execute() engine, comparing it with the reference each time it returns
+    :return: (where the first difference is, the difference or None, seconds spent executing)
+    """
+    events = _events(computer)
+    elapsed = 0.0
+    for index, expected in enumerate(syncStates):
+        start = time.perf_counter()
+        event = next(events)
+        elapsed += time.perf_counter() - start
+
+        detail = expected.difference(captureState(computer, event))
+        if detail is not None:
+            return f'return {index}', detail, elapsed
+
+    return '', None, elapsed
+
+
+def _compareSliced(computer: IntcodeComputer,
+                   states: Dict[int, MachineState],
+                   final: MachineState,
+                   outputs: List[int],
+                   every: int,
+                   instructions: int) -> Tuple[str, Union[str, None], float]:
+    """
+    Runs the sliced engine, comparing it with the reference after every slice and at the end
+    :return: (where the first difference is, the difference or None, seconds spent executing)
+    """
+    slicedOutputs = list()
+    computer.outputBuffer = slicedOutputs
+    elapsed = 0.0
+    while True:
+        start = time.perf_counter()
+        try:
+            result = computer.executeSlice(every)
+        except _Timeout:
+            raise
+        except Exception as error:
+            result = f'error {type(error).__name__}'
+        elapsed += time.perf_counter() - start
+
+        if result is not IntcodeComputer.OUT_OF_BUDGET:
+            break
+
+        where = f'instruction {computer.instructionCount}'
+        expected = states.get(computer.instructionCount)
+        if expected is None:
+            return where, f'still running after the reference\'s {instructions} instructions', elapsed
+
+        detail = expected.difference(captureState(computer, None))
+        if detail is not None:
+            return where, detail, elapsed
+
+    where = f'instruction {computer.instructionCount}'
+    if slicedOutputs != outputs:
+        return where, f'outputs {outputs} != {slicedOutputs}', elapsed
+
+    return where, final.difference(captureState(computer, _event(result))), elapsed
+
+
+def _newComputer(path: str, engine: str, memory: str, inputs: List[int], summarizeLoops: bool = False) -> IntcodeComputer:
+    """
+    Makes a machine that stops with NEEDS_INPUT once its inputs run out
+    """
+    computer = IntcodeComputer(inputFile=path, engine=engine, memory=memory, summarizeLoops=summarizeLoops)
+    computer.setInputPolicy(InputChannel.POLICY_BLOCK)
+    computer.setInputs(inputs)
+
+    return computer
+
+
+def _ignoreTrace(pc: int, opcode: int, modes: Tuple[int, ...], operands: Tuple[int, ...], result):
+    """
+    Trace hook of the traced engine under test, which only needs a hook to be set
+    """
+
+
+def _events(computer: IntcodeComputer) -> Iterator[Union[int, str]]:
+    """
+    Runs a machine with execute() and yields what each call returned, up to the call that
+    ends the run
+    """
+    while True:
+        try:
+            event = _event(computer.execute())
+        except _Timeout:
+            raise
+        except Exception as error:
+            event = f'error {type(error).__name__}'
+
+        yield event
+        if not isinstance(event, int):
+            return
+
+
+def _event(result: Union[int, Signal, str, None]) -> Union[int, str]:
+    """
+    Names what a run returned
+    """
+    if result is None:
+        return EVENT_HALT
+    elif result is IntcodeComputer.NEEDS_INPUT:
+        return EVENT_NEEDS_INPUT
+
+    return result
+
+
+@contextlib.contextmanager
+def _deadline(seconds: Union[float, None]):
+    """
+    Raises _Timeout in the block once it has run for the given number of seconds
+    """
+    if seconds is None or not hasattr(signal, 'setitimer') or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def expire(signalNumber, frame):
+        raise _Timeout()
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
@@ -0,0 +1,376 @@
+"""
+Closed form summaries of counted loops for the block compiler
+
+A compiled block whose closing jump goes back to its own entry is a single block natural
+loop of the control flow graph: a straight line of arithmetic and compares that runs until
+its jump falls through.  summarizeLoop() evaluates one iteration symbolically, with every
+memory word the loop touches as a Polynomial symbol, and classifies each word it writes:
+    * induction variable: i' = i + c
+    * arithmetic series: s' = s + a*i + b, for induction variables i
+    * geometric recurrence: g' = k*g + c
+    * last value: v' = f(induction variables), e.g. the compare feeding the jump
+where a, b, c, k and f may use the words the loop only reads.  When every written word has
+one of these forms and the jump condition is affine in the induction variables, the trip
+count and the final value of every word follow in closed form, so the loop costs O(1)
+instead of O(iterations).
+
+The summary runs as a prologue of the block and only applies when it is sound at run time:
+the words are distinct, none of the written words is compiled code and the loop ends after
+more than one iteration.  The loop's own code is covered by the block, so writing to it
+invalidates the summary like any other block.  Otherwise, and on page faults, the block runs
+a single iteration as usual.  Results that do not fit a typed page leave memory untouched and
+hand the loop's first instruction to the reference opcode, so with int64 memory a loop whose
+results outgrow int64 runs iteration by iteration until its memory is promoted to lists.
+
+Only single block loops are handled.  Loops are found by matching the block compiler's own
+blocks, not the natural loops of Disassembler.analyze()'s control flow graph, so a loop whose
+body branches or spans several blocks is never summarized.  The hot loops of the puzzle
+programs are all of that kind, which is why summarization is off unless the machine is built
+with summarizeLoops=True.
+"""
+from typing import Dict, List, Set, Tuple, Union
+
+from .Memory import PAGE_MASK, PAGE_SHIFT
+from .Symbolic import Polynomial
+
+MODE_POSITION = 0
+MODE_IMMEDIATE = 1
+MODE_RELATIVE = 2
+
+OP_ADD = 1
+OP_MULTIPLY = 2
+OP_JUMP_IF_TRUE = 5
+OP_JUMP_IF_FALSE = 6
+OP_LESS_THAN = 7
+OP_EQUALS = 8
+
+# geometric recurrences are summarized only while their result stays this small
+MAX_RESULT_BITS = 1 << 20
+
+# when the loop continues, given the jump condition's value x at the end of an iteration
+CONTINUE_NONZERO = 'nonzero'
+CONTINUE_ZERO = 'zero'
+CONTINUE_NEGATIVE = 'negative'
+CONTINUE_NONNEGATIVE = 'nonnegative'
+
+# (address, opcode, modes, parameters), as decoded by the block compiler
+Instruction = Tuple[int, int, Tuple[int, ...], Tuple[Union[int, None], ...]]
+
+# ('position', address) or ('relative', offset)
+Cell = Tuple[str, int]
+
+INDENT = ' ' * 8
+
+
+class Comparison:
+    """
+    The result of a compare instruction, 1 if left < right (or left == right) and 0 otherwise
+    """
+    def __init__(self, opcode: int, left: Polynomial, right: Polynomial):
+        self.opcode = opcode
+        self.left = left
+        self.right = right
+
+
+class _NotSummarizable(Exception):
+    """
+    The loop does not have a closed form this module knows
+    """
+
+
+def summarizeLoop(entry: int, instructions: List[Instruction]) -> Union[List[str], None]:
+    """
+    Generates the closed form prologue of a block that loops back to its own entry
+    :param entry: the block's entry address
+    :param instructions: the block's instructions, ending with the jump back to entry
+    :return: source lines for the start of the block's try clause, or None if the block is
+             not a loop with a closed form
+    """
+    if not instructions:
+        return None
+
+    address, opcode, modes, parameters = instructions[-1]
+    if (opcode not in (OP_JUMP_IF_TRUE, OP_JUMP_IF_FALSE) or modes[1] != MODE_IMMEDIATE or
+            parameters[1] != entry or len(instructions) < 2):
+        return None
+
+    try:
+        return _Summary(instructions).source(nextSp=address + 3)
+    except _NotSummarizable:
+        return None
+
+
+class _Summary:
+    """
+    One symbolic iteration of a loop and the classification of the words it writes
+    """
+    def __init__(self, instructions: List[Instruction]):
+        self.cells: Dict[Cell, int] = dict()  # cell -> index, in order of first use
+        self.values: Dict[Cell, Union[Polynomial, Comparison]] = dict()  # value after one iteration
+
+        for _, opcode, modes, parameters in instructions[:-1]:
+            if opcode not in (OP_ADD, OP_MULTIPLY, OP_LESS_THAN, OP_EQUALS) or None in parameters:
+                raise _NotSummarizable()
+
+            left = self._polynomial(self._read(modes[0], parameters[0]))
+            right = self._polynomial(self._read(modes[1], parameters[1]))
+            if opcode == OP_ADD:
+                value = left + right
+            elif opcode == OP_MULTIPLY:
+                value = left * right
+            else:
+                value = Comparison(opcode, left, right)
+            self.values[self._cell(modes[2], parameters[2])] = value
+
+        _, opcode, modes, parameters = instructions[-1]
+        if parameters[0] is None:
+            raise _NotSummarizable()
+        condition = self._read(modes[0], parameters[0])
+
+        self.written: Set[str] = {self._symbol(cell) for cell in self.values}
+        self.induction: Dict[Cell, Polynomial] = dict()  # induction variable -> step
+        for cell, value in self.values.items():
+            if isinstance(value, Polynomial):
+                step = value + Polynomial.symbol(self._symbol(cell)) * -1
+                if not self._symbols(step).intersection(self.written):
+                    self.induction[cell] = step
+        self.inductionSymbols = {self._symbol(cell) for cell in self.induction}
+
+        # the jump continues the loop depending on x = difference, see the CONTINUE_* constants
+        if isinstance(condition, Comparison):
+            self.difference = condition.left + condition.right * -1
+            if condition.opcode == OP_LESS_THAN:
+                self.continues = CONTINUE_NEGATIVE if opcode == OP_JUMP_IF_TRUE else CONTINUE_NONNEGATIVE
+            else:
+                self.continues = CONTINUE_ZERO if opcode == OP_JUMP_IF_TRUE else CONTINUE_NONZERO
+        else:
+            self.difference = condition
+            self.continues = CONTINUE_NONZERO if opcode == OP_JUMP_IF_TRUE else CONTINUE_ZERO
+
+        if not self.induction or not self._isAffine(self.difference):
+            raise _NotSummarizable()
+
+        # cell -> (kind, parts)
+        self.forms: Dict[Cell, Tuple[str, tuple]] = dict()
+        for cell, value in self.values.items():
+            self.forms[cell] = self._classify(cell, value)
+
+    def source(self, nextSp: int) -> List[str]:
+        """
+        Generates the prologue that jumps straight to nextSp with every written word updated
+        """
+        indices = sorted(self.cells.values())
+        writtenIndices = [self.cells[cell] for cell in self.values]
+
+        lines = list()
+        for cell, index in self.cells.items():
+            kind, parameter = cell
+            lines.append(f'cell{index} = {"relativeBase + " if kind == "relative" else ""}{parameter}')
+
+        guards = [f'len({{{", ".join(f"cell{index}" for index in indices)}}}) == {len(indices)}']
+        guards.extend(f'cell{index} not in codeAddresses' for index in writtenIndices)
+        lines.append(f'if {" and ".join(guards)}:')
+
+        body = list()
+        for index in indices:
+            body.append(f'value{index} = pages[cell{index} >> {PAGE_SHIFT}][cell{index} & {PAGE_MASK}]')
+
+        start = self._names()
+        for cell, step in self.induction.items():
+            body.append(f'step{self.cells[cell]} = {_expression(step, start)}')
+
+        # x at the end of the first iteration and its change per iteration
+        second = self._names(iterations='1')
+        body.append(f'difference = {_expression(self.difference, start)}')
+        body.append(f'slope = {_expression(self.difference, second)} - difference')
+        body.append('trips = None')
+        body.extend(_tripCountSource(self.continues))
+
+        last = self._names(iterations='(trips - 1)')
+        finals = list()
+        for cell, (kind, parts) in self.forms.items():
+            index = self.cells[cell]
+            if kind == 'induction':
+                finals.append(f'final{index} = value{index} + trips * step{index}')
+            elif kind == 'series':
+                increment, = parts
+                body.append(f'increment{index} = {_expression(increment, start)}')
+                body.append(f'growth{index} = {_expression(increment, second)} - increment{index}')
+                finals.append(f'final{index} = value{index} + trips * increment{index} + '
+                              f'growth{index} * (trips * (trips - 1) // 2)')
+            elif kind == 'geometric':
+                factor, constant = parts
+                body.append(f'factor{index} = {_expression(factor, start)}')
+                body.append(f'constant{index} = {_expression(constant, start)}')
+                body.append(f'if trips is not None and factor{index} not in (-1, 0, 1) and '
+                            f'trips * factor{index}.bit_length() > {MAX_RESULT_BITS}:')
+                body.append('    trips = None')
+                finals.extend([f'if factor{index} == 1:',
+                               f'    final{index} = value{index} + trips * constant{index}',
+                               'else:',
+                               f'    power{index} = factor{index} ** trips',
+                               f'    final{index} = value{index} * power{index} + '
+                               f'constant{index} * (power{index} - 1) // (factor{index} - 1)'])
+            elif isinstance(parts[0], Comparison):
+                comparison, = parts
+                operator = '<' if comparison.opcode == OP_LESS_THAN else '=='
+                finals.append(f'final{index} = 1 if {_expression(comparison.left, last)} {operator} '
+                              f'{_expression(comparison.right, last)} else 0')
+            else:
+                value, = parts
+                finals.append(f'final{index} = {_expression(value, last)}')
+
+        body.append('if trips is not None and trips > 1:')
+        body.extend(f'    {line}' for line in finals)
+
+        # look every page up before the first store, so a fault leaves memory untouched
+        for index in writtenIndices:
+            body.append(f'    page{index} = writablePages[cell{index} >> {PAGE_SHIFT}]')
+        body.append('    try:')
+        body.extend(f'        page{index}[cell{index} & {PAGE_MASK}] = final{index}' for index in writtenIndices)
+        body.append('    except OverflowError:')
+        body.extend(f'        page{index}[cell{index} & {PAGE_MASK}] = value{index}' for index in writtenIndices)
+        body.append('        raise')
+        body.append(f'    return {nextSp}, relativeBase, True')
+
+        lines.extend(f'    {line}' for line in body)
+
+        return [INDENT + line for line in lines]
+
+    def _classify(self, cell: Cell, value: Union[Polynomial, Comparison]) -> Tuple[str, tuple]:
+        """
+        Finds the closed form of a written word
+        """
+        symbol = self._symbol(cell)
+        if isinstance(value, Comparison):
+            if self._onlyInduction(value.left) and self._onlyInduction(value.right):
+                return 'last', (value,)
+            raise _NotSummarizable()
+
+        if cell in self.induction:
+            return 'induction', (self.induction[cell],)
+        elif symbol not in self._symbols(value) and self._onlyInduction(value):
+            return 'last', (value,)
+
+        increment = value + Polynomial.symbol(symbol) * -1
+        if symbol not in self._symbols(increment) and self._isAffine(increment):
+            return 'series', (increment,)
+
+        if value.degree(symbol) == 1:
+            factor = Polynomial({tuple(power for power in monomial if power[0] != symbol): coefficient
+                                 for monomial, coefficient in value.terms.items() if symbol in dict(monomial)})
+            constant = Polynomial({monomial: coefficient for monomial, coefficient in value.terms.items()
+                                   if symbol not in dict(monomial)})
+            if not self._symbols(factor).intersection(self.written) and not self._symbols(constant).intersection(self.written):
+                return 'geometric', (factor, constant)
+
+        raise _NotSummarizable()
+
+    def _isAffine(self, polynomial: Polynomial) -> bool:
+        """
+        Whether a polynomial is affine in the induction variables, with coefficients that only
+        use words the loop does not write
+        """
+        for monomial in polynomial.terms:
+            written = [(name, power) for name, power in monomial if name in self.written]
+            if len(written) > 1 or written and (written[0][0] not in self.inductionSymbols or written[0][1] != 1):
+                return False
+
+        return True
+
+    def _onlyInduction(self, polynomial: Polynomial) -> bool:
+        """
+        Whether the written words a polynomial uses are all induction variables
+        """
+        return self._symbols(polynomial).intersection(self.written).issubset(self.inductionSymbols)
+
+    def _names(self, iterations: Union[str, None] = None) -> Dict[str, str]:
+        """
+        Python expressions for the symbols at the start of the loop, or after a number of
+        iterations, which only moves the induction variables
+        """
+        names = dict()
+        for cell, index in self.cells.items():
+            if iterations is not None and cell in self.induction:
+                names[self._symbol(cell)] = f'(value{index} + step{index} * {iterations})'
+            else:
+                names[self._symbol(cell)] = f'value{index}'
+
+        return names
+
+    def _read(self, mode: int, parameter: int) -> Union[Polynomial, Comparison]:
+        """
+        The symbolic value of an operand
+        """
+        if mode == MODE_IMMEDIATE:
+            return Polynomial({(): parameter})
+
+        cell = self._cell(mode, parameter)
+        value = self.values.get(cell)
+        return value if value is not None else Polynomial.symbol(self._symbol(cell))
+
+    def _cell(self, mode: int, parameter: int) -> Cell:
+        """
+        The word an operand addresses, registering it on first use
+        """
+        cell = ('relative', parameter) if mode == MODE_RELATIVE else ('position', parameter)
+        self.cells.setdefault(cell, len(self.cells))
+        return cell
+
+    def _symbol(self, cell: Cell) -> str:
+        return f'cell{self.cells[cell]}'
+
+    @staticmethod
+    def _polynomial(value: Union[Polynomial, Comparison]) -> Polynomial:
+        """
+        Checks that a value used in arithmetic is not a compare result
+        """
+        if isinstance(value, Comparison):
+            raise _NotSummarizable()
+        return value
+
+    @staticmethod
+    def _symbols(polynomial: Polynomial) -> Set[str]:
+        return {name for monomial in polynomial.terms for name, _ in monomial}
+
+
+def _tripCountSource(continues: str) -> List[str]:
+    """
+    Statements that set trips, the number of iterations the loop runs, from the jump
+    condition's value after the first iteration (difference) and its change per iteration
+    (slope).  trips stays None for a loop that never ends.
+    """
+    if continues == CONTINUE_NONZERO:
+        return ['if slope == 0:',
+                '    trips = 1 if difference == 0 else None',
+                'elif -difference % slope == 0 and -difference // slope >= 0:',
+                '    trips = -difference // slope + 1']
+    elif continues == CONTINUE_ZERO:
+        return ['if difference != 0:',
+                '    trips = 1',
+                'elif slope != 0:',
+                '    trips = 2']
+    elif continues == CONTINUE_NEGATIVE:
+        return ['if difference >= 0:',
+                '    trips = 1',
+                'elif slope > 0:',
+                '    trips = (slope - difference - 1) // slope + 1']
+
+    return ['if difference < 0:',
+            '    trips = 1',
+            'elif slope < 0:',
+            '    trips = difference // -slope + 2']
+
+
+def _expression(polynomial: Polynomial, names: Dict[str, str]) -> str:
+    """
+    Python expression for a polynomial, with its symbols replaced by the given expressions
+    """
+    terms = list()
+    for monomial, coefficient in polynomial.terms.items():
+        factors = [names[name] if power == 1 else f'{names[name]} ** {power}' for name, power in monomial]
+        if coefficient != 1 or not factors:
+            factors.insert(0, f'({coefficient})')
+        terms.append(' * '.join(factors))
+
+    return f'({" + ".join(terms) or "0"})'
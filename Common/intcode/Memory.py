@@ -0,0 +1,148 @@
+"""
+Paged sparse memory for the Intcode computer
+"""
+from array import array
+from typing import Dict, List, Sequence, Union
+
+PAGE_SHIFT = 10
+PAGE_SIZE = 1 << PAGE_SHIFT
+PAGE_MASK = PAGE_SIZE - 1
+
+MEMORY_INITIAL_VALUE = 0
+
+INT64_TYPECODE = 'q'
+
+Page = Union[List[int], array]
+
+
+class PagedMemory:
+    """
+    Intcode memory made of fixed size pages that are only allocated when first written.
+    Reads of pages that have never been written return MEMORY_INITIAL_VALUE.
+
+    pages holds every page that can be read.  writablePages holds the subset this memory
+    owns outright; the rest are shared copy-on-write with forks and snapshots and are copied
+    on their first write.  The hot loops index both tables directly and treat a KeyError as
+    an untouched or shared page:
+        value = memory.pages[address >> PAGE_SHIFT][address & PAGE_MASK]
+        memory.writablePages[address >> PAGE_SHIFT][address & PAGE_MASK] = value
+
+    Pages are lists of ints by default.  A typed memory keeps them as int64 arrays instead,
+    8 bytes a word with no boxed int behind it.  Storing a value that does not fit raises
+    OverflowError in the hot loops, which hand the instruction to the reference opcode like
+    a page fault; a store through __setitem__ promotes the memory to lists, so only the
+    machine whose values outgrew int64 pays for arbitrary precision.
+    """
+    def __init__(self, image: Sequence[int] = (), typed: bool = False):
+        self.pages: Dict[int, Page] = dict()
+        self.writablePages: Dict[int, Page] = dict()
+        self.typed = typed
+
+        # writes made through __setitem__ to these addresses are reported to onWatchedWrite
+        self.watchedAddresses = frozenset()
+        self.onWatchedWrite = None
+
+        self.loadImage(image)
+
+    def loadImage(self, image: Sequence[int]):
+        """
+        Loads a program image starting at address 0
+        """
+        self.loadPages({start >> PAGE_SHIFT: image[start:start + PAGE_SIZE] for start in range(0, len(image), PAGE_SIZE)})
+
+    def loadPages(self, pages: Dict[int, Sequence[int]]):
+        """
+        Loads whole pages of words, padding short pages with MEMORY_INITIAL_VALUE.  A typed
+        memory is promoted if a word does not fit in int64.
+        """
+        for pageNumber, words in pages.items():
+            page = list(words)
+            page.extend([MEMORY_INITIAL_VALUE] * (PAGE_SIZE - len(page)))
+            if self.typed:
+                try:
+                    page = array(INT64_TYPECODE, page)
+                except OverflowError:
+                    self.promote()
+
+            self.pages[pageNumber] = page
+            self.writablePages[pageNumber] = page
+
+    def __getitem__(self, address: int) -> int:
+        page = self.pages.get(address >> PAGE_SHIFT)
+        if page is None:
+            return MEMORY_INITIAL_VALUE
+
+        return page[address & PAGE_MASK]
+
+    def __setitem__(self, address: int, value: int):
+        try:
+            self.page(address >> PAGE_SHIFT)[address & PAGE_MASK] = value
+        except OverflowError:
+            self.promote()
+            self.page(address >> PAGE_SHIFT)[address & PAGE_MASK] = value
+
+        if address in self.watchedAddresses:
+            self.onWatchedWrite(address)
+
+    def page(self, pageNumber: int) -> Page:
+        """
+        Gets a page for writing, allocating it if it has never been written and copying it
+        if it is shared
+        """
+        page = self.writablePages.get(pageNumber)
+        if page is None:
+            shared = self.pages.get(pageNumber)
+            if shared is None:
+                page = [MEMORY_INITIAL_VALUE] * PAGE_SIZE
+                if self.typed:
+                    page = array(INT64_TYPECODE, page)
+            else:
+                page = shared[:]
+
+            self.pages[pageNumber] = page
+            self.writablePages[pageNumber] = page
+
+        return page
+
+    def fork(self) -> 'PagedMemory':
+        """
+        Makes a copy-on-write clone.  Every page becomes shared, so the first write to a page
+        by either memory copies that page and the clone costs one reference per page.
+        """
+        clone = PagedMemory(typed=self.typed)
+        clone.pages = dict(self.pages)
+
+        # clear rather than replace so that running loops keep a valid reference
+        self.writablePages.clear()
+
+        return clone
+
+    def promote(self):
+        """
+        Converts a typed memory to lists of arbitrary precision ints.  The page tables are
+        updated in place, so running loops keep valid references, and pages shared with forks
+        stay typed for the forks.
+        """
+        if not self.typed:
+            return
+
+        self.typed = False
+        for pageNumber, page in self.pages.items():
+            self.pages[pageNumber] = page.tolist()
+
+        self.writablePages.clear()
+        self.writablePages.update(self.pages)
+
+    @property
+    def numPages(self) -> int:
+        """
+        The number of pages that have been allocated
+        """
+        return len(self.pages)
+
+    @property
+    def numPrivatePages(self) -> int:
+        """
+        The number of pages owned outright, i.e. not shared with a fork or snapshot
+        """
+        return len(self.writablePages)
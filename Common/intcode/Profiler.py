@@ -0,0 +1,235 @@
+"""
+Instruction profiler for the Intcode computer
+
+A Profiler is a trace hook, so registering it with IntcodeComputer.setTraceHook() runs the
+machine on the traced engine and leaves the other engines untouched:
+
+    profiler = Profiler()
+    computer.setTraceHook(profiler)
+    ...
+    profiler.printReport()
+
+Wall time is charged to the opcode class of each instruction as the time since the previous
+instruction, so it includes the profiler's own bookkeeping and is only meaningful relative to
+the other classes.  The clock restarts whenever the machine hands an output back to its
+caller, so the caller's time is not charged; time spent waiting at an input prompt is charged
+to 'io'.  With a sampling interval above 1 the counts and times cover the sampled
+instructions only.
+
+Fusion is measured on the dispatch engine itself rather than on the traced one, so it is not
+affected by sampling: measureFusion() runs the program again with the dispatch loop, counting
+the fused handlers it takes, and times the loop with fusion on and off.  The report only has a
+fusion section once it has been measured.
+"""
+import json
+import time
+from collections import Counter
+from typing import Dict, Sequence, Tuple, Union
+
+from .Channel import InputChannel
+from .Computer import IntcodeComputer
+from .Decoder import OPCODE_NAMES
+
+DEFAULT_TOP = 10
+
+# fusion timings are the best of this many runs
+DEFAULT_FUSION_REPEATS = 3
+
+OPCODE_CLASSES: Dict[int, str] = {1: 'arithmetic',
+                                  2: 'arithmetic',
+                                  3: 'io',
+                                  4: 'io',
+                                  5: 'jump',
+                                  6: 'jump',
+                                  7: 'compare',
+                                  8: 'compare',
+                                  9: 'relativeBase',
+                                  99: 'halt'}
+
+
+class Profiler:
+    """
+    Counts instructions per opcode, per opcode and parameter modes and per address, times each
+    opcode class and sizes the program's I/O
+    """
+    def __init__(self):
+        self.instructions = 0
+        self.opcodeCounts = Counter()
+        self.modeCounts = Counter()
+        self.addressCounts = Counter()
+        self.fusion = None  # set by measureFusion()
+        self.classTimes: Dict[str, float] = dict()
+        self.inputCount = 0
+        self.outputCount = 0
+        self.maxInputBits = 0
+        self.maxOutputBits = 0
+        self.lastTime = None
+
+    def reset(self):
+        """
+        Discards everything recorded so far
+        """
+        self.__init__()
+
+    def __call__(self, pc: int, opcode: int, modes: Tuple[int, ...], operands: Tuple[int, ...], result: Union[int, None]):
+        now = time.perf_counter()
+        if self.lastTime is not None:
+            opcodeClass = OPCODE_CLASSES.get(opcode, 'illegal')
+            self.classTimes[opcodeClass] = self.classTimes.get(opcodeClass, 0.0) + now - self.lastTime
+
+        self.instructions += 1
+        self.opcodeCounts[opcode] += 1
+        self.modeCounts[(opcode, modes)] += 1
+        self.addressCounts[pc] += 1
+
+        if opcode == 3:
+            self.inputCount += 1
+            self.maxInputBits = max(self.maxInputBits, result.bit_length())
+        elif opcode == 4:
+            self.outputCount += 1
+            self.maxOutputBits = max(self.maxOutputBits, result.bit_length())
+
+        # an output or halt may return control to the caller, whose time is not the program's
+        self.lastTime = None if opcode in (4, 99) else time.perf_counter()
+
+    def measureFusion(self, inputFile: str, inputs: Sequence[int] = (), repeats: int = DEFAULT_FUSION_REPEATS):
+        """
+        Measures instruction fusion on the dispatch engine: runs the program once counting the
+        pairs the loop runs fused, then times it with fusion on and off, leaving out building
+        the fused handlers
+        :param inputFile: the program's input file
+        :param inputs: the program's inputs; it runs until it halts or needs one more
+        :param repeats: number of timed runs each way, of which the fastest counts
+        """
+        counts = Counter()
+        computer = _dispatchComputer(inputFile, inputs)
+        computer.setFusion(True, counts)
+        while computer.executeSlice(_UNLIMITED) not in (None, IntcodeComputer.NEEDS_INPUT):
+            pass
+        instructions = computer.instructionCount
+
+        seconds = dict()
+        for enabled in (True, False):
+            # the fused handlers are built once, outside the timed runs, which share them
+            computer = _dispatchComputer(inputFile, inputs)
+            computer.setFusion(enabled)
+            computer.buildFusedHandlers()
+            fusedHandlers = computer.fusedHandlers
+
+            times = list()
+            for _ in range(repeats):
+                computer = _dispatchComputer(inputFile, inputs)
+                computer.setFusion(enabled)
+                computer.fusedHandlers = fusedHandlers
+                computer.fusedImage = computer.image
+                start = time.perf_counter()
+                while computer.execute() not in (None, IntcodeComputer.NEEDS_INPUT):
+                    pass
+                times.append(time.perf_counter() - start)
+            seconds[enabled] = min(times)
+
+        self.fusion = {'instructions': instructions,
+                       'counts': counts,
+                       'fusedSeconds': seconds[True],
+                       'unfusedSeconds': seconds[False]}
+
+    def report(self, top: int = DEFAULT_TOP) -> dict:
+        """
+        Summarizes the profile as a JSON serializable dictionary
+        :param top: number of hottest addresses and opcode/mode combinations to include
+        """
+        report = {'instructions': self.instructions,
+                  'opcodes': {OPCODE_NAMES.get(opcode, str(opcode)): count
+                              for opcode, count in self.opcodeCounts.most_common()},
+                  'modes': [{'opcode': OPCODE_NAMES.get(opcode, str(opcode)),
+                             'modes': ''.join(str(mode) for mode in modes),
+                             'count': count}
+                            for (opcode, modes), count in self.modeCounts.most_common(top)],
+                  'hotspots': [{'pc': pc, 'count': count} for pc, count in self.addressCounts.most_common(top)],
+                  'addresses': len(self.addressCounts),
+                  'classTimes': {opcodeClass: seconds for opcodeClass, seconds in
+                                 sorted(self.classTimes.items(), key=lambda item: -item[1])},
+                  'io': {'inputs': self.inputCount,
+                         'outputs': self.outputCount,
+                         'maxInputBits': self.maxInputBits,
+                         'maxOutputBits': self.maxOutputBits}}
+
+        if self.fusion is not None:
+            report['fusion'] = self._fusionReport(top)
+
+        return report
+
+    def _fusionReport(self, top: int) -> dict:
+        """
+        Summarizes the fusion measurement
+        """
+        fusion = self.fusion
+        pairs = sum(fusion['counts'].values())
+        return {'instructions': fusion['instructions'],
+                'pairs': pairs,
+                'dispatchesSaved': pairs / max(fusion['instructions'], 1),
+                'fusedSeconds': fusion['fusedSeconds'],
+                'unfusedSeconds': fusion['unfusedSeconds'],
+                'speedup': fusion['unfusedSeconds'] / max(fusion['fusedSeconds'], 1e-9),
+                'top': [{'pair': f'{OPCODE_NAMES[first]}+{OPCODE_NAMES[second]}', 'count': count}
+                        for (first, second), count in fusion['counts'].most_common(top)]}
+
+    def dumpJson(self, path: str, top: int = DEFAULT_TOP):
+        """
+        Writes the report to a JSON file
+        """
+        with open(path, 'w') as file:
+            json.dump(self.report(top), file, indent=2)
+
+    def printReport(self, top: int = DEFAULT_TOP):
+        """
+        Prints the report
+        """
+        report = self.report(top)
+        instructions = max(report['instructions'], 1)
+
+        print(f'Instructions executed = {report["instructions"]} at {report["addresses"]} addresses')
+
+        print('Opcodes:')
+        for name, count in report['opcodes'].items():
+            print(f'\t{name:<5} {count:>12} {100 * count / instructions:6.2f}%')
+
+        print('Opcode modes:')
+        for entry in report['modes']:
+            print(f'\t{entry["opcode"]:<5} [{entry["modes"]:<3}] {entry["count"]:>12}')
+
+        print('Hotspots:')
+        for entry in report['hotspots']:
+            print(f'\tpc {entry["pc"]:>6} {entry["count"]:>12} {100 * entry["count"] / instructions:6.2f}%')
+
+        fusion = report.get('fusion')
+        if fusion is not None:
+            print(f'Fused pairs on the dispatch engine = {fusion["pairs"]} of {fusion["instructions"]} instructions, '
+                  f'saving {100 * fusion["dispatchesSaved"]:.2f}% of dispatches:')
+            for entry in fusion['top']:
+                print(f'\t{entry["pair"]:<9} {entry["count"]:>12}')
+            print(f'\tfused {fusion["fusedSeconds"]:.4f} s, unfused {fusion["unfusedSeconds"]:.4f} s, '
+                  f'speedup {fusion["speedup"]:.2f}x')
+
+        print('Wall time:')
+        for opcodeClass, seconds in report['classTimes'].items():
+            print(f'\t{opcodeClass:<12} {seconds:10.4f} s')
+
+        io = report['io']
+        print(f'I/O: {io["inputs"]} inputs of up to {io["maxInputBits"]} bits, '
+              f'{io["outputs"]} outputs of up to {io["maxOutputBits"]} bits')
+
+
+# a slice budget no program run reaches
+_UNLIMITED = 1 << 62
+
+
+def _dispatchComputer(inputFile: str, inputs: Sequence[int]) -> IntcodeComputer:
+    """
+    Makes a dispatch engine machine that stops with NEEDS_INPUT once its inputs run out
+    """
+    computer = IntcodeComputer(inputFile=inputFile, engine=IntcodeComputer.ENGINE_DISPATCH)
+    computer.setInputPolicy(InputChannel.POLICY_BLOCK)
+    computer.setInputs(list(inputs))
+
+    return computer
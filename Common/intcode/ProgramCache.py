@@ -0,0 +1,82 @@
+"""
+Process wide cache of parsed Intcode program images
+"""
+import os
+from typing import Dict, Tuple
+
+from .Memory import PagedMemory
+
+ProgramImage = Tuple[int, ...]
+
+
+class ProgramCache:
+    """
+    Caches immutable program images keyed by file path, re-reading a file only when its
+    modification time changes, and the pristine memory pages of each image
+    """
+    def __init__(self):
+        self.images: Dict[str, Tuple[int, ProgramImage]] = dict()
+        self.memories: Dict[Tuple[int, bool], Tuple[ProgramImage, PagedMemory]] = dict()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, inputFile: str) -> ProgramImage:
+        """
+        Gets the program image for an input file, parsing the file on a miss
+        """
+        path = os.path.abspath(inputFile)
+        mtime = os.stat(path).st_mtime_ns
+
+        cached = self.images.get(path)
+        if cached is not None and cached[0] == mtime:
+            self.hits += 1
+            return cached[1]
+
+        self.misses += 1
+        self.forget(path)
+        with open(path) as f:
+            image = tuple(int(value) for value in f.readline().split(sep=','))
+
+        self.images[path] = (mtime, image)
+        return image
+
+    def memory(self, image: ProgramImage, typed: bool = False) -> PagedMemory:
+        """
+        Gets a fresh memory holding a program image returned by load().  The image's pages are
+        built once per image and shared copy-on-write by every memory handed out, so machines
+        running the same program only pay for the pages they write.
+        """
+        key = (id(image), typed)
+        cached = self.memories.get(key)
+        if cached is None:
+            # forking leaves the pristine memory with no writable page, so nothing writes to it
+            pristine = PagedMemory(image, typed=typed)
+            pristine.fork()
+            # the entry holds the image, so its id cannot be reused while the entry exists
+            cached = (image, pristine)
+            self.memories[key] = cached
+
+        return cached[1].fork()
+
+    def forget(self, inputFile: str):
+        """
+        Drops the cached image of an input file and the memories built from it
+        """
+        cached = self.images.pop(os.path.abspath(inputFile), None)
+        if cached is None:
+            return
+
+        for key in [key for key in self.memories if key[0] == id(cached[1])]:
+            del self.memories[key]
+
+    def clear(self):
+        """
+        Drops every cached image and memory and zeros the counters
+        """
+        self.images.clear()
+        self.memories.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+PROGRAM_CACHE = ProgramCache()
@@ -0,0 +1,189 @@
+"""
+Binary execution trace recorder for the Intcode computer
+
+A TraceRecorder is a trace hook that writes one fixed-width record per traced instruction into
+a preallocated NumPy buffer, so recording costs a tuple and an array store per instruction and
+traces are analyzed as arrays instead of parsed from text logs.
+
+By default the buffer is a ring that keeps the most recent records, e.g. for a post-mortem of
+the instructions leading up to a crash.  Given a spill path the recorder keeps the full trace
+instead, writing it through memory-mapped chunks of a trace file that loadTrace() maps back.
+
+Records have the fields of RECORD_DTYPE, all int64:
+    * pc, opcode and modes, the parameter modes as digits, first parameter lowest
+    * operand1 to operand3, the resolved operands as passed to trace hooks, zero padded
+    * storeAddress, the address written by the instruction or -1
+    * value, the trace hook's result, 0 for halt
+Values that do not fit in int64 are stored wrapped to 64 bits and counted in truncated.
+"""
+import itertools
+import os
+from typing import Dict, Tuple, Union
+
+import numpy as np
+
+from .Decoder import PARAMETER_COUNTS
+
+DEFAULT_CAPACITY = 1 << 16
+
+TRACE_MAGIC = b'ICTRACE1'
+
+RECORD_DTYPE = np.dtype([('pc', '<i8'),
+                         ('opcode', '<i8'),
+                         ('modes', '<i8'),
+                         ('operand1', '<i8'),
+                         ('operand2', '<i8'),
+                         ('operand3', '<i8'),
+                         ('storeAddress', '<i8'),
+                         ('value', '<i8')])
+
+HEADER_DTYPE = np.dtype([('magic', 'S8'), ('count', '<i8')])
+
+# index of the store address within the operands of the instructions that store
+STORE_OPERANDS: Dict[int, int] = {1: 2, 2: 2, 3: 0, 7: 2, 8: 2}
+
+MODE_WORDS: Dict[Tuple[int, ...], int] = {modes: sum(mode * 10 ** index for index, mode in enumerate(modes))
+                                          for count in set(PARAMETER_COUNTS.values())
+                                          for modes in itertools.product((0, 1, 2), repeat=count)}
+
+PADDING = (0, 0, 0)
+
+INT64_MASK = (1 << 64) - 1
+INT64_SIGN = 1 << 63
+
+
+class TraceRecorder:
+    """
+    Records traced instructions into a ring buffer or, with a spill path, a memory-mapped file
+    """
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, spillPath: Union[str, None] = None):
+        """
+        :param capacity: number of records in the ring, or per mapped chunk when spilling
+        :param spillPath: optional trace file that receives the full trace
+        """
+        if capacity < 1:
+            raise ValueError(f'Trace capacity must be at least 1, got {capacity}')
+
+        self.capacity = capacity
+        self.spillPath = spillPath
+        self.index = 0
+        self.recorded = 0
+        self.truncated = 0
+        self.chunk = 0
+
+        if spillPath is None:
+            self.buffer = np.zeros(capacity, dtype=RECORD_DTYPE)
+        else:
+            header = np.zeros(1, dtype=HEADER_DTYPE)
+            header['magic'] = TRACE_MAGIC
+            with open(spillPath, 'wb') as file:
+                file.write(header.tobytes())
+            self.buffer = self.mapChunk()
+
+    def __call__(self, pc: int, opcode: int, modes: Tuple[int, ...], operands: Tuple[int, ...], result: Union[int, None]):
+        if self.index == self.capacity:
+            self.nextChunk()
+
+        padded = operands + PADDING
+        storeOperand = STORE_OPERANDS.get(opcode)
+        record = (pc, opcode, MODE_WORDS[modes], padded[0], padded[1], padded[2],
+                  -1 if storeOperand is None else operands[storeOperand],
+                  0 if result is None else result)
+        try:
+            self.buffer[self.index] = record
+        except OverflowError:
+            self.buffer[self.index] = tuple(_wrap(value) for value in record)
+            self.truncated += 1
+
+        self.index += 1
+        self.recorded += 1
+
+    @property
+    def dropped(self) -> int:
+        """
+        Number of records overwritten by the ring
+        """
+        if self.spillPath is not None:
+            return 0
+
+        return max(self.recorded - self.capacity, 0)
+
+    def records(self) -> np.ndarray:
+        """
+        The recorded trace, oldest record first: the ring's contents, or the whole trace file
+        mapped read-only when spilling
+        """
+        if self.spillPath is not None:
+            self.flush()
+            return loadTrace(self.spillPath)
+        elif self.recorded <= self.capacity:
+            return self.buffer[:self.index].copy()
+
+        return np.concatenate((self.buffer[self.index:], self.buffer[:self.index]))
+
+    def flush(self):
+        """
+        Writes the mapped chunk and the record count to the trace file
+        """
+        if self.spillPath is None:
+            return
+
+        self.buffer.flush()
+        with open(self.spillPath, 'r+b') as file:
+            file.seek(HEADER_DTYPE.fields['count'][1])
+            file.write(np.array(self.recorded, dtype='<i8').tobytes())
+
+    def close(self):
+        """
+        Flushes the trace file and trims the unused end of its last chunk
+        """
+        if self.spillPath is None:
+            return
+
+        self.flush()
+        self.buffer = None
+        os.truncate(self.spillPath, HEADER_DTYPE.itemsize + self.recorded * RECORD_DTYPE.itemsize)
+
+    def nextChunk(self):
+        """
+        Wraps the ring, or maps the next chunk of the trace file
+        """
+        if self.spillPath is not None:
+            self.buffer.flush()
+            self.chunk += 1
+            self.buffer = self.mapChunk()
+
+        self.index = 0
+
+    def mapChunk(self) -> np.memmap:
+        """
+        Grows the trace file by a chunk and maps the new chunk
+        """
+        offset = HEADER_DTYPE.itemsize + self.chunk * self.capacity * RECORD_DTYPE.itemsize
+        os.truncate(self.spillPath, offset + self.capacity * RECORD_DTYPE.itemsize)
+
+        return np.memmap(self.spillPath, dtype=RECORD_DTYPE, mode='r+', offset=offset, shape=(self.capacity,))
+
+
+def loadTrace(path: str) -> np.ndarray:
+    """
+    Maps a trace file written by a spilling TraceRecorder read-only, without copying it
+    :return: the records, oldest first
+    """
+    header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    if header.size == 0 or header['magic'][0] != TRACE_MAGIC:
+        raise RuntimeError(f'{path} is not an Intcode trace file')
+
+    count = int(header['count'][0])
+    if count == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_DTYPE.itemsize, shape=(count,))
+
+
+def _wrap(value: int) -> int:
+    """
+    Wraps an int to the signed 64 bit range
+    """
+    value &= INT64_MASK
+    return value - (1 << 64) if value & INT64_SIGN else value
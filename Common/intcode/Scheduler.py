@@ -0,0 +1,228 @@
+"""
+Cooperative scheduler for many Intcode machines in one process
+
+The scheduler owns a set of machines and runs them round robin, each for a slice of at most
+sliceSize instructions with IntcodeComputer.executeSlice().  A machine that needs an input it
+has not been given is parked until send() or a connected machine supplies one, so machines
+that wait on each other, like Day 7's amplifier feedback loop, need no hand-written loop.
+
+Each task can be capped: a machine that executes maxInstructions instructions or allocates
+more than maxPages memory pages is killed.  Instruction caps are exact, page caps are checked
+after every slice.  A machine that raises, or whose input channel overflows, faults without
+stopping the others.  Every task counts the instructions it executed and the CPU time its
+slices took.
+"""
+import time
+from typing import Callable, Dict, List, Union
+
+from .Computer import IntcodeComputer
+
+DEFAULT_SLICE_SIZE = 10000
+
+
+class Task:
+    """
+    A machine owned by the scheduler and its accounting
+    """
+    READY = 'ready'
+    BLOCKED = 'blocked'
+    HALTED = 'halted'
+    KILLED = 'killed'
+    FAULTED = 'faulted'
+
+    def __init__(self,
+                 computer: IntcodeComputer,
+                 name: str,
+                 maxInstructions: Union[int, None],
+                 maxPages: Union[int, None],
+                 onOutput: Union[Callable[['Task', int], None], None]):
+        self.computer = computer
+        self.name = name
+        self.maxInstructions = maxInstructions
+        self.maxPages = maxPages
+        self.onOutput = onOutput
+        self.targets: List['Task'] = list()
+
+        self.state = self.READY
+        self.reason = None  # why the task was killed or faulted
+        self.outputs: List[int] = list()  # outputs of a task with no targets and no onOutput
+        self.lastOutput = None
+        self.instructions = 0
+        self.cpuTime = 0.0
+        self.slices = 0
+
+    @property
+    def isRunnable(self) -> bool:
+        """
+        Whether the task gets slices
+        """
+        return self.state == self.READY
+
+    @property
+    def isFinished(self) -> bool:
+        """
+        Whether the task will never run again
+        """
+        return self.state in (self.HALTED, self.KILLED, self.FAULTED)
+
+    def stats(self) -> Dict[str, Union[str, int, float, None]]:
+        """
+        The task's counters
+        """
+        return {'name': self.name,
+                'state': self.state,
+                'reason': self.reason,
+                'instructions': self.instructions,
+                'cpuTime': self.cpuTime,
+                'slices': self.slices,
+                'pages': self.computer.program.numPages}
+
+    def __repr__(self) -> str:
+        return f'Task({self.name}, {self.state})'
+
+
+class Scheduler:
+    """
+    Time-slices a set of machines by instruction budget
+    """
+    def __init__(self, sliceSize: int = DEFAULT_SLICE_SIZE):
+        if sliceSize < 1:
+            raise ValueError(f'Slice size must be at least 1, got {sliceSize}')
+
+        self.sliceSize = sliceSize
+        self.tasks: List[Task] = list()
+
+    def add(self,
+            computer: IntcodeComputer,
+            name: Union[str, None] = None,
+            maxInstructions: Union[int, None] = None,
+            maxPages: Union[int, None] = None,
+            onOutput: Union[Callable[[Task, int], None], None] = None) -> Task:
+        """
+        Hands a machine to the scheduler
+        :param computer: the machine, with any initial inputs already set
+        :param name: name used in the stats, defaults to the task's index
+        :param maxInstructions: optional cap on the instructions the machine may execute
+        :param maxPages: optional cap on the memory pages the machine may allocate
+        :param onOutput: optional callback called as onOutput(task, value) for every output
+        :return: the task
+        """
+        task = Task(computer=computer,
+                    name=name if name is not None else str(len(self.tasks)),
+                    maxInstructions=maxInstructions,
+                    maxPages=maxPages,
+                    onOutput=onOutput)
+        self.tasks.append(task)
+
+        return task
+
+    def connect(self, source: Task, target: Task):
+        """
+        Feeds every output of source to target as an input
+        """
+        source.targets.append(target)
+
+    def send(self, task: Task, value: int):
+        """
+        Gives a task an input, waking it if it was parked waiting for one.  A task whose input
+        channel is full faults, like a task whose machine raises.
+        """
+        if task.isFinished:
+            return
+
+        try:
+            task.computer.appendInput(value)
+        except RuntimeError as error:
+            task.state = Task.FAULTED
+            task.reason = str(error)
+            return
+
+        if task.state == Task.BLOCKED:
+            task.state = Task.READY
+
+    def run(self, maxRounds: Union[int, None] = None) -> bool:
+        """
+        Runs the tasks round robin until none of them can run
+        :param maxRounds: optional limit on the number of rounds
+        :return: whether every task has finished, as opposed to tasks being parked waiting for
+                 input no task will send or the round limit being reached
+        """
+        rounds = 0
+        while maxRounds is None or rounds < maxRounds:
+            runnable = [task for task in self.tasks if task.isRunnable]
+            if not runnable:
+                break
+
+            for task in runnable:
+                if task.isRunnable:
+                    self.runSlice(task)
+
+            rounds += 1
+
+        return all(task.isFinished for task in self.tasks)
+
+    def runSlice(self, task: Task):
+        """
+        Runs one slice of a task and delivers its outputs
+        """
+        computer = task.computer
+        budget = self.sliceSize
+        if task.maxInstructions is not None:
+            budget = min(budget, task.maxInstructions - task.instructions)
+
+        outputs = list()
+        instructionCount = computer.instructionCount
+        blockOnInput = computer.blockOnInput
+        computer.outputBuffer = outputs
+        computer.blockOnInput = True
+        start = time.process_time()
+        try:
+            signal = computer.executeSlice(budget)
+        except RuntimeError as error:
+            signal = error
+        finally:
+            task.cpuTime += time.process_time() - start
+            computer.outputBuffer = None
+            computer.blockOnInput = blockOnInput
+
+        task.instructions += computer.instructionCount - instructionCount
+        task.slices += 1
+
+        if signal is None:
+            task.state = Task.HALTED
+        elif signal is IntcodeComputer.NEEDS_INPUT:
+            task.state = Task.BLOCKED
+        elif isinstance(signal, RuntimeError):
+            task.state = Task.FAULTED
+            task.reason = str(signal)
+
+        for value in outputs:
+            self.deliver(task, value)
+
+        if task.isFinished:
+            return
+        elif task.maxInstructions is not None and task.instructions >= task.maxInstructions:
+            task.state = Task.KILLED
+            task.reason = f'exceeded {task.maxInstructions} instructions'
+        elif task.maxPages is not None and computer.program.numPages > task.maxPages:
+            task.state = Task.KILLED
+            task.reason = f'allocated {computer.program.numPages} of at most {task.maxPages} pages'
+
+    def deliver(self, task: Task, value: int):
+        """
+        Routes an output of a task to its targets, its callback or its output list
+        """
+        task.lastOutput = value
+        for target in task.targets:
+            self.send(target, value)
+
+        if task.onOutput is not None:
+            task.onOutput(task, value)
+        elif not task.targets:
+            task.outputs.append(value)
+
+    def stats(self) -> List[Dict[str, Union[str, int, float, None]]]:
+        """
+        The counters of every task
+        """
+        return [task.stats() for task in self.tasks]
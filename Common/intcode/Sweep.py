@@ -0,0 +1,184 @@
+"""
+Parallel parameter sweeps over an Intcode program
+
+sweep() evaluates a program once per point of a parameter grid, fanning chunks of the grid out
+to a process pool.  Every worker keeps its own machines for the program and resets them
+before each evaluation, so the machines' compiled code is reused across the whole sweep.  The
+machines live for one sweep, and the settings reset() keeps, such as a trace hook, the input
+policy or fusion, are restored to their defaults before each evaluation.  Results are reduced
+in grid order as they stream back: the sweep tracks the maximum and its parameters, and stops
+early at the first point whose result satisfies stopWhen.
+
+The evaluator and stopWhen are sent to the workers, so they must be picklable, i.e. module
+level functions or functools.partial objects rather than lambdas.
+"""
+import itertools
+import multiprocessing
+import os
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Tuple, Union
+
+from .Channel import InputChannel
+from .Computer import IntcodeComputer
+
+DEFAULT_CHUNK_SIZE = 16
+
+# grids with fewer points than this are evaluated in this process unless workers is given, as
+# starting a pool costs more than evaluating them
+MIN_PARALLEL_POINTS = 1024
+
+# evaluator(computers, params) -> value
+Evaluator = Callable[[List[IntcodeComputer], Any], Any]
+
+# machines keyed by (inputFile, number of machines, engine)
+Computers = Dict[Tuple[str, int, Union[str, None]], List[IntcodeComputer]]
+
+# machines of a pool worker, which lives for one sweep
+_workerComputers: Computers = dict()
+
+
+class SweepResult(NamedTuple):
+    """
+    Outcome of a sweep.  value and params are the first match if the sweep stopped early and
+    the maximum otherwise; ties go to the earliest point of the grid.
+    """
+    value: Any
+    params: Any
+    evaluated: int
+    stopped: bool
+
+
+def sweep(program: str,
+          paramGrid: Iterable[Any],
+          evaluator: Evaluator,
+          workers: Union[int, None] = None,
+          machines: int = 1,
+          stopWhen: Union[Callable[[Any], bool], None] = None,
+          engine: Union[str, None] = None,
+          chunkSize: int = DEFAULT_CHUNK_SIZE) -> SweepResult:
+    """
+    Evaluates a program at every point of a parameter grid
+    :param program: the program's input file
+    :param paramGrid: the parameters to evaluate, one evaluation per item
+    :param evaluator: called as evaluator(computers, params) with freshly reset machines
+    :param workers: number of worker processes, defaults to the number of CPUs, or to 1 for a
+                    grid of fewer than MIN_PARALLEL_POINTS points; 1 runs the sweep in this
+                    process
+    :param machines: number of machines handed to each evaluation
+    :param stopWhen: optional predicate that stops the sweep at the earliest point of the grid
+                     whose result satisfies it
+    :param engine: the machines' execution engine
+    :param chunkSize: number of grid points sent to a worker at a time
+    :return: the reduced result
+    """
+    paramGrid = iter(paramGrid)
+    if workers is None:
+        head = list(itertools.islice(paramGrid, MIN_PARALLEL_POINTS))
+        workers = (os.cpu_count() or 1) if len(head) == MIN_PARALLEL_POINTS else 1
+        paramGrid = itertools.chain(head, paramGrid)
+
+    indexedGrid = enumerate(paramGrid)
+    tasks = ((program, machines, engine, evaluator, stopWhen, chunk)
+             for chunk in iter(lambda: list(itertools.islice(indexedGrid, chunkSize)), []))
+
+    reduction = _Reduction(stopWhen)
+    if workers == 1:
+        computers: Computers = dict()
+        for task in tasks:
+            if reduction.update(_evaluateChunk(task, computers)):
+                break
+    else:
+        # chunks come back in grid order, so the first match seen is the earliest one.  Leaving
+        # the with block terminates the pool, which cancels the outstanding chunks.
+        with multiprocessing.Pool(workers, initializer=_startWorker) as pool:
+            for results in pool.imap(_evaluateWorkerChunk, tasks):
+                if reduction.update(results):
+                    break
+
+    return reduction.result()
+
+
+class _Reduction:
+    """
+    Streaming max/argmax and first match over evaluation results
+    """
+    def __init__(self, stopWhen: Union[Callable[[Any], bool], None]):
+        self.stopWhen = stopWhen
+        self.best = None  # (index, params, value)
+        self.match = None  # (index, params, value)
+        self.evaluated = 0
+
+    def update(self, results: List[Tuple[int, Any, Any]]) -> bool:
+        """
+        Folds in a chunk of results
+        :return: whether the sweep should stop
+        """
+        for index, params, value in results:
+            self.evaluated += 1
+            if self.best is None or value > self.best[2] or value == self.best[2] and index < self.best[0]:
+                self.best = (index, params, value)
+
+            if self.stopWhen is not None and self.stopWhen(value) and (self.match is None or index < self.match[0]):
+                self.match = (index, params, value)
+
+        return self.match is not None
+
+    def result(self) -> SweepResult:
+        """
+        The reduced result
+        """
+        _, params, value = self.match if self.match is not None else (self.best or (None, None, None))
+        return SweepResult(value=value, params=params, evaluated=self.evaluated, stopped=self.match is not None)
+
+
+def _startWorker():
+    """
+    Gives a pool worker no machines, rather than those of a process it was forked from
+    """
+    _workerComputers.clear()
+
+
+def _evaluateWorkerChunk(task: tuple) -> List[Tuple[int, Any, Any]]:
+    """
+    Evaluates a chunk of the grid in a pool worker with the worker's machines
+    """
+    return _evaluateChunk(task, _workerComputers)
+
+
+def _evaluateChunk(task: tuple, cache: Computers) -> List[Tuple[int, Any, Any]]:
+    """
+    Evaluates a chunk of the grid, stopping at the first match
+    """
+    program, machines, engine, evaluator, stopWhen, chunk = task
+
+    key = (program, machines, engine)
+    computers = cache.get(key)
+    if computers is None:
+        computers = [IntcodeComputer(inputFile=program, engine=engine) for _ in range(machines)]
+        cache[key] = computers
+
+    results = list()
+    for index, params in chunk:
+        for computer in computers:
+            _handOut(computer)
+
+        value = evaluator(computers, params)
+        results.append((index, params, value))
+        if stopWhen is not None and stopWhen(value):
+            break
+
+    return results
+
+
+def _handOut(computer: IntcodeComputer):
+    """
+    Resets a machine for the next evaluation, along with the settings reset() keeps that an
+    evaluator may have changed
+    """
+    computer.reset()
+    if computer.traceHook is not None:
+        computer.setTraceHook(None)
+    computer.autoCheckpoint = None
+    if not computer.fusion or computer.fusionCounts is not None:
+        computer.setFusion(True)
+    computer.setInputPolicy(InputChannel.POLICY_REPEAT_LAST)
+    computer.blockOnInput = False
@@ -0,0 +1,311 @@
+"""
+Symbolic evaluation of Intcode programs
+
+Memory words can hold polynomials over named symbols instead of integers, and add and
+multiply propagate them, so a program whose result depends on its initial values can be run
+once and the result solved for a target instead of searching every combination of values.
+
+A load from an address that depends on a symbol yields UNKNOWN, which poisons whatever is
+computed from it; programs often overwrite such words before using them.  Anything that needs
+a concrete value, i.e. an opcode, a store address, a jump condition, a comparison or I/O,
+raises SymbolicFallback when it depends on a symbol or on UNKNOWN, and the caller falls back
+to concrete execution.
+"""
+from typing import Dict, Sequence, Tuple, Union
+
+from .Decoder import decodeInstruction
+from .ProgramCache import PROGRAM_CACHE
+
+# ((symbol, power), ...) sorted by symbol
+Monomial = Tuple[Tuple[str, int], ...]
+
+
+class SymbolicFallback(RuntimeError):
+    """
+    Raised when symbolic evaluation needs a concrete value that depends on a symbol
+    """
+    pass
+
+
+class Polynomial:
+    """
+    Polynomial over named symbols with integer coefficients
+    """
+    def __init__(self, terms: Union[Dict[Monomial, int], None] = None):
+        self.terms: Dict[Monomial, int] = {monomial: coefficient for monomial, coefficient in (terms or dict()).items()
+                                           if coefficient != 0}
+
+    @classmethod
+    def symbol(cls, name: str) -> 'Polynomial':
+        """
+        The polynomial consisting of a single symbol
+        """
+        return cls({((name, 1),): 1})
+
+    @property
+    def isConstant(self) -> bool:
+        """
+        Whether the polynomial does not depend on any symbol
+        """
+        return all(monomial == () for monomial in self.terms)
+
+    @property
+    def constantValue(self) -> int:
+        """
+        The constant term
+        """
+        return self.terms.get((), 0)
+
+    def degree(self, name: str) -> int:
+        """
+        The highest power of a symbol
+        """
+        return max((dict(monomial).get(name, 0) for monomial in self.terms), default=0)
+
+    def substitute(self, name: str, value: int) -> 'Polynomial':
+        """
+        Replaces a symbol with a value
+        """
+        terms = dict()
+        for monomial, coefficient in self.terms.items():
+            powers = dict(monomial)
+            power = powers.pop(name, 0)
+            reduced = tuple(sorted(powers.items()))
+            terms[reduced] = terms.get(reduced, 0) + coefficient * value ** power
+
+        return Polynomial(terms)
+
+    def __add__(self, other: Union['Polynomial', int]) -> 'Polynomial':
+        terms = dict(self.terms)
+        for monomial, coefficient in _terms(other).items():
+            terms[monomial] = terms.get(monomial, 0) + coefficient
+
+        return Polynomial(terms)
+
+    __radd__ = __add__
+
+    def __mul__(self, other: Union['Polynomial', int]) -> 'Polynomial':
+        terms = dict()
+        for monomial1, coefficient1 in self.terms.items():
+            for monomial2, coefficient2 in _terms(other).items():
+                powers = dict(monomial1)
+                for name, power in monomial2:
+                    powers[name] = powers.get(name, 0) + power
+
+                monomial = tuple(sorted(powers.items()))
+                terms[monomial] = terms.get(monomial, 0) + coefficient1 * coefficient2
+
+        return Polynomial(terms)
+
+    __rmul__ = __mul__
+
+    def __str__(self) -> str:
+        if not self.terms:
+            return '0'
+
+        parts = list()
+        for monomial, coefficient in sorted(self.terms.items(), key=lambda term: (-len(term[0]), term[0])):
+            factors = [name if power == 1 else f'{name}^{power}' for name, power in monomial]
+            if coefficient != 1 or not factors:
+                factors.insert(0, str(coefficient))
+            parts.append('*'.join(factors))
+
+        return ' + '.join(parts)
+
+    def __repr__(self) -> str:
+        return f'Polynomial({self})'
+
+
+class Unknown:
+    """
+    A value loaded from an address that depends on a symbol
+    """
+    def __repr__(self) -> str:
+        return 'UNKNOWN'
+
+
+UNKNOWN = Unknown()
+
+Value = Union[int, Polynomial, Unknown]
+
+
+class SymbolicComputer:
+    """
+    Intcode computer whose memory words may be polynomials
+    """
+    OP_1 = 1
+    OP_2 = 2
+    OP_5 = 5
+    OP_6 = 6
+    OP_7 = 7
+    OP_8 = 8
+    OP_9 = 9
+    OP_STOP = 99
+
+    MODE_POSITION = 0
+    MODE_IMMEDIATE = 1
+    MODE_RELATIVE = 2
+
+    MEMORY_INITIAL_VALUE = 0
+
+    def __init__(self, inputFile: str):
+        self.inputFile = inputFile
+        self.program: Dict[int, Value] = dict()
+        self.sp = 0
+        self.relativeBase = 0
+
+        self.reset()
+
+    def reset(self):
+        """
+        Reloads the program and clears the machine state
+        """
+        self.program = dict(enumerate(PROGRAM_CACHE.load(self.inputFile)))
+        self.sp = 0
+        self.relativeBase = 0
+
+    def initialize(self, value1: Value, value2: Value):
+        """
+        Initializes the program for execution with concrete or symbolic values
+        """
+        self.program[1] = value1
+        self.program[2] = value2
+
+    def execute(self):
+        """
+        Executes the program until it halts
+        """
+        while True:
+            opcode, firstParameterMode, secondParameterMode, thirdParameterMode = decodeInstruction(self._concrete(self.sp))
+
+            if opcode == self.OP_STOP:
+                return
+            elif opcode in (self.OP_1, self.OP_2, self.OP_7, self.OP_8):
+                value1 = self._value(self.sp + 1, firstParameterMode)
+                value2 = self._value(self.sp + 2, secondParameterMode)
+                if opcode in (self.OP_1, self.OP_2) and (value1 is UNKNOWN or value2 is UNKNOWN):
+                    result = UNKNOWN
+                elif opcode == self.OP_1:
+                    result = value1 + value2
+                elif opcode == self.OP_2:
+                    result = value1 * value2
+                elif opcode == self.OP_7:
+                    result = 1 if self._constant(value1) < self._constant(value2) else 0
+                else:
+                    result = 1 if self._constant(value1) == self._constant(value2) else 0
+
+                self._store(self.sp + 3, thirdParameterMode, result)
+                self.sp += 4
+            elif opcode in (self.OP_5, self.OP_6):
+                value1 = self._constant(self._value(self.sp + 1, firstParameterMode))
+                value2 = self._constant(self._value(self.sp + 2, secondParameterMode))
+                if (value1 != 0) == (opcode == self.OP_5):
+                    self.sp = value2
+                else:
+                    self.sp += 3
+            elif opcode == self.OP_9:
+                self.relativeBase += self._constant(self._value(self.sp + 1, firstParameterMode))
+                self.sp += 2
+            else:
+                raise SymbolicFallback(f'Opcode {opcode} at {self.sp} cannot be evaluated symbolically')
+
+    def _concrete(self, address: int) -> int:
+        """
+        Reads a word that has to be concrete
+        """
+        return self._constant(self.program.get(address, self.MEMORY_INITIAL_VALUE))
+
+    def _value(self, parameterPtr: int, mode: int) -> Value:
+        """
+        Reads the value of a parameter, which may be symbolic
+        """
+        parameter = self.program.get(parameterPtr, self.MEMORY_INITIAL_VALUE)
+        if mode == self.MODE_IMMEDIATE:
+            return parameter
+        elif mode in (self.MODE_POSITION, self.MODE_RELATIVE):
+            if not isinstance(parameter, int):
+                return UNKNOWN
+
+            address = parameter + (self.relativeBase if mode == self.MODE_RELATIVE else 0)
+            return self.program.get(address, self.MEMORY_INITIAL_VALUE)
+
+        raise RuntimeError(f'Unrecognized parameter mode {mode}')
+
+    def _store(self, parameterPtr: int, mode: int, value: Value):
+        """
+        Stores a value at the address given by a parameter
+        """
+        address = self._concrete(parameterPtr)
+        if mode == self.MODE_RELATIVE:
+            address += self.relativeBase
+
+        if isinstance(value, Polynomial) and value.isConstant:
+            value = value.constantValue
+        self.program[address] = value
+
+    def _constant(self, value: Value) -> int:
+        """
+        Converts a value that has to be concrete to an int
+        """
+        if isinstance(value, Polynomial) and value.isConstant:
+            return value.constantValue
+        elif not isinstance(value, int):
+            raise SymbolicFallback(f'Instruction at {self.sp} depends on {value}')
+
+        return value
+
+
+def solve(polynomial: Value, target: int, domains: Dict[str, Sequence[int]]) -> Union[Dict[str, int], None]:
+    """
+    Finds values of the symbols for which a polynomial equals the target.  The first symbols are
+    enumerated in order and the last one is solved for directly when the polynomial is linear in
+    it, so the solution found is the first one in the order of a nested search.
+    :param polynomial: the polynomial, or an int if the result does not depend on any symbol
+    :param target: the value to solve for
+    :param domains: the values each symbol can take, outermost symbol first
+    :return: the values of the symbols, or None if there is no solution
+    """
+    if polynomial is UNKNOWN:
+        raise SymbolicFallback('The result depends on a symbolic address')
+    elif not isinstance(polynomial, Polynomial):
+        polynomial = Polynomial({(): polynomial})
+
+    names = list(domains)
+    if not names:
+        return dict() if polynomial.constantValue == target and polynomial.isConstant else None
+
+    name = names[0]
+    rest = {other: domains[other] for other in names[1:]}
+    if not rest and polynomial.degree(name) <= 1:
+        slope = polynomial.substitute(name, 1) + polynomial.substitute(name, 0) * -1
+        if not polynomial.substitute(name, 0).isConstant or not slope.isConstant:
+            raise SymbolicFallback(f'{polynomial} depends on symbols without a domain')
+
+        offset = polynomial.substitute(name, 0).constantValue
+        if slope.constantValue == 0:
+            candidates = domains[name] if offset == target else ()
+        else:
+            value, remainder = divmod(target - offset, slope.constantValue)
+            candidates = (value,) if remainder == 0 else ()
+
+        for value in candidates:
+            if value in domains[name]:
+                return {name: value}
+        return None
+
+    for value in domains[name]:
+        solution = solve(polynomial.substitute(name, value), target, rest)
+        if solution is not None:
+            return {name: value, **solution}
+
+    return None
+
+
+def _terms(value: Union[Polynomial, int]) -> Dict[Monomial, int]:
+    """
+    The terms of a polynomial or an int
+    """
+    if isinstance(value, Polynomial):
+        return value.terms
+
+    return {(): value}
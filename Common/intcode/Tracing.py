@@ -0,0 +1,33 @@
+"""
+Instruction tracing for the Intcode computer
+
+A trace hook is any callable taking (pc, opcode, modes, operands, result):
+    * pc is the address of the instruction
+    * modes holds the mode of each parameter
+    * operands holds the value each read parameter resolved to, followed by the store address
+      for instructions that store
+    * result is the value stored, the value output, the jump target (the next pc whether or not
+      the jump was taken) or the new relative base, and None for halt
+
+Hooks only run on the traced engine, which execute() switches to while a hook is registered
+with IntcodeComputer.setTraceHook(); the other engines contain no tracing code.
+"""
+from typing import Callable, Tuple, Union
+
+from .Decoder import OPCODE_NAMES
+
+TraceHook = Callable[[int, int, Tuple[int, ...], Tuple[int, ...], Union[int, None]], None]
+
+
+def printTrace(pc: int, opcode: int, modes: Tuple[int, ...], operands: Tuple[int, ...], result: Union[int, None]):
+    """
+    Trace hook that prints every instruction, used for verbose output
+    """
+    name = OPCODE_NAMES.get(opcode, str(opcode))
+    modeText = ''.join(str(mode) for mode in modes)
+    operandText = ', '.join(str(operand) for operand in operands)
+
+    if opcode == 99:
+        print(f'{pc:>6}: {name}')
+    else:
+        print(f'{pc:>6}: {name:<4} [{modeText}] {operandText} -> {result}')
@@ -0,0 +1,258 @@
+"""
+Ahead of time translator from Intcode program images to Python modules
+
+The translator follows the program's control flow from address 0 and compiles every basic
+block it can reach with the BlockCompiler, so the translated blocks are exactly the ones the
+compiler would build at run time.  The generated module holds one function per block and a
+jump table, BLOCKS, mapping entry addresses to those functions; a machine seeded with it only
+looks blocks up in the table, including at computed jump targets.  Targets that could not be
+found statically, and blocks invalidated by self-modifying code, fall back to the run time
+compiler and the reference opcodes.
+
+Parameter words that any block stores to with a constant address are read at run time in the
+translated code, so the common patch-an-operand idiom does not invalidate translated blocks.
+
+Translations are cached on disk as source and marshalled bytecode, keyed by a hash of the
+program image and whether counted loops are summarized, so a program is only translated once
+per machine.
+"""
+import hashlib
+import importlib.util
+import marshal
+import os
+import pathlib
+import types
+from typing import Dict, List, Sequence, Set, Union
+
+from .BlockCompiler import BlockCompiler, MAX_BLOCK_INSTRUCTIONS
+from .Decoder import DECODE_TABLE
+from .Memory import PagedMemory, PAGE_SHIFT
+
+TRANSLATOR_VERSION = 4
+
+CACHE_DIR = os.environ.get('INTCODE_CACHE_DIR', os.path.join(pathlib.Path.home(), '.cache', 'intcode'))
+
+MAX_SEED_PASSES = 4
+
+_JUMP_OPCODES = (5, 6)
+_STORING_OPCODES = (1, 2, 7, 8)
+_IO_OPCODES = (3, 4)
+_MODE_IMMEDIATE = 1
+
+# translated module namespaces keyed by image hash
+_TRANSLATIONS: Dict[str, dict] = dict()
+
+
+def imageHash(image: Sequence[int]) -> str:
+    """
+    Content hash of a program image, including everything baked into its translation
+    """
+    key = f'{TRANSLATOR_VERSION}:{PAGE_SHIFT}:' + ','.join(str(value) for value in image)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def translationKey(image: Sequence[int], summarizeLoops: bool = False) -> str:
+    """
+    Cache key of a program image's translation
+    """
+    key = imageHash(image)
+    return f'{key}-loops' if summarizeLoops else key
+
+
+def translate(image: Sequence[int], summarizeLoops: bool = False) -> str:
+    """
+    Translates a program image into the source of a Python module
+    :param summarizeLoops: whether counted loops are summarized, see BlockCompiler
+    """
+    # a first pass finds every address that is stored to with a constant address, and the
+    # second pass treats those words as volatile so that they are not baked in
+    compiler = _translateBlocks(image, set(), summarizeLoops)
+    volatileAddresses = set(compiler.constantStores) | set(compiler.blockedStores)
+    compiler = _translateBlocks(image, volatileAddresses, summarizeLoops)
+
+    entries = sorted(compiler.blocks)
+    lines = ['"""',
+             'Intcode program translated ahead of time by intcode.Translator',
+             '"""',
+             f'IMAGE_HASH = {imageHash(image)!r}',
+             '']
+
+    for entry in entries:
+        source, _ = compiler.sources[entry]
+        lines.append(source.replace('def block(', f'def block{entry}(', 1))
+
+    lines.append('BLOCKS = {' + ', '.join(f'{entry}: block{entry}' for entry in entries) + '}')
+    # the words each block was compiled from, so that seeding can skip blocks patched since
+    blockWords = {entry: tuple((address, compiler.memory[address]) for address in compiler.blockAddresses[entry])
+                  for entry in entries}
+    lines.append(f'BLOCK_ADDRESSES = {blockWords}')
+    lines.append(f'CONSTANT_STORES = {_entryTable(compiler.constantStores, entries)}')
+    lines.append(f'BLOCKED_STORES = {_entryTable(compiler.blockedStores, entries)}')
+    lines.append(f'VOLATILE_ADDRESSES = {tuple(sorted(compiler.volatileAddresses))}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def loadTranslation(image: Sequence[int], cacheDir: Union[str, None] = None, summarizeLoops: bool = False) -> dict:
+    """
+    Gets the translated module for a program image, from memory, from the on-disk cache or by
+    translating it
+    :return: the module namespace
+    """
+    key = translationKey(image, summarizeLoops)
+    translation = _TRANSLATIONS.get(key)
+    if translation is not None:
+        return translation
+
+    sourcePath, bytecodePath = _cachePaths(key, cacheDir)
+    code = _readBytecode(bytecodePath)
+    if code is None:
+        source = translate(image, summarizeLoops)
+        code = compile(source, sourcePath, 'exec')
+        _writeCache(sourcePath, source, bytecodePath, code)
+
+    translation = dict()
+    exec(code, translation)
+    _TRANSLATIONS[key] = translation
+
+    return translation
+
+
+def compileProgram(image: Sequence[int], cacheDir: Union[str, None] = None, summarizeLoops: bool = False) -> str:
+    """
+    Translates a program image into the on-disk cache
+    :return: the path of the generated source
+    """
+    key = translationKey(image, summarizeLoops)
+    sourcePath, bytecodePath = _cachePaths(key, cacheDir)
+    source = translate(image, summarizeLoops)
+    _writeCache(sourcePath, source, bytecodePath, compile(source, sourcePath, 'exec'))
+    _TRANSLATIONS.pop(key, None)
+
+    return sourcePath
+
+
+def _translateBlocks(image: Sequence[int], volatileAddresses: Set[int], summarizeLoops: bool) -> BlockCompiler:
+    """
+    Compiles every block reachable from address 0
+    """
+    compiler = BlockCompiler(PagedMemory(image), image, keepSources=True, summarizeLoops=summarizeLoops)
+    compiler.volatileAddresses.update(volatileAddresses)
+
+    discovered = {0}
+    pending = [0]
+    while pending:
+        entry = pending.pop()
+        compiler.compileBlock(entry)
+        _, instructions = compiler.sources[entry]
+        for successor in _successors(compiler.memory, entry, instructions):
+            if 0 <= successor < len(image) and successor not in discovered:
+                discovered.add(successor)
+                pending.append(successor)
+
+    # compiling a block can drop an earlier block that stores into it; compiling that block
+    # again cuts it short of the store
+    for _ in range(MAX_SEED_PASSES):
+        dropped = discovered.difference(compiler.blocks)
+        if not dropped:
+            break
+        for entry in dropped:
+            compiler.compileBlock(entry)
+
+    return compiler
+
+
+def _successors(memory: PagedMemory, entry: int, instructions: List[tuple]) -> List[int]:
+    """
+    The statically known addresses that control can reach after a block
+    """
+    if instructions:
+        sp, opcode, modes, parameters = instructions[-1]
+        nextSp = sp + 1 + len(parameters)
+        if opcode in _JUMP_OPCODES:
+            successors = list()
+            condition, target = parameters
+            if modes[0] != _MODE_IMMEDIATE or condition is None or (condition != 0) == (opcode == 6):
+                successors.append(nextSp)
+            if modes[0] != _MODE_IMMEDIATE or condition is None or (condition != 0) == (opcode == 5):
+                if modes[1] == _MODE_IMMEDIATE and target is not None:
+                    successors.append(target)
+            return successors
+
+        if len(instructions) == MAX_BLOCK_INSTRUCTIONS:
+            return [nextSp]
+    else:
+        nextSp = entry
+
+    # the block stopped at an instruction the reference opcode runs
+    decoded = DECODE_TABLE.get(memory[nextSp])
+    if decoded is None:
+        return []
+    elif decoded[0] in _IO_OPCODES:
+        return [nextSp + 2]
+    elif decoded[0] in _STORING_OPCODES:
+        return [nextSp + 4]
+
+    return []
+
+
+def _entryTable(table: Dict[int, Set[int]], entries: List[int]) -> Dict[int, tuple]:
+    """
+    Restricts an address -> entry points table to the translated entry points
+    """
+    entries = set(entries)
+    restricted = dict()
+    for address, addressEntries in sorted(table.items()):
+        addressEntries = tuple(sorted(entries.intersection(addressEntries)))
+        if addressEntries:
+            restricted[address] = addressEntries
+
+    return restricted
+
+
+def _cachePaths(key: str, cacheDir: Union[str, None]):
+    """
+    The paths of a translation's source and bytecode in the cache
+    """
+    cacheDir = cacheDir if cacheDir is not None else CACHE_DIR
+    return os.path.join(cacheDir, f'{key}.py'), os.path.join(cacheDir, f'{key}.bin')
+
+
+def _readBytecode(bytecodePath: str):
+    """
+    Reads cached bytecode, ignoring a missing file, one written by another Python version or
+    a truncated or corrupt one, which the caller then translates again and overwrites
+    """
+    try:
+        with open(bytecodePath, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    magic = importlib.util.MAGIC_NUMBER
+    if not data.startswith(magic):
+        return None
+
+    try:
+        code = marshal.loads(data[len(magic):])
+    except (EOFError, ValueError, TypeError):
+        return None
+
+    return code if isinstance(code, types.CodeType) else None
+
+
+def _writeCache(sourcePath: str, source: str, bytecodePath: str, code):
+    """
+    Writes a translation to the cache.  Each file is replaced atomically so that concurrent
+    runs never read a partial file, and a cache that cannot be written is skipped.
+    """
+    try:
+        os.makedirs(os.path.dirname(sourcePath), exist_ok=True)
+        for path, mode, data in ((sourcePath, 'w', source),
+                                 (bytecodePath, 'wb', importlib.util.MAGIC_NUMBER + marshal.dumps(code))):
+            temporaryPath = f'{path}.{os.getpid()}.tmp'
+            with open(temporaryPath, mode) as f:
+                f.write(data)
+            os.replace(temporaryPath, path)
+    except OSError:
+        pass
@@ -0,0 +1,40 @@
+"""
+Intcode virtual machine shared by all of the Intcode days
+
+The batch executor, the trace recorder and the fuzzer, which runs the batch executor, need
+NumPy and are imported when one of their names is first used, so the days that do not use them
+run without NumPy.
+"""
+import importlib
+
+from .Channel import InputChannel
+from .Computer import IntcodeComputer, Signal
+from .Decoder import decodeInstruction
+from .Disassembler import ControlFlowGraph, analyze
+from .Memory import PagedMemory
+from .Profiler import Profiler
+from .ProgramCache import PROGRAM_CACHE, ProgramCache
+from .Scheduler import Scheduler, Task
+from .Sweep import SweepResult, sweep
+from .Symbolic import Polynomial, SymbolicComputer, SymbolicFallback, solve
+from .Tracing import printTrace
+from .Translator import compileProgram, loadTranslation, translate
+
+# name -> module of the exports that need NumPy
+_NUMPY_EXPORTS = {'BatchComputer': 'Batch',
+                  'FuzzReport': 'Fuzzer',
+                  'fuzz': 'Fuzzer',
+                  'RECORD_DTYPE': 'Recorder',
+                  'TraceRecorder': 'Recorder',
+                  'loadTrace': 'Recorder'}
+
+
+def __getattr__(name: str):
+    """
+    Imports the exports that need NumPy on first use
+    """
+    module = _NUMPY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    return getattr(importlib.import_module(f'.{module}', __name__), name)
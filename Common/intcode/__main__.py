@@ -0,0 +1,122 @@
+"""
+Command line entry point for the Intcode package
+
+    python -m intcode compile <input file> [<input file> ...] [--cache-dir <directory>] [--summarize-loops]
+
+translates programs ahead of time into the on-disk cache used by the translated engine.
+
+    python -m intcode profile <input file> [--inputs <value> ...] [--every <n>] [--top <n>] [--json <file>]
+
+runs a program until it halts or runs out of inputs and prints its instruction profile, then
+runs it again on the dispatch engine to measure instruction fusion.
+
+    python -m intcode disassemble <input file> [--output <file>]
+
+prints the disassembly and control flow graph of a program, or writes it to a file.
+
+    python -m intcode fuzz [--seed <n>] [--programs <n>] [--engines <engine> ...] [--every <n>] [--max-steps <n>]
+                       [--batch-max-steps <n>] [--json <file>]
+
+runs random programs on the reference implementation and the engines under test, prints their
+throughput and mismatches and exits with status 1 if any engine disagreed with the reference.
+"""
+import argparse
+import sys
+from typing import List, Union
+
+from .Channel import InputChannel
+from .Computer import IntcodeComputer
+from .Disassembler import analyze
+from .Fuzzer import DEFAULT_BATCH_MAX_STEPS, DEFAULT_EVERY, DEFAULT_MAX_STEPS, DEFAULT_PROGRAMS, DEFAULT_SELF_MODIFYING_SHARE, ENGINES, fuzz
+from .Profiler import DEFAULT_TOP, Profiler
+from .ProgramCache import PROGRAM_CACHE
+from .Translator import compileProgram
+
+
+def main():
+    """
+    Parses the command line and runs the requested command
+    """
+    parser = argparse.ArgumentParser(prog='intcode')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    compileCommand = commands.add_parser('compile', help='translate programs into the compiled cache')
+    compileCommand.add_argument('inputFiles', nargs='+', metavar='inputFile')
+    compileCommand.add_argument('--cache-dir', dest='cacheDir', default=None)
+    compileCommand.add_argument('--summarize-loops', dest='summarizeLoops', action='store_true',
+                                help='translate for machines that summarize counted loops')
+
+    profileCommand = commands.add_parser('profile', help='profile a program run')
+    profileCommand.add_argument('inputFile')
+    profileCommand.add_argument('--inputs', nargs='*', type=int, default=[])
+    profileCommand.add_argument('--every', type=int, default=1, help='sample every Nth instruction')
+    profileCommand.add_argument('--top', type=int, default=DEFAULT_TOP)
+    profileCommand.add_argument('--json', dest='jsonFile', default=None, help='write the report to a JSON file')
+
+    disassembleCommand = commands.add_parser('disassemble', help='disassemble a program')
+    disassembleCommand.add_argument('inputFile')
+    disassembleCommand.add_argument('--output', dest='outputFile', default=None)
+
+    fuzzCommand = commands.add_parser('fuzz', help='compare the engines with the reference on random programs')
+    fuzzCommand.add_argument('--seed', type=int, default=0)
+    fuzzCommand.add_argument('--programs', type=int, default=DEFAULT_PROGRAMS)
+    fuzzCommand.add_argument('--engines', nargs='+', choices=list(ENGINES), default=None)
+    fuzzCommand.add_argument('--every', type=int, default=DEFAULT_EVERY, help='instructions between sliced comparisons')
+    fuzzCommand.add_argument('--max-steps', dest='maxSteps', type=int, default=DEFAULT_MAX_STEPS)
+    fuzzCommand.add_argument('--batch-max-steps', dest='batchMaxSteps', type=int, default=DEFAULT_BATCH_MAX_STEPS,
+                             help='longest reference run compared with a batch lane')
+    fuzzCommand.add_argument('--self-modifying', dest='selfModifyingShare', type=float, default=DEFAULT_SELF_MODIFYING_SHARE,
+                             help='share of programs that patch their own code')
+    fuzzCommand.add_argument('--json', dest='jsonFile', default=None, help='write the report to a JSON file')
+
+    args = parser.parse_args()
+    if args.command == 'compile':
+        for inputFile in args.inputFiles:
+            sourcePath = compileProgram(PROGRAM_CACHE.load(inputFile), cacheDir=args.cacheDir, summarizeLoops=args.summarizeLoops)
+            print(f'{inputFile} -> {sourcePath}')
+    elif args.command == 'profile':
+        profile(args.inputFile, args.inputs, args.every, args.top, args.jsonFile)
+    elif args.command == 'disassemble':
+        listing = analyze(PROGRAM_CACHE.load(args.inputFile)).listing()
+        if args.outputFile is not None:
+            with open(args.outputFile, 'w') as file:
+                file.write(listing)
+        else:
+            print(listing, end='')
+    elif args.command == 'fuzz':
+        report = fuzz(seed=args.seed,
+                      programs=args.programs,
+                      engines=args.engines,
+                      every=args.every,
+                      maxSteps=args.maxSteps,
+                      batchMaxSteps=args.batchMaxSteps,
+                      selfModifyingShare=args.selfModifyingShare)
+        report.printReport()
+        if args.jsonFile is not None:
+            report.dumpJson(args.jsonFile)
+        if report.mismatches:
+            sys.exit(1)
+
+
+def profile(inputFile: str, inputs: List[int], every: int, top: int, jsonFile: Union[str, None]):
+    """
+    Runs a program until it halts or needs an input it was not given and reports its profile
+    """
+    computer = IntcodeComputer(inputFile=inputFile)
+    computer.setInputPolicy(InputChannel.POLICY_BLOCK)
+    computer.setInputs(inputs)
+
+    profiler = Profiler()
+    computer.setTraceHook(profiler, every=every)
+    while computer.execute() not in (None, IntcodeComputer.NEEDS_INPUT):
+        pass
+    profiler.measureFusion(inputFile, inputs)
+
+    if jsonFile is not None:
+        profiler.dumpJson(jsonFile, top)
+    else:
+        profiler.printReport(top)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""
+Shared fixtures for the intcode tests
+"""
+import os
+import pathlib
+import sys
+from typing import Callable, Sequence
+
+import pytest
+
+sys.path.append(os.path.join(pathlib.Path(__file__).parent.parent))
+from intcode import Translator  # noqa: E402
+
+ENGINES = ('blocks', 'translated', 'dispatch')
+
+
+@pytest.fixture(autouse=True)
+def cacheDir(tmp_path, monkeypatch) -> str:
+    """
+    Keeps the translated engine's cache out of the home directory
+    """
+    directory = str(tmp_path / 'cache')
+    monkeypatch.setattr(Translator, 'CACHE_DIR', directory)
+    return directory
+
+
+@pytest.fixture
+def writeProgram(tmp_path) -> Callable[[Sequence[int]], str]:
+    """
+    Writes a program to an input file and returns its path
+    """
+    paths = list()
+
+    def write(program: Sequence[int]) -> str:
+        path = str(tmp_path / f'program{len(paths)}.txt')
+        with open(path, 'w') as f:
+            f.write(','.join(str(value) for value in program))
+        paths.append(path)
+        return path
+
+    return write
@@ -0,0 +1,88 @@
+"""
+Tests of the lockstep batch executor
+"""
+import numpy as np
+
+from intcode import BatchComputer, IntcodeComputer
+from intcode.Batch import MAX_DENSE_BYTES, WORD_BYTES
+
+
+def testLanesMatchIntcodeComputer(writeProgram):
+    """
+    Every lane computes what a single machine computes with the same initial values
+    """
+    path = writeProgram([1, 0, 0, 3, 1, 1, 2, 3, 1, 3, 4, 3, 1, 5, 0, 3, 2, 1, 10, 19, 1, 19, 5, 23, 99])
+    nouns, verbs = np.divmod(np.arange(100), 10)
+    batch = BatchComputer(path, numLanes=nouns.size)
+    batch.initialize(values1=nouns, values2=verbs)
+    batch.execute()
+
+    for lane in (0, 37, 99):
+        computer = IntcodeComputer(path)
+        computer.initialize(int(nouns[lane]), int(verbs[lane]))
+        assert computer.execute() is None
+        assert batch.program[lane, 0] == computer.program[0]
+
+
+def testLaneInputsAndOutputs(writeProgram):
+    """
+    Each lane reads its own inputs, repeating its last one, and collects its own outputs
+    """
+    batch = BatchComputer(writeProgram([3, 12, 3, 13, 1, 12, 13, 14, 4, 14, 99, 0, 0, 0, 0]), numLanes=3)
+    batch.setInputs([[1, 2], [3, 4], [5, 6]])
+    batch.execute()
+    assert batch.outputs == [[3], [7], [11]]
+
+    batch.reset()
+    batch.setInputs([[4], [5], [6]])
+    batch.execute()
+    assert batch.outputs == [[8], [10], [12]]
+
+
+def testOverflowFaultsOnlyItsLane(writeProgram):
+    """
+    A lane whose product overflows int64 faults and the other lanes carry on
+    """
+    batch = BatchComputer(writeProgram([3, 11, 1002, 11, 2 ** 40, 11, 4, 11, 99, 0, 0, 0]), numLanes=2)
+    batch.setInputs([[2 ** 10], [2 ** 30]])
+    batch.execute()
+    assert batch.faulted.tolist() == [False, True]
+    assert batch.outputs == [[2 ** 50], []]
+
+
+def testOversizedImageWordFaultsReadingLanes(writeProgram):
+    """
+    An image word that does not fit in int64 faults only the lanes that read it before
+    overwriting it
+    """
+    # lanes given 1 overwrite the word at 14 before reading it, lanes given 0 read it
+    program = [3, 15, 1006, 15, 9, 1101, 0, 7, 14, 1001, 14, 1, 14, 99, 2 ** 70, 0]
+    batch = BatchComputer(writeProgram(program), numLanes=2)
+    batch.setInputs([[0], [1]])
+    batch.execute()
+    assert batch.faulted.tolist() == [True, False]
+    assert batch.sp[0] == 9
+    assert batch.program[1, 14] == 8
+
+
+def testDenseMemoryScalesWithLanes(writeProgram):
+    """
+    A lane storing at a high address does not widen every lane past the batch's memory budget
+    """
+    numLanes = 10000
+    batch = BatchComputer(writeProgram([3, 11, 4, 11, 101, 7, 11, 12, 99, 0, 0, 0, 0]), numLanes=numLanes)
+    batch.setInputs(np.zeros((numLanes, 1), dtype=np.int64))
+    assert batch.denseLimit == MAX_DENSE_BYTES // (WORD_BYTES * numLanes)
+
+    # each lane stores 7 at the address it reads as its input, the first lane at 60000
+    program = [3, 12, 9, 12, 21101, 0, 7, 0, 4, 12, 99, 0, 0]
+    batch = BatchComputer(writeProgram(program), numLanes=numLanes)
+    inputs = np.full((numLanes, 1), 20, dtype=np.int64)
+    inputs[0] = 60000
+    batch.setInputs(inputs)
+    batch.execute()
+    assert not batch.faulted.any()
+    assert batch.program.nbytes <= MAX_DENSE_BYTES
+    assert batch.sparse[0] == {60000: 7}
+    assert batch.program[1, 20] == 7
+    assert batch.outputs[0] == [60000]
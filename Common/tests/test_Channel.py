@@ -0,0 +1,84 @@
+"""
+Tests of the input channel and its policies
+"""
+import pytest
+
+from intcode import InputChannel, IntcodeComputer
+
+# reads two inputs and outputs them
+READ_TWICE_PROGRAM = [3, 20, 3, 21, 4, 20, 4, 21, 99]
+
+
+def testRepeatLast(writeProgram):
+    """
+    By default an empty channel repeats the last value consumed
+    """
+    computer = IntcodeComputer(writeProgram(READ_TWICE_PROGRAM))
+    computer.setInputs([5])
+    assert computer.execute() == 5
+    assert computer.execute() == 5
+
+
+def testDefault(writeProgram):
+    """
+    The default policy supplies its default value once the channel runs dry
+    """
+    computer = IntcodeComputer(writeProgram(READ_TWICE_PROGRAM))
+    computer.setInputPolicy(InputChannel.POLICY_DEFAULT, defaultValue=9)
+    computer.setInputs([5])
+    assert computer.execute() == 5
+    assert computer.execute() == 9
+
+
+def testBlock(writeProgram):
+    """
+    The block policy stops the machine with NEEDS_INPUT until it is given an input
+    """
+    computer = IntcodeComputer(writeProgram(READ_TWICE_PROGRAM))
+    computer.setInputPolicy(InputChannel.POLICY_BLOCK)
+    computer.setInputs([5])
+    assert computer.execute() is IntcodeComputer.NEEDS_INPUT
+
+    computer.appendInput(6)
+    assert computer.execute() == 5
+    assert computer.execute() == 6
+    assert computer.execute() is None
+
+
+def testUnknownPolicy(writeProgram):
+    """
+    An unknown policy is refused
+    """
+    computer = IntcodeComputer(writeProgram(READ_TWICE_PROGRAM))
+    with pytest.raises(ValueError):
+        computer.setInputPolicy('wait')
+
+
+def testOverflow(writeProgram):
+    """
+    A channel refuses values beyond the machine's maxInputs
+    """
+    computer = IntcodeComputer(writeProgram(READ_TWICE_PROGRAM), maxInputs=3)
+    computer.setInputs([1, 2, 3])
+    with pytest.raises(RuntimeError):
+        computer.appendInput(4)
+    with pytest.raises(RuntimeError):
+        computer.setInputs([1, 2, 3, 4])
+
+    assert computer.fork().inputChannel.maxLength == 3
+
+
+def testDefaultMaxInputs(writeProgram):
+    """
+    Without maxInputs the channel holds DEFAULT_MAX_LENGTH values, and a larger limit
+    takes more
+    """
+    path = writeProgram(READ_TWICE_PROGRAM)
+    values = range(InputChannel.DEFAULT_MAX_LENGTH + 1)
+    with pytest.raises(RuntimeError):
+        IntcodeComputer(path).setInputs(values)
+
+    computer = IntcodeComputer(path, maxInputs=2 * InputChannel.DEFAULT_MAX_LENGTH)
+    computer.setInputs(values)
+    assert computer.execute() == 0
+    assert computer.execute() == 1
@@ -0,0 +1,87 @@
+"""
+Tests of snapshots and checkpoints
+"""
+import pytest
+
+from conftest import ENGINES
+from intcode import IntcodeComputer
+from test_Scheduler import PATCHING_PROGRAM
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def testAutoCheckpointPatchesCompiledCode(writeProgram, tmp_path, engine):
+    """
+    Code patched while checkpointing is on is run patched once it is turned off
+    """
+    computer = IntcodeComputer(writeProgram(PATCHING_PROGRAM), engine=engine)
+    assert computer.execute() == 7
+
+    computer.appendInput(1)
+    computer.setAutoCheckpoint(str(tmp_path / 'checkpoint'), every=3)
+    assert computer.execute() == 9
+
+    computer.setAutoCheckpoint(None, every=1)
+    computer.appendInput(0)
+    assert computer.execute() == 9
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def testCheckpointRoundTrip(writeProgram, tmp_path, engine):
+    """
+    A machine restored from a checkpoint carries on as the machine that saved it
+    """
+    path = writeProgram(PATCHING_PROGRAM)
+    computer = IntcodeComputer(path, engine=engine)
+    computer.setInputs([1, 1, 0])
+    assert computer.execute() == 7
+    computer.saveCheckpoint(str(tmp_path / 'checkpoint'))
+
+    restored = IntcodeComputer(path, engine=engine)
+    restored.loadCheckpoint(str(tmp_path / 'checkpoint'))
+    assert restored.instructionCount == computer.instructionCount
+    assert [restored.execute() for _ in range(3)] == [computer.execute() for _ in range(3)] == [9, 9, 9]
+    assert restored.instructionCount == computer.instructionCount
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def testRewindRestoresInstructionCount(writeProgram, tmp_path, engine):
+    """
+    restore() and loadCheckpoint() rewind the instruction count and restart the checkpoint
+    countdown
+    """
+    computer = IntcodeComputer(writeProgram(PATCHING_PROGRAM), engine=engine)
+    computer.setInputs([1])
+    computer.setAutoCheckpoint(str(tmp_path / 'auto'), every=4)
+    computer.execute()
+    snapshot = computer.snapshot()
+    computer.saveCheckpoint(str(tmp_path / 'saved'))
+    instructionCount = computer.instructionCount
+
+    computer.execute()
+    assert computer.instructionCount > instructionCount
+
+    computer.restore(snapshot)
+    assert computer.instructionCount == instructionCount
+    assert computer.autoCheckpoint.remaining == 4
+
+    computer.execute()
+    computer.loadCheckpoint(str(tmp_path / 'saved'))
+    assert computer.instructionCount == instructionCount
+    assert computer.autoCheckpoint.remaining == 4
+
+
+def testCheckpointKeepsBignums(writeProgram, tmp_path):
+    """
+    Values that do not fit in int64 survive a checkpoint
+    """
+    path = writeProgram([1102, 2 ** 40, 2 ** 40, 9, 3, 10, 4, 9, 99])
+    computer = IntcodeComputer(path)
+    computer.setInputs([2 ** 70])
+    assert computer.execute() == 2 ** 80
+    computer.saveCheckpoint(str(tmp_path / 'checkpoint'))
+
+    restored = IntcodeComputer(path)
+    restored.loadCheckpoint(str(tmp_path / 'checkpoint'))
+    assert restored.program[9] == 2 ** 80
+    assert restored.program[10] == 2 ** 70
+    assert restored.execute() is None
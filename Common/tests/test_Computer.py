@@ -0,0 +1,150 @@
+"""
+Tests of the Intcode computer
+"""
+import os
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ENGINES
+from intcode import IntcodeComputer
+
+COMMON_DIR = os.path.join(pathlib.Path(__file__).parent.parent)
+
+# echoes its inputs until it reads 0
+ECHO_PROGRAM = [3, 20, 4, 20, 1005, 20, 0, 99]
+
+# counts address 50 up to 3 and outputs it.  The increment is fused with a jump-if-true that
+# takes its target from address 100000, on a page that is not allocated, and jumps back to the
+# start.  A fault in the jump must not run the increment twice.
+FUSED_JUMP_PROGRAM = [1007, 50, 3, 51, 1006, 51, 17, 1001, 50, 1, 50, 5, 50, 100000, 99, 0, 0, 4, 50, 99] + [0] * 32
+
+
+def testImportWithoutNumpy(writeProgram):
+    """
+    The package imports and runs programs without NumPy, which only some modules need
+    """
+    script = ('import sys\n'
+              'sys.modules["numpy"] = None\n'
+              f'sys.path.append({COMMON_DIR!r})\n'
+              'from intcode import IntcodeComputer\n'
+              f'computer = IntcodeComputer({writeProgram([3, 9, 1002, 9, 3, 9, 4, 9, 99, 0])!r})\n'
+              'computer.setInputs([14])\n'
+              'print(computer.execute())\n'
+              'import intcode\n'
+              'try:\n'
+              '    intcode.BatchComputer\n'
+              'except ImportError:\n'
+              '    print("no batch")\n')
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ['42', 'no', 'batch']
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def testNegativeInstructionWord(writeProgram, engine):
+    """
+    A negative instruction word is an illegal opcode, not a halt (-1 % 100 is 99)
+    """
+    computer = IntcodeComputer(writeProgram([-1, 0, 0, 0]), engine=engine)
+    with pytest.raises(RuntimeError):
+        computer.execute()
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def testFusedJumpReadingUnallocatedPage(writeProgram, engine):
+    """
+    A fused jump whose target read faults falls back to the reference opcode after the first
+    instruction of its pair, which runs only once
+    """
+    computer = IntcodeComputer(writeProgram(FUSED_JUMP_PROGRAM), engine=engine)
+    assert computer.execute() == 3
+    assert computer.execute() is None
+
+
+@pytest.mark.parametrize('engine', ('blocks', 'translated'))
+def testForkAndRestoreKeepCompiledBlocks(writeProgram, engine):
+    """
+    A fork starts from its parent's compiled blocks, and restoring a snapshot keeps the
+    blocks whose code is unchanged
+    """
+    computer = IntcodeComputer(writeProgram(ECHO_PROGRAM), engine=engine)
+    computer.setInputs([5])
+    assert computer.execute() == 5
+    snapshot = computer.snapshot()
+
+    computer.appendInput(6)
+    assert computer.execute() == 6
+    blocks = dict(computer.blockCompiler.blocks)
+    assert blocks
+
+    computer.restore(snapshot)
+    assert computer.blockCompiler.memory is computer.program
+    assert all(computer.blockCompiler.blocks.get(entry) is block for entry, block in blocks.items())
+    computer.appendInput(7)
+    assert computer.execute() == 7
+
+    clone = computer.fork()
+    assert clone.blockCompiler is not computer.blockCompiler
+    assert clone.blockCompiler.memory is clone.program
+    assert all(clone.blockCompiler.blocks.get(entry) is block for entry, block in blocks.items())
+    clone.appendInput(8)
+    assert clone.execute() == 8
+    computer.appendInput(9)
+    assert computer.execute() == 9
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def testRestoreDropsPatchedBlocks(writeProgram, engine):
+    """
+    Restoring a snapshot taken before the program patched its code runs the unpatched code
+    """
+    # stores 7 to address 20 and outputs it, reads an input, and unless it is 0 patches the
+    # store to 9 and jumps back to the start
+    computer = IntcodeComputer(writeProgram([1101, 7, 0, 20, 4, 20, 3, 30, 1006, 30, 0, 1101, 0, 9, 1, 1105, 1, 0]), engine=engine)
+    assert computer.execute() == 7
+    snapshot = computer.snapshot()
+
+    computer.appendInput(1)
+    assert computer.execute() == 9
+
+    computer.restore(snapshot)
+    computer.appendInput(0)
+    assert computer.execute() == 7
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def testRunYieldsOutputs(writeProgram, engine):
+    """
+    run() yields every output and returns when the program halts
+    """
+    computer = IntcodeComputer(writeProgram([104, 1, 104, 2, 99]), engine=engine)
+    assert list(computer.run()) == [1, 2]
+    assert computer.halted
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def testRunAsksForInputs(writeProgram, engine):
+    """
+    run() yields NEEDS_INPUT rather than prompting, takes inputs through send() and restores
+    blockOnInput when it is closed
+    """
+    computer = IntcodeComputer(writeProgram(ECHO_PROGRAM), engine=engine)
+    machine = computer.run()
+    assert next(machine) is IntcodeComputer.NEEDS_INPUT
+    assert machine.send(5) == 5
+    assert next(machine) is IntcodeComputer.NEEDS_INPUT
+    assert machine.send(6) == 6
+
+    # an input sent with an output is queued for the next read
+    assert machine.send(7) == 7
+    assert computer.blockOnInput
+
+    machine.close()
+    assert not computer.blockOnInput
+
+    computer.appendInput(0)
+    assert computer.execute() == 0
+    assert computer.execute() is None
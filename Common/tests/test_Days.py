@@ -0,0 +1,197 @@
+"""
+Runs each day's Intcode puzzle on every engine and checks its answers
+"""
+import importlib.util
+from itertools import permutations
+import os
+import pathlib
+import sys
+from typing import List, Tuple
+
+import pytest
+
+from conftest import ENGINES
+from intcode import IntcodeComputer, Polynomial, SymbolicComputer, SymbolicFallback, solve, sweep
+
+ROOT_DIR = pathlib.Path(__file__).parent.parent.parent
+sys.path.append(os.path.join(ROOT_DIR, 'Day_7'))
+import Circuit  # noqa: E402
+
+# Day 2's script shares its module name with Day 5's
+_spec = importlib.util.spec_from_file_location('GravityAssist', os.path.join(ROOT_DIR, 'Day_2', 'IntcodeComputer.py'))
+GravityAssist = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(GravityAssist)
+
+# 100 * noun + verb + 19684299 unless the noun equals the verb, which branches to store 0, so
+# the result only has a polynomial form in each branch
+BRANCHING_GRAVITY_ASSIST = [1108, 0, 0, 30, 1005, 30, 20, 102, 100, 1, 31, 1, 31, 2, 32, 1001, 32, 19684299, 0, 99,
+                            1101, 0, 0, 0, 99] + [0] * 8
+
+
+def inputFile(day: int) -> str:
+    """
+    The path of a day's puzzle input
+    """
+    return os.path.join(ROOT_DIR, f'Day_{day}', 'input.txt')
+
+
+def allOutputs(computer: IntcodeComputer) -> List[int]:
+    """
+    Executes a machine until it halts and returns its outputs
+    """
+    outputs = list()
+    while True:
+        output = computer.execute()
+        if output is None:
+            return outputs
+
+        outputs.append(output)
+
+
+def paintHull(computer: IntcodeComputer, startingColor: int) -> Tuple[int, int]:
+    """
+    Runs Day 11's painting robot
+    :return: the number of panels painted at least once and the number left white
+    """
+    hull = {(0, 0): startingColor}
+    painted = set()
+    position, direction = (0, 0), (0, 1)
+
+    computer.appendInput(startingColor)
+    while not computer.halted:
+        for color, turn in computer.executeUntilBlocked(groupSize=2):
+            hull[position] = int(color)
+            painted.add(position)
+            direction = (-direction[1], direction[0]) if turn == 0 else (direction[1], -direction[0])
+            position = (position[0] + direction[0], position[1] + direction[1])
+
+        computer.appendInput(hull.get(position, 0))
+
+    return len(painted), sum(hull.values())
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def testDay2(engine):
+    """
+    The 1202 program alarm and the gravity assist noun and verb
+    """
+    computer = IntcodeComputer(inputFile(2), engine=engine)
+    computer.initialize(value1=12, value2=2)
+    computer.execute()
+    assert computer.program[0] == 4090701
+
+    computer = IntcodeComputer(inputFile(2), engine=engine)
+    computer.initialize(value1=64, value2=21)
+    computer.execute()
+    assert computer.program[0] == 19690720
+
+
+def testDay2Symbolic():
+    """
+    The gravity assist program solved symbolically for its noun and verb
+    """
+    computer = SymbolicComputer(inputFile=inputFile(2))
+    computer.initialize(value1=Polynomial.symbol('noun'), value2=Polynomial.symbol('verb'))
+    computer.execute()
+    solution = solve(polynomial=computer.program[0],
+                     target=GravityAssist.GRAVITY_ASSIST_OUTPUT,
+                     domains={'noun': range(GravityAssist.MAX_NOUN), 'verb': range(GravityAssist.MAX_VERB)})
+    assert solution == {'noun': 64, 'verb': 21}
+
+    assert GravityAssist.runGravityAssistProgram() == (64, 21)
+
+
+def testDay2BatchFallback(writeProgram):
+    """
+    A gravity assist program that branches on its noun falls back to the batch search
+    """
+    path = writeProgram(BRANCHING_GRAVITY_ASSIST)
+    computer = SymbolicComputer(inputFile=path)
+    computer.initialize(value1=Polynomial.symbol('noun'), value2=Polynomial.symbol('verb'))
+    with pytest.raises(SymbolicFallback):
+        computer.execute()
+
+    assert GravityAssist.searchGravityAssist(inputFile=path) == (64, 21)
+    assert GravityAssist.runGravityAssistProgram(inputFile=path) == (64, 21)
+    assert GravityAssist.searchGravityAssist() == (64, 21)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def testDay5(engine):
+    """
+    The TEST diagnostics for the air conditioner and the thermal radiators
+    """
+    computer = IntcodeComputer(inputFile(5), engine=engine)
+    computer.setInputs([1])
+    assert allOutputs(computer) == [0] * 9 + [16209841]
+
+    computer = IntcodeComputer(inputFile(5), engine=engine)
+    computer.setInputs([5])
+    assert allOutputs(computer) == [8834787]
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def testDay7(engine):
+    """
+    The highest amplifier signal, without and with feedback
+    """
+    result = sweep(program=inputFile(7), paramGrid=permutations(range(5)), evaluator=Circuit.runAmplifiers,
+                   workers=1, machines=Circuit.NUM_AMPS, engine=engine)
+    assert result.value == 277328
+
+    result = sweep(program=inputFile(7), paramGrid=permutations(range(5, 10)), evaluator=Circuit.runAmplifiersWithFeedback,
+                   workers=1, machines=Circuit.NUM_AMPS, engine=engine)
+    assert result.value == 11304734
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def testDay9(engine):
+    """
+    The BOOST keycode and the distress signal coordinates
+    """
+    computer = IntcodeComputer(inputFile(9), engine=engine)
+    computer.setInputs([1])
+    assert allOutputs(computer) == [3454977209]
+
+    computer = IntcodeComputer(inputFile(9), engine=engine)
+    computer.setInputs([2])
+    assert allOutputs(computer) == [50120]
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def testDay11(engine):
+    """
+    The panels the robot paints starting on black, and those left white starting on white
+    """
+    assert paintHull(IntcodeComputer(inputFile(11), engine=engine), startingColor=0) == (1885, 1007)
+    assert paintHull(IntcodeComputer(inputFile(11), engine=engine), startingColor=1) == (249, 106)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def testDay13(engine):
+    """
+    The block tiles on the screen and the score after breaking every block
+    """
+    computer = IntcodeComputer(inputFile(13), engine=engine)
+    frame = computer.executeUntilBlocked(groupSize=3)
+    assert (frame[:, 2] == 2).sum() == 260
+
+    computer = IntcodeComputer(inputFile(13), engine=engine)
+    computer.program[0] = 2
+    score = 0
+    paddle = ball = None
+    while not computer.halted:
+        for x, y, value in computer.executeUntilBlocked(groupSize=3):
+            if x == -1 and y == 0:
+                score = value
+            elif value == 3:
+                paddle = x
+            elif value == 4:
+                ball = x
+
+        if paddle is None or ball is None or ball == paddle:
+            computer.appendInput(0)
+        else:
+            computer.appendInput(1 if ball > paddle else -1)
+
+    assert score == 12952
@@ -0,0 +1,84 @@
+"""
+Tests of the static disassembler and its control flow graph
+"""
+from intcode import analyze
+from intcode.Disassembler import StoreSite
+
+# counts address 20 up to 5 and outputs it, with no store into code
+COUNTING_PROGRAM = [1101, 0, 0, 20, 1001, 20, 1, 20, 1007, 20, 5, 21, 1005, 21, 4, 4, 20, 99, 0, 0, 0, 0]
+
+
+def testControlFlowGraph():
+    """
+    A counted loop splits into the blocks before, inside and after the loop
+    """
+    graph = analyze(COUNTING_PROGRAM)
+
+    assert sorted(graph.blocks) == [0, 4, 15]
+    assert graph.blocks[0].successors == (4,)
+    assert graph.blocks[4].successors == (15, 4)
+    assert graph.blocks[15].successors == ()
+    assert [instruction.address for instruction in graph.blocks[4].instructions] == [4, 8, 12]
+    assert graph.predecessors[4] == [0, 4]
+    assert graph.codeAddresses == set(range(18))
+    assert graph.selfModificationFree
+
+
+def testConstantConditionPrunesBranch():
+    """
+    A jump on an immediate condition only follows the branch it takes
+    """
+    graph = analyze([1105, 1, 5, 99, 99, 4, 0, 99])
+
+    assert sorted(graph.instructions) == [0, 5, 7]
+    assert graph.blocks[0].successors == (5,)
+
+
+def testComputedJump():
+    """
+    A jump whose target is read from memory is computed, which rules out the proof
+    """
+    graph = analyze([105, 1, 4, 99, 3])
+
+    assert graph.computedJumps == (0,)
+    assert graph.blocks[0].computedJump
+    assert not graph.selfModificationFree
+
+
+def testStoreIntoCode():
+    """
+    A store with a constant address inside the code is flagged as definite
+    """
+    graph = analyze([1101, 1, 1, 0, 99])
+
+    assert graph.codeStores == (StoreSite(address=0, target=0, definite=True),)
+    assert not graph.selfModificationFree
+
+
+def testRelativeStoresAreUnknown():
+    """
+    Every relative mode store is flagged, even when the relative base points at data
+    """
+    graph = analyze([109, 100, 21101, 1, 1, 0, 203, 5, 99])
+
+    assert graph.codeStores == (StoreSite(address=2, target=None, definite=False),
+                                StoreSite(address=6, target=None, definite=False))
+    assert not graph.selfModificationFree
+
+
+def testListing():
+    """
+    The listing gives the verdict, the blocks with their edges, the instructions and the data
+    """
+    listing = analyze(COUNTING_PROGRAM).listing()
+
+    assert '; self-modification free: yes' in listing
+    assert 'block 4:' in listing
+    assert '-> 15, 4, from 0, 4' in listing
+    assert 'add  [20], 1 -> [20]' in listing
+    assert '18: .data 0, 0, 0, 0' in listing
+
+    listing = analyze([109, 100, 21101, 1, 1, 0, 1101, 1, 1, 0, 99]).listing()
+    assert '; self-modification free: not proven' in listing
+    assert 'store may hit code' in listing
+    assert 'stores into code' in listing
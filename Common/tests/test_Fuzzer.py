@@ -0,0 +1,50 @@
+"""
+Tests of the differential fuzzer
+"""
+import pytest
+
+from intcode import Batch, fuzz
+from intcode.Fuzzer import EVENT_HALT, ReferenceMachine
+
+
+def testSeedsAreClean():
+    """
+    A short run finds no mismatches on any engine
+    """
+    for seed in (0, 1):
+        report = fuzz(seed=seed, programs=25)
+        assert report.programs == 25
+        assert report.mismatches == []
+
+
+def testEngineCrashIsRecorded(monkeypatch):
+    """
+    An engine that raises is recorded as a mismatch of the program and the run carries on
+    """
+    def crash(self):
+        raise OverflowError('Python int too large to convert to C long')
+
+    monkeypatch.setattr(Batch.BatchComputer, 'reset', crash)
+    report = fuzz(seed=0, programs=3, engines=['batch', 'blocks'])
+    assert report.programs == 3
+    assert {mismatch.engine for mismatch in report.mismatches} == {'batch'}
+    assert [mismatch.program for mismatch in report.mismatches] == list(range(len(report.mismatches)))
+    assert report.mismatches[0].where == 'crash'
+    assert 'OverflowError' in report.mismatches[0].detail
+
+
+def testReferenceFaultsOnOversizedImageWords():
+    """
+    Under batch semantics the reference faults on reading an image word that does not fit in
+    int64, and only then
+    """
+    image = [1001, 7, 0, 8, 99, 0, 0, 2 ** 70, 0]
+    machine = ReferenceMachine(image, [], repeatLastInput=True, int64=True)
+    with pytest.raises(RuntimeError):
+        machine.execute()
+    assert machine.sp == 0
+
+    image[0] = 1101
+    machine = ReferenceMachine(image, [], repeatLastInput=True, int64=True)
+    assert machine.execute() == EVENT_HALT
+    assert machine.memory[8] == 7
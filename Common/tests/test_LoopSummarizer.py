@@ -0,0 +1,84 @@
+"""
+Tests of counted loop summarization on the synthetic loops it is meant for
+"""
+import time
+
+import pytest
+
+from conftest import ENGINES
+from intcode import IntcodeComputer, PagedMemory
+from intcode.BlockCompiler import BlockCompiler
+
+DATA = 100
+
+
+def seriesProgram(count: int) -> list:
+    """
+    Counts i from 0 to count, adding each i to s, and outputs s
+    """
+    program = [1001, DATA, 1, DATA,
+               1, DATA + 1, DATA, DATA + 1,
+               1007, DATA, count, DATA + 2,
+               1005, DATA + 2, 0,
+               4, DATA + 1,
+               99]
+    return program + [0] * (DATA + 3 - len(program))
+
+
+def geometricProgram(count: int) -> list:
+    """
+    Doubles g count times and outputs it
+    """
+    program = [1001, DATA, -1, DATA,
+               1002, DATA + 1, 2, DATA + 1,
+               1005, DATA, 0,
+               4, DATA + 1,
+               99]
+    return program + [0] * (DATA - len(program)) + [count, 1]
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('summarizeLoops', (False, True))
+def testLoopsMatchOnEveryEngine(writeProgram, engine, summarizeLoops):
+    """
+    Summarized and unsummarized loops compute the same results
+    """
+    computer = IntcodeComputer(writeProgram(seriesProgram(1000)), engine=engine, summarizeLoops=summarizeLoops)
+    assert computer.execute() == 1000 * 1001 // 2
+
+    computer = IntcodeComputer(writeProgram(geometricProgram(300)), engine=engine, summarizeLoops=summarizeLoops)
+    assert computer.execute() == 2 ** 300
+
+
+@pytest.mark.parametrize('engine', ('blocks', 'translated'))
+def testSummarizedLoopsRunInConstantTime(writeProgram, engine):
+    """
+    A billion iterations finish at once when the loop is summarized
+    """
+    count = 10 ** 9
+    computer = IntcodeComputer(writeProgram(seriesProgram(count)), engine=engine, summarizeLoops=True)
+    start = time.perf_counter()
+    assert computer.execute() == count * (count + 1) // 2
+    assert time.perf_counter() - start < 1.0
+
+
+def testInt64LoopPromotes(writeProgram):
+    """
+    A summarized loop whose result outgrows int64 memory still computes it
+    """
+    computer = IntcodeComputer(writeProgram(geometricProgram(100)), memory='int64', summarizeLoops=True)
+    assert computer.execute() == 2 ** 100
+
+
+def testSummaryIsOptIn():
+    """
+    Blocks only get a closed form prologue when loops are summarized
+    """
+    image = seriesProgram(1000)
+    sources = list()
+    for summarizeLoops in (False, True):
+        compiler = BlockCompiler(PagedMemory(image), image, keepSources=True, summarizeLoops=summarizeLoops)
+        compiler.compileBlock(0)
+        sources.append(compiler.sources[0][0])
+
+    assert len(sources[1]) > len(sources[0])
@@ -0,0 +1,49 @@
+"""
+Tests of the instruction profiler
+"""
+import time
+
+from intcode import Computer, IntcodeComputer, Profiler
+
+# counts address 15 down from 5 to 0, outputting it each time
+COUNTDOWN_PROGRAM = [4, 15, 1001, 15, -1, 15, 1008, 15, 0, 16, 1006, 16, 0, 99, 0, 5, 0]
+
+
+def testProfileCounts(writeProgram):
+    """
+    The profile counts every instruction by opcode and address
+    """
+    computer = IntcodeComputer(writeProgram(COUNTDOWN_PROGRAM))
+    profiler = Profiler()
+    computer.setTraceHook(profiler)
+    outputs = list()
+    while True:
+        output = computer.execute()
+        if output is None:
+            break
+        outputs.append(output)
+
+    assert outputs == [5, 4, 3, 2, 1]
+    report = profiler.report()
+    assert report['instructions'] == 5 * 4 + 1
+    assert report['opcodes']['out'] == 5
+
+
+def testFusionTimingLeavesOutTableBuild(writeProgram, monkeypatch):
+    """
+    Building the fused handlers is not timed as part of the fused runs
+    """
+    delay = 0.05
+    fusionTable = Computer.fusionTable
+
+    def slowFusionTable(*args, **kwargs):
+        time.sleep(delay)
+        return fusionTable(*args, **kwargs)
+
+    monkeypatch.setattr(Computer, 'fusionTable', slowFusionTable)
+    profiler = Profiler()
+    profiler.measureFusion(writeProgram(COUNTDOWN_PROGRAM), repeats=2)
+    assert profiler.fusion['instructions'] == 5 * 4 + 1
+    assert sum(profiler.fusion['counts'].values()) > 0
+    assert profiler.fusion['fusedSeconds'] < delay
+    assert profiler.fusion['unfusedSeconds'] < delay
@@ -0,0 +1,75 @@
+"""
+Tests of the process wide program image cache
+"""
+import os
+
+from intcode import ProgramCache
+
+
+def testHitsAndMisses(writeProgram):
+    """
+    A file is parsed once and then served from the cache
+    """
+    path = writeProgram([1, 0, 0, 0, 99])
+    cache = ProgramCache()
+
+    image = cache.load(path)
+    assert image == (1, 0, 0, 0, 99)
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    assert cache.load(path) is image
+    assert cache.load(os.path.relpath(path)) is image
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    cache.clear()
+    assert (cache.hits, cache.misses) == (0, 0)
+    assert cache.load(path) is not image
+
+
+def testReloadOnModification(writeProgram):
+    """
+    A file whose modification time changed is parsed again, and memories of the old image
+    are dropped
+    """
+    path = writeProgram([1, 0, 0, 0, 99])
+    cache = ProgramCache()
+    image = cache.load(path)
+    cache.memory(image)
+
+    with open(path, 'w') as f:
+        f.write('2,0,0,0,99')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+
+    reloaded = cache.load(path)
+    assert reloaded == (2, 0, 0, 0, 99)
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert all(key[0] != id(image) for key in cache.memories)
+
+
+def testMemoriesShareImagePages(writeProgram):
+    """
+    Memories of an image start from the same pages, and a write to one is not seen by
+    another
+    """
+    path = writeProgram([1, 0, 0, 0, 99])
+    cache = ProgramCache()
+    image = cache.load(path)
+
+    first = cache.memory(image)
+    second = cache.memory(image)
+    assert first.pages[0] is second.pages[0]
+
+    first[0] = 2
+    assert first[0] == 2
+    assert second[0] == 1
+    assert cache.memory(image)[0] == 1
+    assert len(cache.memories) == 1
+
+    typed = cache.memory(image, typed=True)
+    assert typed[4] == 99
+    assert len(cache.memories) == 2
+
+    cache.forget(path)
+    assert not cache.images
+    assert not cache.memories
@@ -0,0 +1,109 @@
+"""
+Tests of the binary trace recorder against a traced run
+"""
+import os
+import pathlib
+
+import numpy as np
+import pytest
+
+from intcode import RECORD_DTYPE, IntcodeComputer, TraceRecorder, loadTrace
+from intcode.Recorder import HEADER_DTYPE
+
+DAY_9_INPUT = os.path.join(pathlib.Path(__file__).parent.parent.parent, 'Day_9', 'input.txt')
+
+CAPACITY = 16
+
+
+def traceDay9(hook):
+    """
+    Runs BOOST in test mode with a trace hook
+    """
+    computer = IntcodeComputer(DAY_9_INPUT)
+    computer.setInputs([1])
+    computer.setTraceHook(hook)
+    while computer.execute() is not None:
+        pass
+
+
+@pytest.fixture(scope='module')
+def reference():
+    """
+    The Day 9 trace as the trace hook sees it: pc, opcode, operands and result per instruction
+    """
+    calls = list()
+    traceDay9(lambda pc, opcode, modes, operands, result: calls.append((pc, opcode, operands, result)))
+
+    pcs = np.array([call[0] for call in calls])
+    opcodes = np.array([call[1] for call in calls])
+    operands = np.array([(call[2] + (0, 0, 0))[:3] for call in calls])
+    values = np.array([0 if call[3] is None else call[3] for call in calls])
+    return pcs, opcodes, operands, values
+
+
+def checkRecords(records, reference, start=0):
+    """
+    Compares records with the reference trace from a given instruction on
+    """
+    pcs, opcodes, operands, values = (column[start:] for column in reference)
+    assert len(records) == len(pcs)
+    assert (records['pc'] == pcs).all()
+    assert (records['opcode'] == opcodes).all()
+    assert (records['operand1'] == operands[:, 0]).all()
+    assert (records['operand2'] == operands[:, 1]).all()
+    assert (records['operand3'] == operands[:, 2]).all()
+    assert (records['value'] == values).all()
+
+
+def testRing(reference):
+    """
+    The ring keeps the most recent records of a trace longer than it
+    """
+    recorder = TraceRecorder(capacity=CAPACITY)
+    traceDay9(recorder)
+
+    count = len(reference[0])
+    assert count > 10 * CAPACITY
+    assert recorder.recorded == count
+    assert recorder.dropped == count - CAPACITY
+    assert recorder.truncated == 0
+    checkRecords(recorder.records(), reference, start=count - CAPACITY)
+
+
+def testSpillRoundTrip(reference, tmp_path):
+    """
+    A spilled trace spans many chunks and loads back whole, while recording and after closing
+    """
+    path = str(tmp_path / 'day9.trace')
+    recorder = TraceRecorder(capacity=CAPACITY, spillPath=path)
+    traceDay9(recorder)
+
+    assert recorder.dropped == 0
+    assert recorder.chunk > 10
+    checkRecords(recorder.records(), reference)
+
+    recorder.close()
+    checkRecords(loadTrace(path), reference)
+    assert os.path.getsize(path) == HEADER_DTYPE.itemsize + len(reference[0]) * RECORD_DTYPE.itemsize
+
+
+def testTruncatedValues():
+    """
+    Values wider than int64 are wrapped and counted
+    """
+    recorder = TraceRecorder(capacity=4)
+    recorder(0, 2, (1, 1, 0), (1 << 40, 1 << 40, 7), 1 << 80)
+
+    assert recorder.truncated == 1
+    assert recorder.records()['value'][0] == 0
+    assert recorder.records()['storeAddress'][0] == 7
+
+
+def testNotATraceFile(tmp_path):
+    """
+    loadTrace refuses a file without the trace magic
+    """
+    path = tmp_path / 'other.bin'
+    path.write_bytes(b'not a trace')
+    with pytest.raises(RuntimeError):
+        loadTrace(str(path))
@@ -0,0 +1,100 @@
+"""
+Tests of the scheduler and of running machines in instruction slices
+"""
+import pytest
+
+from conftest import ENGINES
+from intcode import IntcodeComputer, Scheduler
+
+# stores 7 to address 20 and outputs it, reads an input, and when it is 0 patches the store to
+# 9 and jumps back to the start
+PATCHING_PROGRAM = [1101, 7, 0, 20, 4, 20, 3, 30, 1006, 30, 0, 1101, 0, 9, 1, 1105, 1, 0]
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def testSlicePatchesCompiledCode(writeProgram, engine):
+    """
+    A slice patches code its machine has already compiled, and the machine's engine runs the
+    patched code afterwards
+    """
+    computer = IntcodeComputer(writeProgram(PATCHING_PROGRAM), engine=engine)
+    assert computer.execute() == 7
+
+    computer.appendInput(1)
+    assert computer.executeSlice(100) == 9
+
+    computer.appendInput(0)
+    assert computer.execute() == 9
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def testScheduledMachinePatchesCompiledCode(writeProgram, engine):
+    """
+    A machine run by the scheduler between runs on its own engine sees its patched code
+    """
+    computer = IntcodeComputer(writeProgram(PATCHING_PROGRAM), engine=engine)
+    assert computer.execute() == 7
+
+    scheduler = Scheduler(sliceSize=3)
+    task = scheduler.add(computer)
+    scheduler.send(task, 1)
+    assert not scheduler.run()
+    assert task.outputs == [9]
+
+    computer.appendInput(0)
+    assert computer.execute() == 9
+
+
+def testFeedbackLoop(writeProgram):
+    """
+    Day 7's example feedback loop of five amplifiers
+    """
+    program = [3, 26, 1001, 26, -4, 26, 3, 27, 1002, 27, 2, 27, 1, 27, 26, 27, 4, 27, 1001, 28, -1, 28,
+               1005, 28, 6, 99, 0, 0, 5]
+    path = writeProgram(program)
+
+    scheduler = Scheduler(sliceSize=7)
+    tasks = list()
+    for phase in (9, 8, 7, 6, 5):
+        computer = IntcodeComputer(path)
+        computer.setInputs([phase])
+        tasks.append(scheduler.add(computer))
+
+    for source, target in zip(tasks, tasks[1:] + tasks[:1]):
+        scheduler.connect(source, target)
+
+    scheduler.send(tasks[0], 0)
+    assert scheduler.run()
+    assert tasks[-1].lastOutput == 139629729
+
+
+def testInstructionCap(writeProgram):
+    """
+    A machine that loops forever is killed at its instruction cap
+    """
+    scheduler = Scheduler(sliceSize=10)
+    task = scheduler.add(IntcodeComputer(writeProgram([1105, 1, 0])), maxInstructions=25)
+    assert scheduler.run()
+    assert task.state == task.KILLED
+    assert task.instructions == 25
+
+
+def testProducerOutrunsConsumer(writeProgram):
+    """
+    A consumer whose input channel fills up faults on its own, and the other tasks run on
+    """
+    # outputs 1 forever
+    producer = IntcodeComputer(writeProgram([104, 1, 1105, 1, 0]))
+    # reads an input, then counts address 21 to 50 before reading the next one
+    consumer = IntcodeComputer(writeProgram([3, 20, 1001, 21, 1, 21, 1007, 21, 50, 22, 1005, 22, 2, 1101, 0, 0, 21,
+                                             1105, 1, 0, 0, 0, 0]))
+
+    scheduler = Scheduler(sliceSize=1000)
+    producerTask = scheduler.add(producer, maxInstructions=300000)
+    consumerTask = scheduler.add(consumer)
+    scheduler.connect(producerTask, consumerTask)
+
+    assert scheduler.run()
+    assert consumerTask.state == consumerTask.FAULTED
+    assert 'full' in consumerTask.reason
+    assert producerTask.state == producerTask.KILLED
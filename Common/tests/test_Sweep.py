@@ -0,0 +1,80 @@
+"""
+Tests of parameter sweeps, in this process and on a process pool
+"""
+from functools import partial
+import operator
+import time
+
+import pytest
+
+from intcode import InputChannel, sweep
+
+# outputs three times its input
+TRIPLING_PROGRAM = [3, 9, 1002, 9, 3, 9, 4, 9, 99, 0]
+
+
+def triple(computers, value):
+    """
+    Runs the tripling program on a value
+    """
+    computers[0].setInputs([value])
+    return computers[0].execute()
+
+
+def slowTriple(computers, value):
+    """
+    Triples a value, taking longer for the first few so that later chunks finish first
+    """
+    if value < 4:
+        time.sleep(0.2)
+
+    return triple(computers, value)
+
+
+def changeSettings(computers, value):
+    """
+    Reports whether the machine was handed out with its default settings, then changes them
+    :return: 0 if the settings were the defaults, 1 otherwise
+    """
+    computer = computers[0]
+    changed = (computer.traceHook is not None or not computer.fusion or computer.blockOnInput or
+               computer.inputChannel.policy != InputChannel.POLICY_REPEAT_LAST)
+
+    computer.setTraceHook(lambda *args: None)
+    computer.setFusion(False)
+    computer.setInputPolicy(InputChannel.POLICY_BLOCK)
+    computer.blockOnInput = True
+
+    return int(changed)
+
+
+@pytest.mark.parametrize('workers', (1, 2))
+def testMaximum(writeProgram, workers):
+    """
+    The sweep finds the maximum and its parameters
+    """
+    result = sweep(writeProgram(TRIPLING_PROGRAM), range(50), triple, workers=workers, chunkSize=4)
+    assert result == (147, 49, 50, False)
+
+
+@pytest.mark.parametrize('workers', (1, 2))
+def testStopWhenReturnsEarliestMatch(writeProgram, workers):
+    """
+    stopWhen stops at the earliest matching point of the grid, even when a later chunk
+    finishes first
+    """
+    result = sweep(writeProgram(TRIPLING_PROGRAM), range(40), slowTriple, workers=workers, chunkSize=4,
+                   stopWhen=partial(operator.le, 6))
+    assert result.stopped
+    assert (result.value, result.params) == (6, 2)
+
+
+def testSettingsDoNotCarryOver(writeProgram):
+    """
+    Every evaluation, in this sweep or a later one, gets machines with their default settings
+    """
+    path = writeProgram(TRIPLING_PROGRAM)
+    for _ in range(2):
+        result = sweep(path, range(5), changeSettings, workers=1, chunkSize=2)
+        assert result.value == 0
+        assert result.evaluated == 5
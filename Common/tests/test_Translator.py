@@ -0,0 +1,59 @@
+"""
+Tests of the translated engine's on-disk cache
+"""
+import importlib.util
+import marshal
+import os
+
+import pytest
+
+from intcode import IntcodeComputer, Translator
+
+# outputs three times its input
+TRIPLING_PROGRAM = [3, 9, 1002, 9, 3, 9, 4, 9, 99, 0]
+
+
+def runTranslated(path: str) -> int:
+    """
+    Triples 14 on the translated engine, with the in-memory translations forgotten so the
+    cache is read
+    """
+    Translator._TRANSLATIONS.clear()
+    computer = IntcodeComputer(path, engine='translated')
+    computer.setInputs([14])
+    return computer.execute()
+
+
+def bytecodeFile(cacheDir: str) -> str:
+    """
+    The one bytecode file in the cache
+    """
+    names = [name for name in os.listdir(cacheDir) if name.endswith('.bin')]
+    assert len(names) == 1
+    return os.path.join(cacheDir, names[0])
+
+
+@pytest.mark.parametrize('corruption', ('truncated', 'garbage', 'not code', 'empty'))
+def testCorruptBytecodeIsRetranslated(writeProgram, cacheDir, corruption):
+    """
+    A corrupt bytecode file with the right magic number is a cache miss, and translating again
+    rewrites it
+    """
+    path = writeProgram(TRIPLING_PROGRAM)
+    assert runTranslated(path) == 42
+
+    bytecodePath = bytecodeFile(cacheDir)
+    with open(bytecodePath, 'rb') as f:
+        data = f.read()
+
+    magic = importlib.util.MAGIC_NUMBER
+    corrupted = {'truncated': data[:len(data) // 2],
+                 'garbage': magic + b'\xff' * 32,
+                 'not code': magic + marshal.dumps(42),
+                 'empty': magic}[corruption]
+    with open(bytecodePath, 'wb') as f:
+        f.write(corrupted)
+
+    assert runTranslated(path) == 42
+    with open(bytecodePath, 'rb') as f:
+        assert f.read() == data
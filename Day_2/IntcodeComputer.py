@@ -3,14 +3,13 @@ A simple Intcode Computer
 """
 import os
 import pathlib
-from typing import List
+import sys
+from typing import Tuple
 
-INPUT_FILE = os.path.join(pathlib.Path(__file__).parent, 'input.txt')
+sys.path.append(os.path.join(pathlib.Path(__file__).parent.parent, 'Common'))
+from intcode import IntcodeComputer, Polynomial, SymbolicComputer, SymbolicFallback, solve  # noqa: E402
 
-OP_LENGTH = 4
-OP_ADD = 1
-OP_MULT = 2
-OP_STOP = 99
+INPUT_FILE = os.path.join(pathlib.Path(__file__).parent, 'input.txt')
 
 PROGRAM_RESULT_PTR = 0
 
@@ -26,111 +25,60 @@ def restoreProgram():
     """
     Restores the program after 1202 error
     """
-    program = readInput()
-    program = initialize(program=program, value1=RESTORE_VALUE_1, value2=RESTORE_VALUE_2)
-    program = execute(program=program, verboseOutput=False)
+    comp = IntcodeComputer(inputFile=INPUT_FILE, verboseOuput=False)
+    comp.initialize(value1=RESTORE_VALUE_1, value2=RESTORE_VALUE_2)
+    comp.execute()
 
-    print(f'Restore Program program[{PROGRAM_RESULT_PTR}] = {program[PROGRAM_RESULT_PTR]}')
+    print(f'Restore Program program[{PROGRAM_RESULT_PTR}] = {comp.program[PROGRAM_RESULT_PTR]}')
 
 
-def runGravityAssistProgram():
+def runGravityAssistProgram(inputFile: str = INPUT_FILE) -> Tuple[int, int]:
     """
-    Runs the gravity assist program by brute force
+    Runs the gravity assist program once with the noun and verb as symbols and solves the
+    result for the target output, searching every noun and verb if the program cannot be
+    evaluated symbolically
+    :param inputFile: the gravity assist program
+    :return: the noun and verb
     """
-    program = readInput()
-
-    solutionFound = False
-    theNoun = 0
-    theVerb = 0
-    for noun in range(MAX_NOUN):
-        for verb in range(MAX_VERB):
-            programIteration = program[:]
-            programIteration = initialize(program=programIteration, value1=noun, value2=verb)
-            programIteration = execute(program=programIteration, verboseOutput=False)
-
-            if programIteration[PROGRAM_RESULT_PTR] == GRAVITY_ASSIST_OUTPUT:
-                theNoun = noun
-                theVerb = verb
-                solutionFound = True
-                break
-
-    if not solutionFound:
-        raise RuntimeError('No solution found')
+    comp = SymbolicComputer(inputFile=inputFile)
+    comp.initialize(value1=Polynomial.symbol('noun'), value2=Polynomial.symbol('verb'))
 
-    print(f'Gravity Assist finalOutput = {finalOutput(noun=theNoun, verb=theVerb)}')
-
-
-def initialize(program: List[int], value1: int, value2: int) -> List[int]:
-    """
-    Initializes the program for execution
-    :param program:
-    :param value1:
-    :param value2:
-    :return: initialized program
-    """
-    program[1] = value1
-    program[2] = value2
-
-    return program
-
-
-def execute(program: List[int], verboseOutput: bool = False) -> List[int]:
-    """
-    Executes the program
-    :param program:
-    :param verboseOutput:
-    :return: executed program
-    """
-    sp = 0
-    opcode = program[sp]
-    while opcode != OP_STOP:
-        if verboseOutput:
-            print(f'sp = {sp}')
-            print(program[sp: sp + OP_LENGTH])
+    try:
+        comp.execute()
+        solution = solve(polynomial=comp.program[PROGRAM_RESULT_PTR],
+                         target=GRAVITY_ASSIST_OUTPUT,
+                         domains={'noun': range(MAX_NOUN), 'verb': range(MAX_VERB)})
+        if solution is None:
+            raise RuntimeError('No solution found')
+        theNoun, theVerb = solution['noun'], solution['verb']
+    except SymbolicFallback:
+        theNoun, theVerb = searchGravityAssist(inputFile=inputFile)
 
-        if opcode == OP_ADD:
-            program = opcodeAdd(program, sp)
-        elif opcode == OP_MULT:
-            program = opcodeMultiply(program, sp)
-        else:
-            raise RuntimeError(f'Encountered illigal opcode {opcode}')
-
-        sp += OP_LENGTH
-        opcode = program[sp]
-
-    return program
+    print(f'Gravity Assist finalOutput = {finalOutput(noun=theNoun, verb=theVerb)}')
+    return theNoun, theVerb
 
 
-def opcodeAdd(program: List[int], sp: int) -> List[int]:
+def searchGravityAssist(inputFile: str = INPUT_FILE) -> Tuple[int, int]:
     """
-    Performs the add opcode
-    :param program:
-    :param sp: the current stack pointer
-    :return: program:
+    Runs the gravity assist program for every noun and verb at once on the batch computer
+    :param inputFile: the gravity assist program
+    :return: the noun and verb
     """
-    valuePtr1 = program[sp + 1]
-    valuePtr2 = program[sp + 2]
-    storagePtr = program[sp + 3]
+    import numpy as np
+    from intcode import BatchComputer
 
-    program[storagePtr] = program[valuePtr1] + program[valuePtr2]
+    nouns, verbs = np.divmod(np.arange(MAX_NOUN * MAX_VERB), MAX_VERB)
 
-    return program
-
-
-def opcodeMultiply(program: List[int], sp: int) -> List[int]:
-    """
-    Performs the multiply opcode
-    :param program:
-    :param sp: the current stack pointer
-    :return: program:
-    """
-    valuePtr1 = program[sp + 1]
-    valuePtr2 = program[sp + 2]
-    storagePtr = program[sp + 3]
+    batch = BatchComputer(inputFile=inputFile, numLanes=nouns.size)
+    batch.initialize(values1=nouns, values2=verbs)
+    batch.execute()
 
-    program[storagePtr] = program[valuePtr1] * program[valuePtr2]
+    solutions = np.flatnonzero(~batch.faulted & (batch.program[:, PROGRAM_RESULT_PTR] == GRAVITY_ASSIST_OUTPUT))
+    if solutions.size == 0:
+        raise RuntimeError('No solution found')
 
-    return program
+    lane = solutions[0]
+    return int(nouns[lane]), int(verbs[lane])
 
 
 def finalOutput(noun: int, verb: int) -> int:
@@ -143,15 +91,6 @@ def finalOutput(noun: int, verb: int) -> int:
     return 100 * noun + verb
 
 
-def readInput() -> List[int]:
-    """
-    reads the input file and returns the values
-    :return: List[int] of the input data file
-    """
-    with open(INPUT_FILE) as f:
-        return [int(value) for value in f.readline().split(sep=',')]
-
-
 if __name__ == '__main__':
     restoreProgram()
     runGravityAssistProgram()